@@ -1,11 +1,11 @@
 from django.contrib import admin
 from django.db import models
-from django.utils import timezone
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
-from django.conf import settings
-from .models import Disertante, Empresa, Asistente, Inscripcion, Certificado, Programa
-from .email import send_certificate_email
+from .models import Disertante, Empresa, Asistente, Inscripcion, Certificado, Programa, TrabajoCertificados, EnvioEmail, TrabajoImportacion, ContadorEstadistica
+from .cola_emails import encolar_emails
+from .checkin import confirmar_asistencia
+from .certificados import encolar_certificados, renderizar_lote
+from .exportacion import exportar_csv, exportar_xlsx
+from .estadisticas import recalcular
 
 
 class DNIFilter(admin.SimpleListFilter):
@@ -40,90 +40,59 @@ class AsistenteAdmin(admin.ModelAdmin):
     list_display = ('first_name', 'last_name', 'email', 'dni', 'asistencia_confirmada', 'fecha_confirmacion')
     list_filter = (DNIFilter, 'asistencia_confirmada', 'fecha_confirmacion')
     search_fields = ('first_name', 'last_name', 'email', 'dni')
-    actions = ['confirmar_asistencia', 'enviar_certificados', 'enviar_solicitud_actualizacion_dni', 'enviar_certificados_lote_40', 'exportar_no_estudiantes_xls', 'exportar_asistentes_xls']
-    def exportar_asistentes_xls(self, request, queryset):
+    actions = ['confirmar_asistencia', 'enviar_certificados', 'generar_certificados_segundo_plano', 'enviar_solicitud_actualizacion_dni', 'enviar_certificados_15_noviembre', 'exportar_no_estudiantes_xlsx', 'exportar_no_estudiantes_csv', 'exportar_asistentes_xlsx', 'exportar_asistentes_csv']
+    def _exportar(self, request, asistentes, formato, nombre, vacio):
+        """Exporta los asistentes con las columnas de api/exportacion.py, sin armar el archivo en memoria."""
+        if not asistentes.exists():
+            self.message_user(request, vacio, level='warning')
+            return
+        if formato == 'csv':
+            return exportar_csv(asistentes, f'{nombre}.csv')
+        return exportar_xlsx(asistentes, f'{nombre}.xlsx')
+
+    def exportar_asistentes_xlsx(self, request, queryset):
         """
-        Exporta todos los asistentes seleccionados a un archivo Excel (.xls)
+        Exporta todos los asistentes seleccionados a un archivo Excel (.xlsx)
         """
-        import xlwt
-        from django.http import HttpResponse
+        return self._exportar(request, queryset, 'xlsx', 'asistentes', "No hay asistentes en la selección.")
 
-        asistentes = queryset
-        if not asistentes.exists():
-            self.message_user(request, "No hay asistentes en la selección.", level='warning')
-            return
+    exportar_asistentes_xlsx.short_description = "Exportar asistentes seleccionados a Excel (.xlsx)"
 
-        wb = xlwt.Workbook()
-        ws = wb.add_sheet('Asistentes')
-
-        campos = [
-            'first_name', 'last_name', 'email', 'dni', 'phone', 'profile_type',
-            'rol_especifico', 'is_unab_student', 'institution', 'career', 'year_of_study',
-            'career_taught', 'work_area', 'occupation', 'company_name', 'group_name',
-            'group_municipality', 'group_size', 'asistencia_confirmada', 'fecha_confirmacion'
-        ]
-        for col, campo in enumerate(campos):
-            ws.write(0, col, campo)
-
-        for row, asistente in enumerate(asistentes, start=1):
-            for col, campo in enumerate(campos):
-                valor = getattr(asistente, campo, '')
-                ws.write(row, col, str(valor) if valor is not None else '')
-
-        response = HttpResponse(content_type='application/vnd.ms-excel')
-        response['Content-Disposition'] = 'attachment; filename=asistentes.xls'
-        wb.save(response)
-        return response
+    def exportar_asistentes_csv(self, request, queryset):
+        return self._exportar(request, queryset, 'csv', 'asistentes', "No hay asistentes en la selección.")
 
-    exportar_asistentes_xls.short_description = "Exportar asistentes seleccionados a Excel (.xls)"
+    exportar_asistentes_csv.short_description = "Exportar asistentes seleccionados a CSV"
 
-    def exportar_no_estudiantes_xls(self, request, queryset):
+    def exportar_no_estudiantes_xlsx(self, request, queryset):
         """
-        Exporta los asistentes seleccionados que NO son estudiantes a un archivo Excel (.xls)
+        Exporta los asistentes seleccionados que NO son estudiantes a un archivo Excel (.xlsx)
         """
-        import xlwt
-        from django.http import HttpResponse
+        return self._exportar(
+            request, queryset.exclude(profile_type='STUDENT'), 'xlsx', 'asistentes_no_estudiantes',
+            "No hay asistentes no estudiantes en la selección."
+        )
 
-        # Filtrar solo los que no son estudiantes
-        asistentes = queryset.exclude(profile_type='STUDENT')
-        if not asistentes.exists():
-            self.message_user(request, "No hay asistentes no estudiantes en la selección.", level='warning')
-            return
+    exportar_no_estudiantes_xlsx.short_description = "Exportar asistentes NO estudiantes a Excel (.xlsx)"
 
-        # Crear libro y hoja
-        wb = xlwt.Workbook()
-        ws = wb.add_sheet('No Estudiantes')
-
-        # Definir campos a exportar
-        campos = [
-            'first_name', 'last_name', 'email', 'dni', 'phone', 'profile_type',
-            'rol_especifico', 'is_unab_student', 'institution', 'career', 'year_of_study',
-            'career_taught', 'work_area', 'occupation', 'company_name', 'group_name',
-            'group_municipality', 'group_size', 'asistencia_confirmada', 'fecha_confirmacion'
-        ]
-        # Escribir cabeceras
-        for col, campo in enumerate(campos):
-            ws.write(0, col, campo)
-
-        # Escribir datos
-        for row, asistente in enumerate(asistentes, start=1):
-            for col, campo in enumerate(campos):
-                valor = getattr(asistente, campo, '')
-                ws.write(row, col, str(valor) if valor is not None else '')
-
-        # Preparar respuesta
-        response = HttpResponse(content_type='application/vnd.ms-excel')
-        response['Content-Disposition'] = 'attachment; filename=asistentes_no_estudiantes.xls'
-        wb.save(response)
-        return response
+    def exportar_no_estudiantes_csv(self, request, queryset):
+        return self._exportar(
+            request, queryset.exclude(profile_type='STUDENT'), 'csv', 'asistentes_no_estudiantes',
+            "No hay asistentes no estudiantes en la selección."
+        )
 
-    exportar_no_estudiantes_xls.short_description = "Exportar asistentes NO estudiantes a Excel (.xls)"
-    def enviar_certificados_lote_40(self, request, queryset):
+    exportar_no_estudiantes_csv.short_description = "Exportar asistentes NO estudiantes a CSV"
+    def _mensaje_encolados(self, lote, total, descripcion):
+        return (
+            f"📬 {total} {descripcion} encolados (lote {lote}). "
+            f"Los envía el comando `procesar_emails`; el avance se ve en Envíos de email."
+        )
+
+    def enviar_certificados_15_noviembre(self, request, queryset):
         """
-        Envía certificados solo a los asistentes seleccionados, confirmados el 15 de noviembre,
-        en lotes de 40 para evitar errores de envío masivo.
+        Encola los certificados de los asistentes seleccionados confirmados el 15 de noviembre.
+        El envío lo hace el comando `procesar_emails`, sin límite por ejecución.
         """
-        from datetime import datetime, timedelta
+        from datetime import datetime
         from django.utils import timezone
         # Fecha del evento: 15 de noviembre de 2025
         fecha_evento = datetime(2025, 11, 15, tzinfo=timezone.get_current_timezone())
@@ -135,172 +104,143 @@ class AsistenteAdmin(admin.ModelAdmin):
             asistencia_confirmada=True,
             fecha_confirmacion__range=(fecha_inicio, fecha_fin)
         )
-        total = asistentes.count()
+        lote, total = encolar_emails(asistentes, EnvioEmail.Tipo.CERTIFICADO)
         if total == 0:
             self.message_user(request, "No hay asistentes confirmados el 15 de noviembre en la selección.", level='warning')
             return
+        self.message_user(request, self._mensaje_encolados(lote, total, "certificados"))
 
-        # Enviar en lotes de 40
-        LOTE = 40
-        enviados = 0
-        errores = 0
-        asistentes_lote = asistentes[:LOTE]
-        for asistente in asistentes_lote:
-            try:
-                certificado, _ = Certificado.objects.get_or_create(
-                    asistente=asistente,
-                    tipo_certificado=Certificado.TipoCertificado.ASISTENCIA
-                )
-                send_certificate_email(certificado)
-                enviados += 1
-            except Exception as e:
-                errores += 1
-        mensaje = f"Se enviaron {enviados} certificados en este lote."
-        if errores:
-            mensaje += f" Hubo {errores} errores."
-        if total > LOTE:
-            mensaje += f" Quedan {total - LOTE} asistentes pendientes. Ejecuta la acción nuevamente para continuar."
-        self.message_user(request, mensaje)
-
-    enviar_certificados_lote_40.short_description = "Enviar certificados (confirmados 15/11, lote de 40)"
+    enviar_certificados_15_noviembre.short_description = "Enviar certificados (confirmados 15/11)"
 
     def enviar_solicitud_actualizacion_dni(self, request, queryset):
         """
-        Envía email a los asistentes seleccionados que no tienen DNI válido,
+        Encola un email a los asistentes seleccionados que no tienen DNI válido,
         con un enlace para que actualicen su DNI.
-        
-        LÍMITE: Máximo 50 correos por ejecución para evitar timeouts.
-        Solo envía a quienes NO han recibido el correo previamente.
+
+        Solo a quienes NO han recibido el correo ni lo tienen ya en la cola.
         """
-        # Filtrar solo asistentes sin DNI válido (con token asignado) Y que no hayan recibido el correo
+        # Filtrar solo asistentes sin DNI válido Y que no hayan recibido el correo
         asistentes_sin_dni = queryset.filter(
             models.Q(dni__isnull=True) | models.Q(dni=''),
             dni_email_sent=False  # Solo quienes NO han recibido el correo
         )
-        
+
         if not asistentes_sin_dni.exists():
             # Verificar si hay asistentes que ya recibieron el correo
             ya_enviados = queryset.filter(
                 models.Q(dni__isnull=True) | models.Q(dni=''),
                 dni_email_sent=True
             ).count()
-            
+
             if ya_enviados > 0:
                 self.message_user(
-                    request, 
+                    request,
                     f"✅ Los {ya_enviados} asistentes seleccionados ya recibieron el correo de solicitud de DNI.",
                     level='info'
                 )
             else:
                 self.message_user(request, "Los asistentes seleccionados ya tienen DNI válido.", level='warning')
             return
-        
-        # LIMITAR a 50 para evitar timeout de Gunicorn
-        MAX_EMAILS = 50
-        total_sin_dni = asistentes_sin_dni.count()
-        asistentes_lote = asistentes_sin_dni[:MAX_EMAILS]
-        
-        if total_sin_dni > MAX_EMAILS:
-            self.message_user(
-                request, 
-                f"⚠️ Hay {total_sin_dni} asistentes sin DNI que no han recibido el correo. "
-                f"Solo se enviarán {MAX_EMAILS} correos en este lote. "
-                f"Ejecuta la acción nuevamente para enviar los siguientes.",
-                level='warning'
-            )
-        
-        enviados = 0
-        errores = 0
-        sin_token = 0
-        
-        for asistente in asistentes_lote:
-            if not asistente.dni_update_token:
-                sin_token += 1
-                continue
-            
-            try:
-                # Construir el enlace
-                base_url = getattr(settings, 'FRONTEND_URL', 'https://congresologistica.unab.edu.ar')
-                enlace = f"{base_url}/actualizar-dni?token={asistente.dni_update_token}"
-                
-                # Renderizar el template
-                html_content = render_to_string('email/dni_update.html', {
-                    'nombre': asistente.first_name,
-                    'enlace': enlace
-                })
-                
-                # Crear y enviar el email
-                subject = 'Actualización de DNI - Congreso de Logística UNaB 2025'
-                from_email = settings.DEFAULT_FROM_EMAIL
-                to_email = asistente.email
-                
-                email = EmailMultiAlternatives(subject, '', from_email, [to_email])
-                email.attach_alternative(html_content, "text/html")
-                email.send()
-                
-                # MARCAR como enviado
-                asistente.dni_email_sent = True
-                asistente.dni_email_sent_date = timezone.now()
-                asistente.save(update_fields=['dni_email_sent', 'dni_email_sent_date'])
-                
-                enviados += 1
-            except Exception as e:
-                errores += 1
-                print(f"[ERROR] Error enviando email a {asistente.email}: {e}")
-        
+
+        sin_token = asistentes_sin_dni.filter(models.Q(dni_update_token__isnull=True) | models.Q(dni_update_token='')).count()
+        en_cola = EnvioEmail.objects.filter(
+            tipo=EnvioEmail.Tipo.SOLICITUD_DNI,
+            estado__in=[EnvioEmail.Estado.PENDIENTE, EnvioEmail.Estado.ENVIANDO],
+        ).values('asistente_id')
+        asistentes = asistentes_sin_dni.exclude(
+            models.Q(dni_update_token__isnull=True) | models.Q(dni_update_token='')
+        ).exclude(pk__in=en_cola)
+
+        lote, total = encolar_emails(asistentes, EnvioEmail.Tipo.SOLICITUD_DNI)
+
         # Mensaje final con resumen
-        mensaje = f"✅ {enviados} emails enviados correctamente."
-        if errores > 0:
-            mensaje += f" ❌ {errores} errores."
+        mensaje = self._mensaje_encolados(lote, total, "emails de solicitud de DNI")
         if sin_token > 0:
             mensaje += f" ⚠️ {sin_token} sin token (ejecuta fix_dni.py)."
-        if total_sin_dni > MAX_EMAILS:
-            pendientes = total_sin_dni - MAX_EMAILS
-            mensaje += f" 📬 Quedan {pendientes} pendientes de enviar."
-        
         self.message_user(request, mensaje)
-    
-    enviar_solicitud_actualizacion_dni.short_description = "Enviar solicitud de actualización de DNI (máx. 50)"
+
+    enviar_solicitud_actualizacion_dni.short_description = "Enviar solicitud de actualización de DNI"
 
     def confirmar_asistencia(self, request, queryset):
-        updated_count = 0
-        for asistente in queryset:
-            if not asistente.asistencia_confirmada:
-                asistente.asistencia_confirmada = True
-                asistente.fecha_confirmacion = timezone.now()
-                asistente.save()
-                
-                # Crear certificado de asistencia
-                certificado, created = Certificado.objects.get_or_create(
-                    asistente=asistente,
-                    tipo_certificado=Certificado.TipoCertificado.ASISTENCIA
-                )
-                
-                # Enviar certificado por email
-                send_certificate_email(certificado)
-                updated_count += 1
-        
-        self.message_user(request, f"{updated_count} asistencias confirmadas y certificados enviados.")
+        confirmados = []
+        for asistente_id, dni in queryset.filter(asistencia_confirmada=False).values_list('id', 'dni'):
+            # Confirmar y crear el certificado en una sola transacción (sin save()/full_clean())
+            if confirmar_asistencia(asistente_id, dni=dni):
+                confirmados.append(asistente_id)
+
+        # Encolar los certificados por email
+        lote, total = encolar_emails(Asistente.objects.filter(pk__in=confirmados), EnvioEmail.Tipo.CERTIFICADO)
+        self.message_user(request, f"{len(confirmados)} asistencias confirmadas. " + self._mensaje_encolados(lote, total, "certificados"))
     confirmar_asistencia.short_description = "Confirmar asistencia y enviar certificado"
 
     def enviar_certificados(self, request, queryset):
-        sent_count = 0
-        for asistente in queryset.filter(asistencia_confirmada=True):
-            certificado, created = Certificado.objects.get_or_create(
-                asistente=asistente,
-                tipo_certificado=Certificado.TipoCertificado.ASISTENCIA
-            )
-            send_certificate_email(certificado)
-            sent_count += 1
-        
-        self.message_user(request, f"{sent_count} certificados enviados.")
+        lote, total = encolar_emails(queryset.filter(asistencia_confirmada=True), EnvioEmail.Tipo.CERTIFICADO)
+        self.message_user(request, self._mensaje_encolados(lote, total, "certificados"))
     enviar_certificados.short_description = "Enviar certificados a asistentes confirmados"
 
+    def generar_certificados_segundo_plano(self, request, queryset):
+        """
+        Encola la generación de los PDFs de los asistentes confirmados seleccionados.
+        Los procesa el comando `generar_certificados` con un pool de procesos;
+        después, el envío por email solo adjunta el PDF ya generado.
+        """
+        confirmados = queryset.filter(asistencia_confirmada=True)
+        if not confirmados.exists():
+            self.message_user(request, "No hay asistentes confirmados en la selección.", level='warning')
+            return
+        trabajo = encolar_certificados(confirmados)
+        self.message_user(
+            request,
+            f"Trabajo #{trabajo.pk} encolado con {trabajo.total} certificados. "
+            f"Ejecuta 'python manage.py generar_certificados' para procesarlo."
+        )
+    generar_certificados_segundo_plano.short_description = "Generar PDFs de certificados en segundo plano"
+
 class CertificadoAdmin(admin.ModelAdmin):
     list_display = ('asistente', 'tipo_certificado', 'fecha_generacion')
     list_filter = ('tipo_certificado', 'fecha_generacion')
     search_fields = ('asistente__first_name', 'asistente__last_name', 'asistente__email')
 
+class TrabajoCertificadosAdmin(admin.ModelAdmin):
+    list_display = ('id', 'estado', 'procesados', 'total', 'errores', 'progreso', 'fecha_creacion', 'fecha_actualizacion')
+    list_filter = ('estado',)
+    readonly_fields = ('estado', 'total', 'procesados', 'errores', 'ultimo_error', 'fecha_creacion', 'fecha_actualizacion')
+    exclude = ('certificados',)
+
+class TrabajoImportacionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'formato', 'modo', 'estado', 'procesados', 'total', 'exitosos', 'actualizados', 'errores', 'progreso', 'fecha_creacion', 'fecha_actualizacion')
+    list_filter = ('estado', 'formato', 'modo')
+    readonly_fields = ('estado', 'total', 'procesados', 'exitosos', 'actualizados', 'sin_cambios', 'errores', 'emails_encolados', 'lote_emails', 'detalles', 'detalles_omitidos', 'ultimo_error', 'fecha_creacion', 'fecha_inicio', 'fecha_actualizacion')
+
+class EnvioEmailAdmin(admin.ModelAdmin):
+    list_display = ('destinatario', 'tipo', 'estado', 'intentos', 'lote', 'fecha_creacion', 'fecha_envio')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('destinatario', 'lote')
+    readonly_fields = ('lote', 'tipo', 'destinatario', 'asistente', 'contexto', 'intentos', 'ultimo_error', 'fecha_creacion', 'fecha_envio')
+    actions = ['reintentar']
+
+    def reintentar(self, request, queryset):
+        from django.utils import timezone
+        actualizados = queryset.filter(estado=EnvioEmail.Estado.ERROR).update(
+            estado=EnvioEmail.Estado.PENDIENTE, intentos=0, proximo_intento=timezone.now()
+        )
+        self.message_user(request, f"{actualizados} emails vuelven a la cola.")
+    reintentar.short_description = "Reintentar los emails con error"
+
+class ContadorEstadisticaAdmin(admin.ModelAdmin):
+    list_display = ('clave', 'valor')
+    search_fields = ('clave',)
+    readonly_fields = ('clave', 'valor')
+    actions = ['recalcular_contadores']
+
+    def has_add_permission(self, request):
+        return False
+
+    def recalcular_contadores(self, request, queryset):
+        recalcular()
+        self.message_user(request, "Contadores de estadísticas recalculados desde la tabla de asistentes.")
+    recalcular_contadores.short_description = "Recalcular todos los contadores"
+
 class ProgramaAdmin(admin.ModelAdmin):
     list_display = ('titulo', 'categoria', 'aula', 'dia', 'hora_inicio', 'hora_fin')
     list_filter = ('dia', 'categoria', 'aula')
@@ -319,6 +259,22 @@ class DisertanteAdmin(admin.ModelAdmin):
         }),
     )
     list_display = ('nombre', 'tema_presentacion', 'linkedin')
+    actions = ['descargar_certificados_pdf']
+
+    def descargar_certificados_pdf(self, request, queryset):
+        """
+        Descarga un único PDF con un certificado por página para los disertantes seleccionados.
+        El fondo de la plantilla se embebe una sola vez para todo el archivo.
+        """
+        from django.http import HttpResponse
+
+        nombres = [nombre.upper() for nombre in queryset.order_by('nombre').values_list('nombre', flat=True)]
+        pdf = renderizar_lote(nombres, tipo='DISERTANTE')
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = 'attachment; filename=certificados_disertantes.pdf'
+        return response
+
+    descargar_certificados_pdf.short_description = "Descargar certificados de los disertantes seleccionados (un solo PDF)"
 @admin.register(Empresa)
 class EmpresaAdmin(admin.ModelAdmin):
     fieldsets = (
@@ -338,4 +294,8 @@ class EmpresaAdmin(admin.ModelAdmin):
 admin.site.register(Asistente, AsistenteAdmin)
 admin.site.register(Inscripcion, InscripcionAdmin)
 admin.site.register(Certificado, CertificadoAdmin)
+admin.site.register(TrabajoCertificados, TrabajoCertificadosAdmin)
+admin.site.register(TrabajoImportacion, TrabajoImportacionAdmin)
+admin.site.register(EnvioEmail, EnvioEmailAdmin)
+admin.site.register(ContadorEstadistica, ContadorEstadisticaAdmin)
 admin.site.register(Programa, ProgramaAdmin)
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Altas de asistentes en bloque.
+
+Lo comparten la carga masiva (importacion.py) y la inscripción de grupos
+(AsistenteSerializer._crear_miembros): la búsqueda de emails y DNIs ya
+registrados, con una sola consulta y comparando los emails sin distinguir
+mayúsculas en cualquier motor, y el bulk_create con lo que post_save haría
+para cada asistente (índice de check-in y estadísticas).
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .checkin import EntradaCheckIn, indice_checkin
+from .estadisticas import registrar_altas
+from .models import Asistente
+
+
+def buscar_registrados(emails, dnis, *campos):
+    """
+    Asistentes cuyo email (sin distinguir mayúsculas) o DNI está entre los
+    dados. Sin `campos` devuelve instancias con el atributo `email_minusculas`;
+    con `campos`, tuplas (email_minusculas, *campos).
+    """
+    emails = {email.strip().lower() for email in emails if email}
+    dnis = {dni for dni in dnis if dni}
+    registrados = Asistente.objects.annotate(email_minusculas=Lower('email')).filter(
+        Q(email_minusculas__in=emails) | Q(dni__in=dnis)
+    )
+    if campos:
+        return registrados.values_list('email_minusculas', *campos)
+    return registrados
+
+
+def insertar_asistentes(asistentes):
+    """
+    Inserta los asistentes con un bulk_create en un savepoint (un IntegrityError
+    se propaga sin dejar nada insertado) y completa lo que post_save haría.
+    """
+    with transaction.atomic():
+        Asistente.objects.bulk_create(asistentes)
+
+    # No todos los motores devuelven los IDs del bulk_create: se leen por email
+    sin_id = {asistente.email.lower(): asistente for asistente in asistentes if asistente.pk is None}
+    if sin_id:
+        emails = [asistente.email for asistente in sin_id.values()]
+        for email, pk in Asistente.objects.filter(email__in=emails).values_list('email', 'id'):
+            sin_id[email.lower()].pk = pk
+
+    # bulk_create no dispara post_save: actualizar el índice de check-in y las estadísticas a mano
+    for asistente in asistentes:
+        if asistente.dni:
+            indice_checkin.registrar(asistente.dni, EntradaCheckIn(asistente.pk, False, None))
+    registrar_altas(asistentes)
+    return asistentes
@@ -0,0 +1,93 @@
+"""
+Caché de las respuestas de la API pública (programa, disertantes y empresas).
+
+Estos datos los lee el sitio en cada visita y solo cambian cuando alguien los
+edita desde el admin. Por eso el JSON ya renderizado se guarda en la caché de
+Django con una clave que incluye una versión de contenido; las señales de
+guardado, borrado y cambios en la relación programa-disertantes (ver
+signals.py) cambian esa versión, y las respuestas anteriores dejan de usarse
+sin tener que buscarlas ni borrarlas.
+
+El ETag sale de la misma clave, así que un If-None-Match se responde con 304
+sin leer la respuesta guardada. Funciona con LocMemCache o FileBasedCache
+(ver CACHES en settings); con varios workers de Gunicorn conviene la segunda,
+para que todos vean la misma versión.
+
+Solo se cachean las respuestas 200 en JSON: la API navegable de DRF pasa
+siempre de largo, igual que los pedidos con alguno de los
+`parametros_sin_cache` de la vista (filtros que dependen de la hora actual).
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+
+
+CLAVE_VERSION = 'api_publica:version'
+
+
+def version_cache_publica():
+    """Versión actual del contenido público (se crea una si la caché no la tiene)."""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() para no pisar la que haya creado otro worker al mismo tiempo
+        if not cache.add(CLAVE_VERSION, version, None):
+            version = cache.get(CLAVE_VERSION, version)
+    return version
+
+
+def _nueva_version():
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex, None)
+
+
+def invalidar_cache_publica():
+    """
+    Descarta las respuestas cacheadas. Se cambia la versión en el momento y de
+    nuevo después del commit: una lectura que se cuele en el medio no deja
+    guardados datos sin confirmar con la versión definitiva.
+    """
+    _nueva_version()
+    transaction.on_commit(_nueva_version)
+
+
+class RespuestaCacheadaMixin:
+    """Mixin para ViewSets de solo lectura: sirve list y retrieve desde la caché con ETag."""
+
+    parametros_sin_cache = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().retrieve, request, *args, **kwargs)
+
+    def _respuesta_cacheada(self, generar, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json' or any(p in request.query_params for p in self.parametros_sin_cache):
+            return generar(request, *args, **kwargs)
+
+        # La URL absoluta entra en la clave: las fotos de los disertantes dependen del host
+        clave = f'api_publica:{version_cache_publica()}:{request.build_absolute_uri()}'
+        etag = f'"{hashlib.sha1(clave.encode()).hexdigest()}"'
+        if etag in [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]:
+            respuesta = HttpResponseNotModified()
+            respuesta['ETag'] = etag
+            return respuesta
+
+        contenido = cache.get(clave)
+        if contenido is not None:
+            respuesta = HttpResponse(contenido, content_type='application/json')
+            respuesta['ETag'] = etag
+            return respuesta
+
+        respuesta = generar(request, *args, **kwargs)
+        if respuesta.status_code == 200:
+            # Se guarda el JSON tal como lo renderiza DRF al terminar la vista
+            respuesta.add_post_render_callback(
+                lambda renderizada: cache.set(clave, renderizada.content, settings.CACHE_API_PUBLICA_TTL)
+            )
+            respuesta['ETag'] = etag
+        return respuesta
@@ -0,0 +1,191 @@
+"""
+Motor de renderizado de certificados.
+
+La plantilla PNG y la fuente se cargan una sola vez por proceso a través del
+registro de plantillas: en los workers del pool las precarga el initializer, y
+en el proceso web se cargan en el primer certificado. Los workers solo dibujan
+y codifican el PDF; el proceso principal es el único que toca la base de datos
+y el almacenamiento.
+
+Hay dos formatos de salida (settings.CERTIFICADO_FORMATO):
+- 'vectorial' (por defecto): reportlab embebe el fondo como imagen una sola vez
+  y escribe el nombre como texto real. Permite PDFs de varias páginas que
+  comparten el mismo fondo (renderizar_lote).
+- 'raster': la página completa se dibuja con Pillow y se guarda como imagen.
+"""
+import os
+import multiprocessing
+from io import BytesIO
+
+from django.conf import settings
+from PIL import ImageDraw
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+
+from .plantillas_certificado import registro_plantillas, PLANTILLA_POR_DEFECTO
+
+
+def inicializar_worker(*tipos):
+    """Carga las plantillas decodificadas y sus fuentes en el proceso actual."""
+    registro_plantillas.precargar(*(tipos or (PLANTILLA_POR_DEFECTO,)))
+
+
+FORMATO_VECTORIAL = 'vectorial'
+FORMATO_RASTER = 'raster'
+ANCHO_PAGINA_PT = landscape(A4)[0]
+
+
+def renderizar_certificado(nombre_apellido, tipo=PLANTILLA_POR_DEFECTO, formato=None):
+    """Devuelve los bytes del PDF del certificado con el nombre dado."""
+    formato = formato or getattr(settings, 'CERTIFICADO_FORMATO', FORMATO_VECTORIAL)
+    if formato == FORMATO_RASTER:
+        return renderizar_certificado_raster(nombre_apellido, tipo)
+    return renderizar_lote([nombre_apellido], tipo)
+
+
+def renderizar_certificado_raster(nombre_apellido, tipo=PLANTILLA_POR_DEFECTO):
+    """Dibuja el nombre sobre una copia de la plantilla y guarda la imagen completa como PDF."""
+    img, fuente, plantilla = registro_plantillas.obtener(tipo)
+    draw = ImageDraw.Draw(img)
+
+    # Medir el texto para centrarlo
+    bbox = draw.textbbox((0, 0), nombre_apellido, font=fuente)
+    text_width = bbox[2] - bbox[0]
+    x = (img.width - text_width) // 2
+    draw.text((x, plantilla.posicion_y), nombre_apellido, font=fuente, fill=plantilla.color)
+
+    buffer = BytesIO()
+    img.convert('RGB').save(buffer, format="PDF")
+    return buffer.getvalue()
+
+
+def renderizar_lote(nombres, tipo=PLANTILLA_POR_DEFECTO):
+    """
+    Genera un PDF vectorial con una página por nombre.
+    El fondo se embebe una sola vez como XObject y todas las páginas lo reutilizan;
+    el nombre se escribe como texto con la fuente de la plantilla.
+    """
+    plantilla = registro_plantillas.plantilla(tipo)
+    ancho_px, alto_px = registro_plantillas.dimensiones(tipo)
+    escala = ANCHO_PAGINA_PT / ancho_px
+    ancho_pt, alto_pt = ANCHO_PAGINA_PT, alto_px * escala
+
+    fondo = registro_plantillas.fondo_jpeg(tipo)
+    fuente_pdf = registro_plantillas.fuente_pdf(tipo)
+    tamanio_pt = plantilla.fuente_tamanio * escala
+    # Pillow ubica el borde superior del texto en posicion_y; reportlab dibuja sobre la línea base
+    ascenso_px = registro_plantillas.fuente(plantilla.fuente_path, plantilla.fuente_tamanio).getmetrics()[0]
+    base_pt = alto_pt - (plantilla.posicion_y + ascenso_px) * escala
+    r, g, b = plantilla.color[:3]
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(ancho_pt, alto_pt))
+    pdf.setTitle("Certificado - Congreso de Logística UNAB")
+    # El JPEG del fondo se copia tal cual al PDF (sin recodificarlo en ASCII85)
+    use_a85 = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        for nombre in nombres:
+            pdf.drawImage(fondo, 0, 0, width=ancho_pt, height=alto_pt)
+            pdf.setFont(fuente_pdf, tamanio_pt)
+            pdf.setFillColorRGB(r / 255, g / 255, b / 255)
+            pdf.drawCentredString(ancho_pt / 2, base_pt, nombre)
+            pdf.showPage()
+        pdf.save()
+    finally:
+        rl_config.useA85 = use_a85
+    return buffer.getvalue()
+
+
+def _renderizar_tarea(tarea):
+    """Función que ejecuta cada worker: (certificado_id, nombre, tipo) -> (certificado_id, pdf, error)."""
+    certificado_id, nombre_apellido, tipo = tarea
+    try:
+        return certificado_id, renderizar_certificado(nombre_apellido, tipo=tipo), None
+    except Exception as e:
+        return certificado_id, None, str(e)
+
+
+def encolar_certificados(asistentes):
+    """
+    Crea un TrabajoCertificados para los asistentes dados (normalmente los confirmados),
+    creando los registros de Certificado que falten. Devuelve el trabajo creado.
+    """
+    from .models import Certificado, TrabajoCertificados
+
+    asistente_ids = list(asistentes.values_list('id', flat=True))
+    existentes = set(
+        Certificado.objects.filter(
+            asistente_id__in=asistente_ids,
+            tipo_certificado=Certificado.TipoCertificado.ASISTENCIA,
+        ).values_list('asistente_id', flat=True)
+    )
+    Certificado.objects.bulk_create([
+        Certificado(asistente_id=pk, tipo_certificado=Certificado.TipoCertificado.ASISTENCIA)
+        for pk in asistente_ids if pk not in existentes
+    ])
+    certificados = Certificado.objects.filter(
+        asistente_id__in=asistente_ids,
+        tipo_certificado=Certificado.TipoCertificado.ASISTENCIA,
+    )
+
+    trabajo = TrabajoCertificados.objects.create()
+    trabajo.certificados.set(certificados)
+    trabajo.total = trabajo.certificados.count()
+    trabajo.save(update_fields=['total'])
+    return trabajo
+
+
+def procesar_trabajo(trabajo, procesos=None, regenerar=False, log=print):
+    """
+    Genera los PDFs pendientes de un trabajo con un pool de procesos.
+
+    Solo se renderizan los certificados sin PDF (salvo regenerar=True), así que
+    volver a procesar un trabajo interrumpido continúa donde quedó. El progreso
+    se guarda en el trabajo a medida que llegan los resultados.
+    """
+    from django.core.files.base import ContentFile
+    from django.db import connections
+    from .models import Certificado, TrabajoCertificados
+
+    pendientes = trabajo.certificados.select_related('asistente')
+    if not regenerar:
+        pendientes = pendientes.filter(pdf_generado__isnull=True) | pendientes.filter(pdf_generado='')
+    tareas = {}
+    for certificado in pendientes:
+        nombre = f"{certificado.asistente.first_name} {certificado.asistente.last_name}".upper()
+        tareas[certificado.id] = (certificado, nombre)
+
+    trabajo.estado = TrabajoCertificados.Estado.EN_PROCESO
+    trabajo.total = trabajo.certificados.count()
+    trabajo.procesados = trabajo.total - len(tareas)
+    trabajo.errores = 0
+    trabajo.save(update_fields=['estado', 'total', 'procesados', 'errores', 'fecha_actualizacion'])
+    log(f"[INFO] Trabajo #{trabajo.pk}: {len(tareas)} certificados pendientes de {trabajo.total}")
+
+    if tareas:
+        procesos = procesos or os.cpu_count() or 1
+        argumentos = [(pk, nombre, certificado.tipo_certificado) for pk, (certificado, nombre) in tareas.items()]
+        # No compartir la conexión a la base con los procesos hijos
+        connections.close_all()
+        with multiprocessing.Pool(processes=procesos, initializer=inicializar_worker) as pool:
+            for certificado_id, pdf, error in pool.imap_unordered(_renderizar_tarea, argumentos, chunksize=8):
+                certificado = tareas[certificado_id][0]
+                if error:
+                    trabajo.errores += 1
+                    trabajo.ultimo_error = f"{certificado.asistente.email}: {error}"
+                else:
+                    file_name = f"certificado_{certificado.asistente.email}.pdf"
+                    certificado.pdf_generado.save(file_name, ContentFile(pdf), save=False)
+                    Certificado.objects.filter(pk=certificado_id).update(pdf_generado=certificado.pdf_generado.name)
+                    trabajo.procesados += 1
+
+                hechos = trabajo.procesados + trabajo.errores
+                if hechos % 25 == 0 or hechos == trabajo.total:
+                    trabajo.save(update_fields=['procesados', 'errores', 'ultimo_error', 'fecha_actualizacion'])
+                    log(f"[INFO] Trabajo #{trabajo.pk}: {trabajo.procesados}/{trabajo.total} ({trabajo.progreso}%)")
+
+    trabajo.estado = TrabajoCertificados.Estado.ERROR if trabajo.errores else TrabajoCertificados.Estado.COMPLETADO
+    trabajo.save(update_fields=['estado', 'procesados', 'errores', 'ultimo_error', 'fecha_actualizacion'])
+    return trabajo
@@ -0,0 +1,257 @@
+"""
+Índice en memoria para el check-in del día del evento.
+
+Mantiene un mapa compacto DNI -> (id del asistente, asistencia confirmada,
+fecha de confirmación) que se carga una sola vez por proceso y se mantiene
+sincronizado con las señales de guardado/borrado de Asistente (ver signals.py).
+Las búsquedas se resuelven sin consultar la base de datos y la confirmación se
+hace con un único UPDATE condicional; antes de responder "ya confirmado" se
+relee la fila (una consulta por DNI), porque otro proceso pudo haber revertido
+la confirmación o borrado al asistente.
+
+confirmar_asistencia() es el único punto de confirmación: lo usan el check-in
+por DNI, el registro rápido in-situ y la acción del admin.
+confirmar_asistencias_lote() hace lo mismo para un lote de escaneos que una
+estación sin conexión acumuló, con un número fijo de consultas.
+"""
+import threading
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Case, When, Value, DateTimeField
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .estadisticas import registrar_confirmaciones
+from .models import Asistente, Certificado
+
+
+EntradaCheckIn = namedtuple('EntradaCheckIn', ['id', 'confirmada', 'fecha_confirmacion'])
+
+_CAMPOS_INDICE = ('id', 'dni', 'asistencia_confirmada', 'fecha_confirmacion')
+
+
+class IndiceCheckIn:
+    """
+    Índice DNI -> EntradaCheckIn de un proceso.
+
+    Cada worker de Gunicorn tiene su propia copia, por lo que el índice se trata
+    como una caché: si un DNI no aparece se consulta la base de datos, y si el
+    UPDATE condicional no afecta ninguna fila se vuelve a leer el estado real.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = None
+
+    @property
+    def cargado(self):
+        return self._entradas is not None
+
+    def cargar(self):
+        """Carga (o recarga) el índice completo con una sola consulta."""
+        entradas = {}
+        filas = Asistente.objects.exclude(dni__isnull=True).exclude(dni='').values_list(*_CAMPOS_INDICE)
+        for pk, dni, confirmada, fecha in filas.iterator(chunk_size=2000):
+            entradas[dni] = EntradaCheckIn(pk, confirmada, fecha)
+        with self._lock:
+            self._entradas = entradas
+        return len(entradas)
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas = None
+
+    def _asegurar_cargado(self):
+        if self._entradas is None:
+            self.cargar()
+
+    def buscar(self, dni):
+        """
+        Devuelve la EntradaCheckIn del DNI o None si no está registrado.
+        Solo consulta la base de datos si el DNI no está en el índice
+        (por ejemplo, si se registró desde otro proceso).
+        """
+        self._asegurar_cargado()
+        entrada = self._entradas.get(dni)
+        if entrada is None:
+            entrada = self.refrescar(dni)
+        return entrada
+
+    def refrescar(self, dni):
+        """Relee el estado del DNI desde la base de datos y actualiza el índice."""
+        fila = Asistente.objects.filter(dni=dni).values_list(*_CAMPOS_INDICE).first()
+        if fila is None:
+            self.eliminar(dni)
+            return None
+        pk, dni, confirmada, fecha = fila
+        entrada = EntradaCheckIn(pk, confirmada, fecha)
+        self.registrar(dni, entrada)
+        return entrada
+
+    def registrar(self, dni, entrada):
+        if not dni or self._entradas is None:
+            return
+        with self._lock:
+            self._entradas[dni] = entrada
+
+    def eliminar(self, dni):
+        if not dni or self._entradas is None:
+            return
+        with self._lock:
+            self._entradas.pop(dni, None)
+
+    def sincronizar(self, asistente, update_fields=None):
+        """Refleja en el índice el estado de una instancia recién guardada."""
+        previos = getattr(asistente, '_valores_previos', None) or {}
+        dni_anterior = previos.get('dni')
+        if dni_anterior and dni_anterior != asistente.dni and (update_fields is None or 'dni' in update_fields):
+            # Cambió el DNI: la clave vieja ya no corresponde a este asistente
+            with self._lock:
+                if self._entradas is not None and getattr(self._entradas.get(dni_anterior), 'id', None) == asistente.pk:
+                    del self._entradas[dni_anterior]
+        if asistente.dni:
+            self.registrar(asistente.dni, EntradaCheckIn(
+                asistente.pk, asistente.asistencia_confirmada, asistente.fecha_confirmacion
+            ))
+
+    def confirmar(self, dni):
+        """
+        Confirma la asistencia del DNI con confirmar_asistencia().
+
+        Devuelve una tupla (resultado, entrada) donde resultado es
+        'confirmado', 'ya_confirmado' o 'no_encontrado'.
+        """
+        entrada = self.buscar(dni)
+        if entrada is not None and entrada.confirmada:
+            # No responder "ya confirmado" solo con el índice: otro proceso pudo
+            # haber revertido la confirmación o borrado y vuelto a registrar al asistente
+            entrada = self.refrescar(dni)
+        # Un intento con el índice y, si estaba desactualizado (otro proceso
+        # confirmó o el asistente cambió), otro con el estado releído de la base
+        for _ in range(2):
+            if entrada is None:
+                return 'no_encontrado', None
+            if entrada.confirmada:
+                return 'ya_confirmado', entrada
+
+            fecha = timezone.now()
+            if confirmar_asistencia(entrada.id, dni=dni, fecha=fecha):
+                return 'confirmado', EntradaCheckIn(entrada.id, True, fecha)
+            entrada = self.refrescar(dni)
+
+        if entrada is None:
+            return 'no_encontrado', None
+        return 'ya_confirmado', entrada
+
+
+indice_checkin = IndiceCheckIn()
+
+
+def confirmar_asistencia(asistente_id, dni=None, fecha=None):
+    """
+    Confirma la asistencia con un compare-and-set sobre asistencia_confirmada.
+
+    No pasa por Asistente.save()/full_clean(): el UPDATE solo afecta la fila si
+    todavía no estaba confirmada, así que ante dos escaneos simultáneos gana uno
+    solo. El certificado de asistencia se crea en la misma transacción con un
+    INSERT que no hace nada si ya existía (restricción certificado_unico_por_tipo).
+
+    Devuelve True si esta llamada confirmó la asistencia, False si otra ya lo
+    había hecho.
+    """
+    fecha = fecha or timezone.now()
+    filtro = {'pk': asistente_id, 'asistencia_confirmada': False}
+    # Filtrar también por DNI: si el asistente cambió de DNI, una entrada vieja del índice no confirma a nadie
+    if dni:
+        filtro['dni'] = dni
+
+    with transaction.atomic():
+        actualizados = Asistente.objects.filter(**filtro).update(
+            asistencia_confirmada=True,
+            fecha_confirmacion=fecha,
+        )
+        if not actualizados:
+            return False
+        registrar_confirmaciones([fecha])
+        Certificado.objects.bulk_create([
+            Certificado(asistente_id=asistente_id, tipo_certificado=Certificado.TipoCertificado.ASISTENCIA)
+        ], ignore_conflicts=True)
+
+    # update() no dispara post_save: reflejar el cambio en el índice a mano
+    if dni:
+        indice_checkin.registrar(dni, EntradaCheckIn(asistente_id, True, fecha))
+    return True
+
+
+def _fecha_escaneo(valor, ahora):
+    """Interpreta la marca de tiempo del cliente; si falta, es inválida o está en el futuro se usa la del servidor."""
+    try:
+        fecha = parse_datetime(valor) if isinstance(valor, str) else None
+    except ValueError:  # Bien formada pero imposible, p. ej. '2025-13-45T10:00:00'
+        fecha = None
+    if fecha is None:
+        return ahora
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return min(fecha, ahora)
+
+
+def confirmar_asistencias_lote(escaneos):
+    """
+    Confirma un lote de escaneos [{'dni': ..., 'fecha': ISO-8601 opcional}, ...].
+
+    Resuelve todos los DNIs con una consulta dni__in, confirma los pendientes con
+    un único UPDATE (cada uno con la fecha en que fue escaneado) y crea con un
+    INSERT en bloque, que ignora los ya existentes, los certificados que falten.
+    Devuelve un resultado por DNI, en el
+    orden en que aparecieron en el lote.
+    """
+    ahora = timezone.now()
+    fechas = {}
+    for escaneo in escaneos:
+        dni = str(escaneo.get('dni') or '').strip()
+        if not dni:
+            continue
+        fecha = _fecha_escaneo(escaneo.get('fecha'), ahora)
+        # Si el mismo DNI se escaneó dos veces vale el primer escaneo
+        if dni not in fechas or fecha < fechas[dni]:
+            fechas[dni] = fecha
+
+    resultados = {dni: {'dni': dni, 'resultado': 'no_encontrado'} for dni in fechas}
+    if not fechas:
+        return []
+
+    with transaction.atomic():
+        filas = list(
+            Asistente.objects.select_for_update()
+            .filter(dni__in=list(fechas))
+            .values_list(*_CAMPOS_INDICE)
+        )
+        pendientes = {}
+        for pk, dni, confirmada, fecha_confirmacion in filas:
+            if confirmada:
+                resultados[dni].update(resultado='ya_confirmado', fecha_confirmacion=fecha_confirmacion)
+                indice_checkin.registrar(dni, EntradaCheckIn(pk, True, fecha_confirmacion))
+            else:
+                pendientes[pk] = dni
+
+        if pendientes:
+            Asistente.objects.filter(pk__in=list(pendientes), asistencia_confirmada=False).update(
+                asistencia_confirmada=True,
+                fecha_confirmacion=Case(
+                    *[When(pk=pk, then=Value(fechas[dni])) for pk, dni in pendientes.items()],
+                    output_field=DateTimeField(),
+                ),
+            )
+            registrar_confirmaciones(fechas[dni] for dni in pendientes.values())
+            Certificado.objects.bulk_create([
+                Certificado(asistente_id=pk, tipo_certificado=Certificado.TipoCertificado.ASISTENCIA)
+                for pk in pendientes
+            ], ignore_conflicts=True)
+
+    for pk, dni in pendientes.items():
+        resultados[dni].update(resultado='confirmado', fecha_confirmacion=fechas[dni])
+        indice_checkin.registrar(dni, EntradaCheckIn(pk, True, fechas[dni]))
+
+    return list(resultados.values())
@@ -0,0 +1,180 @@
+"""
+Cola de salida de emails.
+
+Las vistas y las acciones del admin llaman a encolar_emails(), que solo crea
+registros EnvioEmail con un mismo lote y vuelve enseguida. El comando
+`procesar_emails` los envía con procesar_cola(): reclama tandas de pendientes,
+las reparte entre varios hilos (cada uno con su propia conexión SMTP) y
+reprograma los que fallan con espera exponencial hasta agotar los intentos.
+
+El estado de cada email se guarda apenas se envía, así que si el worker se cae
+se retoma donde quedó: los que quedaron "enviando" más de TIEMPO_RECLAMO vuelven
+a la cola.
+"""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Certificado, EnvioEmail
+from .email import EnviadorEmails, send_bulk_confirmation_email, send_certificate_email, send_dni_update_email
+
+
+MAX_INTENTOS = getattr(settings, 'EMAIL_COLA_MAX_INTENTOS', 5)
+ESPERA_BASE = timedelta(seconds=30)
+# Un email "enviando" por más tiempo que esto se considera abandonado por un worker caído
+TIEMPO_RECLAMO = timedelta(minutes=15)
+TAMANIO_TANDA = 200
+MAX_FALLIDOS_RESUMEN = 100
+
+
+def encolar_emails(asistentes, tipo, contexto=None, lote=None):
+    """
+    Crea un EnvioEmail por asistente y devuelve (lote, cantidad).
+    No envía nada: de eso se encarga el comando `procesar_emails`.
+    """
+    lote = lote or uuid.uuid4()
+    envios = [
+        EnvioEmail(lote=lote, tipo=tipo, destinatario=email, asistente_id=pk, contexto=contexto or {})
+        for pk, email in asistentes.values_list('id', 'email').iterator(chunk_size=2000)
+    ]
+    EnvioEmail.objects.bulk_create(envios, batch_size=500)
+    return lote, len(envios)
+
+
+def resumen_lote(lote):
+    """Cantidad de emails del lote por estado y los últimos errores. None si el lote no existe."""
+    conteos = dict(
+        EnvioEmail.objects.filter(lote=lote).order_by().values_list('estado').annotate(total=Count('id'))
+    )
+    total = sum(conteos.values())
+    if not total:
+        return None
+    pendientes = conteos.get(EnvioEmail.Estado.PENDIENTE, 0) + conteos.get(EnvioEmail.Estado.ENVIANDO, 0)
+    fallidos = (
+        EnvioEmail.objects.filter(lote=lote, estado=EnvioEmail.Estado.ERROR)
+        .values('destinatario', 'intentos', 'ultimo_error')[:MAX_FALLIDOS_RESUMEN]
+    )
+    return {
+        'lote': str(lote),
+        'total': total,
+        'pendientes': pendientes,
+        'enviados': conteos.get(EnvioEmail.Estado.ENVIADO, 0),
+        'errores': conteos.get(EnvioEmail.Estado.ERROR, 0),
+        'completado': pendientes == 0,
+        'progreso': round(100 * (total - pendientes) / total, 1),
+        'fallidos': list(fallidos),
+    }
+
+
+def _reclamar(cantidad, lote=None):
+    """Marca como ENVIANDO hasta `cantidad` emails pendientes y devuelve sus IDs."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        # Los que un worker caído dejó a medio enviar vuelven a la cola
+        EnvioEmail.objects.filter(estado=EnvioEmail.Estado.ENVIANDO, proximo_intento__lte=ahora).update(
+            estado=EnvioEmail.Estado.PENDIENTE
+        )
+        pendientes = EnvioEmail.objects.select_for_update(skip_locked=True).filter(
+            estado=EnvioEmail.Estado.PENDIENTE, proximo_intento__lte=ahora
+        )
+        if lote:
+            pendientes = pendientes.filter(lote=lote)
+        ids = list(pendientes.order_by('proximo_intento', 'id').values_list('id', flat=True)[:cantidad])
+        # Mientras está ENVIANDO, proximo_intento indica cuándo darlo por abandonado
+        EnvioEmail.objects.filter(pk__in=ids).update(
+            estado=EnvioEmail.Estado.ENVIANDO, proximo_intento=ahora + TIEMPO_RECLAMO
+        )
+    return ids
+
+
+def _enviar(envio, enviador):
+    asistente = envio.asistente
+    if asistente is None:
+        raise ValueError("El asistente ya no existe")
+
+    if envio.tipo == EnvioEmail.Tipo.CERTIFICADO:
+        certificado, _ = Certificado.objects.get_or_create(
+            asistente=asistente,
+            tipo_certificado=Certificado.TipoCertificado.ASISTENCIA
+        )
+        send_certificate_email(certificado, enviador=enviador)
+    elif envio.tipo == EnvioEmail.Tipo.SOLICITUD_DNI:
+        # Pudo haberse enviado desde otro lote mientras este esperaba
+        if not asistente.dni_email_sent:
+            send_dni_update_email(asistente, enviador=enviador)
+    else:
+        send_bulk_confirmation_email(
+            asistente,
+            es_carga_masiva=envio.tipo == EnvioEmail.Tipo.CONFIRMACION,
+            es_recordatorio=envio.tipo == EnvioEmail.Tipo.RECORDATORIO,
+            fecha_evento=envio.contexto.get('fecha_evento'),
+            enviador=enviador,
+            lanzar_errores=True,
+        )
+
+
+def _registrar_fallo(envio, error):
+    intentos = envio.intentos + 1
+    if intentos >= MAX_INTENTOS:
+        estado, proximo = EnvioEmail.Estado.ERROR, timezone.now()
+    else:
+        estado, proximo = EnvioEmail.Estado.PENDIENTE, timezone.now() + ESPERA_BASE * 2 ** (intentos - 1)
+    EnvioEmail.objects.filter(pk=envio.pk).update(
+        estado=estado, intentos=intentos, ultimo_error=str(error)[:1000], proximo_intento=proximo
+    )
+
+
+def _procesar_ids(ids):
+    """Envía los emails dados por una sola conexión SMTP. Devuelve (enviados, errores)."""
+    enviados = errores = 0
+    with EnviadorEmails() as enviador:
+        for envio in EnvioEmail.objects.select_related('asistente').filter(pk__in=ids):
+            try:
+                _enviar(envio, enviador)
+            except Exception as e:
+                _registrar_fallo(envio, e)
+                errores += 1
+                continue
+            EnvioEmail.objects.filter(pk=envio.pk).update(
+                estado=EnvioEmail.Estado.ENVIADO, intentos=F('intentos') + 1,
+                ultimo_error='', fecha_envio=timezone.now()
+            )
+            enviados += 1
+    return enviados, errores
+
+
+def _procesar_ids_en_hilo(ids):
+    try:
+        return _procesar_ids(ids)
+    finally:
+        # Cada hilo abre su propia conexión a la base; cerrarla al terminar
+        connection.close()
+
+
+def procesar_cola(hilos=4, lote=None, log=print):
+    """
+    Envía todos los emails pendientes (o solo los del lote dado) repartiéndolos
+    entre `hilos` conexiones SMTP concurrentes. Los que fallan quedan
+    reprogramados para más tarde. Devuelve (enviados, errores).
+    """
+    total_enviados = total_errores = 0
+    while True:
+        ids = _reclamar(TAMANIO_TANDA, lote=lote)
+        if not ids:
+            break
+        if hilos <= 1:
+            resultados = [_procesar_ids(ids)]
+        else:
+            with ThreadPoolExecutor(max_workers=hilos) as executor:
+                resultados = list(executor.map(_procesar_ids_en_hilo, [ids[i::hilos] for i in range(hilos)]))
+        enviados = sum(r[0] for r in resultados)
+        errores = sum(r[1] for r in resultados)
+        total_enviados += enviados
+        total_errores += errores
+        log(f"[INFO] Tanda de {len(ids)} emails: {enviados} enviados, {errores} con error")
+    return total_enviados, total_errores
@@ -1,11 +1,121 @@
 import qrcode
-from django.core.mail import EmailMultiAlternatives
+import smtplib
+import time
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.conf import settings
 import io
 from xhtml2pdf import pisa
 from datetime import date
+from .plantillas_email import registro_plantillas_email, CAMPOS_DESTINATARIO
+
+
+class EnviadorEmails:
+    """
+    Envía muchos emails reutilizando una sola conexión SMTP.
+
+    Se usa como context manager en los envíos masivos:
+
+        with EnviadorEmails() as enviador:
+            for asistente in asistentes:
+                send_bulk_confirmation_email(asistente, enviador=enviador)
+
+    La conexión se abre con el primer mensaje y se renueva cada
+    EMAIL_MENSAJES_POR_CONEXION mensajes (Gmail corta las sesiones largas).
+    Si el servidor cierra la conexión o falla un envío, se reconecta y se
+    reintenta ese mensaje una vez. EMAIL_LIMITE_POR_SEGUNDO limita el ritmo
+    de envío (0 = sin límite).
+    """
+
+    def __init__(self, mensajes_por_conexion=None, limite_por_segundo=None, connection=None):
+        self.mensajes_por_conexion = mensajes_por_conexion or getattr(settings, 'EMAIL_MENSAJES_POR_CONEXION', 100)
+        limite = getattr(settings, 'EMAIL_LIMITE_POR_SEGUNDO', 0) if limite_por_segundo is None else limite_por_segundo
+        self.intervalo = 1.0 / limite if limite else 0
+        self.connection = connection or get_connection(fail_silently=False)
+        self.enviados = 0
+        self.conexiones = 0
+        self._abierta = False
+        self._en_conexion = 0
+        self._ultimo_envio = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+    def abrir(self):
+        self.connection.open()
+        self._abierta = True
+        self._en_conexion = 0
+        self.conexiones += 1
+
+    def cerrar(self):
+        if not self._abierta:
+            return
+        self._abierta = False
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+    def _esperar_turno(self):
+        if self.intervalo and self._ultimo_envio is not None:
+            espera = self._ultimo_envio + self.intervalo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+        self._ultimo_envio = time.monotonic()
+
+    def enviar(self, mensaje):
+        """Envía un EmailMessage por la conexión compartida. Si también falla al reintentar, lanza la excepción."""
+        if self._abierta and self._en_conexion >= self.mensajes_por_conexion:
+            self.cerrar()
+        if not self._abierta:
+            self.abrir()
+        self._esperar_turno()
+        mensaje.connection = self.connection
+        try:
+            self.connection.send_messages([mensaje])
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"[INFO] Reconectando al servidor SMTP tras un error: {e}")
+            self.cerrar()
+            self.abrir()
+            self.connection.send_messages([mensaje])
+        self._en_conexion += 1
+        self.enviados += 1
+
+
+def _email_con_plantilla(asunto, destinatario, context, template_name='api/email/confirmacion.html'):
+    """
+    Arma el email (HTML, texto plano y logo embebido) a partir de la plantilla.
+    Plantilla compilada y logo cacheados: solo se completan los datos del
+    destinatario (nombre, email y tipo de inscripción).
+    """
+    comun = {clave: valor for clave, valor in context.items() if clave not in CAMPOS_DESTINATARIO}
+    plantilla = registro_plantillas_email.compilar(template_name, comun)
+    html_content, text_content = plantilla.renderizar(context)
+
+    email = EmailMultiAlternatives(
+        subject=asunto,
+        body=text_content,
+        from_email=f"Congreso UNAB <{settings.EMAIL_HOST_USER}>",
+        to=[destinatario],
+    )
+    email.attach_alternative(html_content, "text/html")
+    logo_img = registro_plantillas_email.logo()
+    if logo_img is not None:
+        email.attach(logo_img)
+    return email
+
+
+def _enviar(email, enviador=None):
+    """Envía por el EnviadorEmails compartido si lo hay; si no, con una conexión propia."""
+    if enviador is not None:
+        enviador.enviar(email)
+    else:
+        email.send()
+
 def send_empresa_confirmation_email(empresa_instance):
     # Contexto para la plantilla de email
     context = {
@@ -20,28 +130,8 @@ def send_empresa_confirmation_email(empresa_instance):
     'google_calendar_url': "https://www.google.com/calendar/render?action=TEMPLATE&text=Congreso+de+Logística+UNAB&dates=20251115T120000Z/20251115T210000Z&details=Congreso+de+Logística+UNAB+2025&location=Campus+UNAB,+Buenos+Aires"
     }
 
-    # Renderizar la plantilla HTML
-    html_content = render_to_string('api/email/confirmacion.html', context)
-    text_content = strip_tags(html_content)
-
-    import os
-    from email.mime.image import MIMEImage
-    logo_env = os.getenv('LOGO_CONGRESO_PATH', 'media/logo.png')
-    logo_path = os.path.join(settings.BASE_DIR, logo_env)
-
-    email = EmailMultiAlternatives(
-        subject='Confirmación de Registro Empresarial - Congreso de Logística UNAB',
-        body=text_content,
-        from_email=f"Congreso UNAB <{settings.EMAIL_HOST_USER}>",
-        to=[empresa_instance.email_contacto],
-    )
-    email.attach_alternative(html_content, "text/html")
-    if os.path.exists(logo_path):
-        with open(logo_path, 'rb') as f:
-            logo_img = MIMEImage(f.read(), _subtype="png")
-            logo_img.add_header('Content-ID', '<logo_congreso>')
-            logo_img.add_header('Content-Disposition', 'inline', filename='logo-congreso.png')
-            email.attach(logo_img)
+    # Renderizar la plantilla HTML (compilada y con el logo cacheados)
+    email = _email_con_plantilla('Confirmación de Registro Empresarial - Congreso de Logística UNAB', empresa_instance.email_contacto, context)
     email.send()
 
 def send_confirmation_email(inscripcion_instance):
@@ -60,39 +150,12 @@ def send_confirmation_email(inscripcion_instance):
         'google_calendar_url': "https://www.google.com/calendar/render?action=TEMPLATE&text=Congreso+de+Logística+UNAB&dates=20251115T120000Z/20251115T210000Z&details=Congreso+de+Logística+UNAB+2025&location=Campus+UNAB,+Buenos+Aires"
     }
 
-    # Renderizar la plantilla HTML
-    html_content = render_to_string('api/email/confirmacion.html', context)
-    text_content = strip_tags(html_content) # Versión de texto plano
-
-    import os
-    from email.mime.image import MIMEImage
-
-    logo_env = os.getenv('LOGO_CONGRESO_PATH', 'media/logo.png')
-    logo_path = os.path.join(settings.BASE_DIR, logo_env)
-
-    # Crear el email con HTML y texto plano
-    email = EmailMultiAlternatives(
-        subject='Confirmación de Inscripción al Congreso de Logística UNAB',
-        body=text_content,
-        from_email=f"Congreso UNAB <{settings.EMAIL_HOST_USER}>",
-        to=[asistente.email],
-    )
-    email.attach_alternative(html_content, "text/html")
-
-    # Adjuntar el logo embebido
-    if os.path.exists(logo_path):
-        with open(logo_path, 'rb') as f:
-            logo_img = MIMEImage(f.read(), _subtype="png")
-            logo_img.add_header('Content-ID', '<logo_congreso>')
-            logo_img.add_header('Content-Disposition', 'inline', filename='logo-congreso.png')
-            email.attach(logo_img)
-        print(f"[INFO] Logo embebido correctamente: {logo_path}")
-    else:
-        print(f"[ERROR] No se encontró el logo en {logo_path}")
+    # Renderizar la plantilla HTML (compilada y con el logo cacheados)
+    email = _email_con_plantilla('Confirmación de Inscripción al Congreso de Logística UNAB', asistente.email, context)
 
     email.send()
 
-def send_individual_confirmation_email(asistente):
+def send_individual_confirmation_email(asistente, enviador=None):
     """
     Envía email de confirmación a un asistente individual.
     """
@@ -125,30 +188,9 @@ def send_individual_confirmation_email(asistente):
             'google_calendar_url': "https://www.google.com/calendar/render?action=TEMPLATE&text=Congreso+de+Logística+UNAB&dates=20251115T120000Z/20251115T210000Z&details=Congreso+de+Logística+UNAB+2025&location=Campus+UNAB,+Buenos+Aires"
         }
         
-        html_content = render_to_string('api/email/confirmacion.html', context)
-        text_content = strip_tags(html_content)
-        
-        import os
-        from email.mime.image import MIMEImage
-        logo_env = os.getenv('LOGO_CONGRESO_PATH', 'media/logo.png')
-        logo_path = os.path.join(settings.BASE_DIR, logo_env)
+        email = _email_con_plantilla('Confirmación de Inscripción al Congreso de Logística UNAB', asistente.email, context)
         
-        email = EmailMultiAlternatives(
-            subject='Confirmación de Inscripción al Congreso de Logística UNAB',
-            body=text_content,
-            from_email=f"Congreso UNAB <{settings.EMAIL_HOST_USER}>",
-            to=[asistente.email],
-        )
-        email.attach_alternative(html_content, "text/html")
-        
-        if os.path.exists(logo_path):
-            with open(logo_path, 'rb') as f:
-                logo_img = MIMEImage(f.read(), _subtype="png")
-                logo_img.add_header('Content-ID', '<logo_congreso>')
-                logo_img.add_header('Content-Disposition', 'inline', filename='logo-congreso.png')
-                email.attach(logo_img)
-        
-        email.send()
+        _enviar(email, enviador)
         print(f"[INFO] Email de confirmación enviado a: {asistente.email}")
         return True
         
@@ -156,7 +198,7 @@ def send_individual_confirmation_email(asistente):
         print(f"[ERROR] Error enviando email a {asistente.email}: {e}")
         return False
 
-def send_bulk_confirmation_email(asistente, es_carga_masiva=False, es_recordatorio=False, fecha_evento=None):
+def send_bulk_confirmation_email(asistente, es_carga_masiva=False, es_recordatorio=False, fecha_evento=None, enviador=None, lanzar_errores=False):
     """
     Envía email de confirmación específico para registros cargados masivamente.
     Incluye solicitud de datos faltantes si es necesario.
@@ -166,6 +208,8 @@ def send_bulk_confirmation_email(asistente, es_carga_masiva=False, es_recordator
         es_carga_masiva: Boolean - Si es parte de una carga masiva
         es_recordatorio: Boolean - Si es un email de recordatorio
         fecha_evento: String - Fecha del evento (formato YYYY-MM-DD), default usa fecha configurada
+        enviador: EnviadorEmails opcional para reutilizar la conexión SMTP en envíos masivos
+        lanzar_errores: Boolean - Propagar la excepción en lugar de devolver False (lo usa la cola de emails)
     """
     try:
         # Configurar fecha del evento
@@ -225,87 +269,71 @@ def send_bulk_confirmation_email(asistente, es_carga_masiva=False, es_recordator
         # Usar template específico para carga masiva si hay datos faltantes
         template_name = 'api/email/confirmacion_masiva.html' if es_carga_masiva and datos_faltantes else 'api/email/confirmacion.html'
         
-        html_content = render_to_string(template_name, context)
-        text_content = strip_tags(html_content)
-        
-        import os
-        from email.mime.image import MIMEImage
-        logo_env = os.getenv('LOGO_CONGRESO_PATH', 'media/logo.png')
-        logo_path = os.path.join(settings.BASE_DIR, logo_env)
-        
         subject_suffix = " - Completar datos faltantes" if datos_faltantes else ""
-        email = EmailMultiAlternatives(
-            subject=f'Confirmación de Inscripción al Congreso de Logística UNAB{subject_suffix}',
-            body=text_content,
-            from_email=f"Congreso UNAB <{settings.EMAIL_HOST_USER}>",
-            to=[asistente.email],
-        )
-        email.attach_alternative(html_content, "text/html")
+        email = _email_con_plantilla(f'Confirmación de Inscripción al Congreso de Logística UNAB{subject_suffix}', asistente.email, context, template_name=template_name)
         
-        if os.path.exists(logo_path):
-            with open(logo_path, 'rb') as f:
-                logo_img = MIMEImage(f.read(), _subtype="png")
-                logo_img.add_header('Content-ID', '<logo_congreso>')
-                logo_img.add_header('Content-Disposition', 'inline', filename='logo-congreso.png')
-                email.attach(logo_img)
-        
-        email.send()
+        _enviar(email, enviador)
         print(f"[INFO] Email de confirmación {'masiva' if es_carga_masiva else 'individual'} enviado a: {asistente.email}")
         return True
         
     except Exception as e:
         print(f"[ERROR] Error enviando email a {asistente.email}: {e}")
+        if lanzar_errores:
+            raise
         return False
 
-def send_group_confirmation_emails(representante):
+def _context_grupo(asistente, tipo_inscripcion):
+    return {
+        'asistente_nombre': asistente.nombre_completo,
+        'asistente_email': asistente.email,
+        'tipo_inscripcion': tipo_inscripcion,
+        'empresa': None,
+        'year': 2025,
+        'evento_nombre': 'Congreso de Logística UNAB',
+        'evento_fecha': '15 de Noviembre de 2025',
+        'evento_hora': '09:00',
+        'evento_ubicacion': 'Campus UNAB, Blas Parera 132, Burzaco, Buenos Aires',
+        'google_calendar_url': "https://www.google.com/calendar/render?action=TEMPLATE&text=Congreso+de+Logística+UNAB&dates=20251115T120000Z/20251115T210000Z&details=Congreso+de+Logística+UNAB+2025&location=Campus+UNAB,+Buenos+Aires"
+    }
+
+def send_group_representative_email(representante, enviador=None):
+    """Envía la confirmación grupal al representante. Lanza la excepción si falla."""
+    email_representante = _email_con_plantilla(
+        'Confirmación de Inscripción Grupal - Congreso de Logística UNAB',
+        representante.email,
+        _context_grupo(representante, "Representante de Grupo")
+    )
+    _enviar(email_representante, enviador)
+    print(f"[INFO] Email enviado al representante: {representante.email}")
+
+def send_group_member_email(miembro, representante, enviador=None):
+    """Envía la confirmación a un miembro del grupo. Lanza la excepción si falla."""
+    email_miembro = _email_con_plantilla(
+        'Confirmación de Inscripción al Congreso de Logística UNAB',
+        miembro.email,
+        _context_grupo(miembro, f"Miembro del grupo '{representante.group_name}'")
+    )
+    _enviar(email_miembro, enviador)
+    print(f"[INFO] Email enviado al miembro: {miembro.email}")
+
+def send_group_confirmation_emails(representante, enviador=None):
     """
     Envía emails de confirmación al representante del grupo y a todos sus miembros.
+    Todos los emails del grupo salen por una misma conexión SMTP.
+    Para no demorar el registro, el alta de grupos usa en cambio
+    pool_emails.despachar_confirmaciones_grupo(), que envía en paralelo tras el commit.
     """
+    if enviador is None:
+        with EnviadorEmails() as enviador:
+            return send_group_confirmation_emails(representante, enviador=enviador)
+
     emails_enviados = []
     emails_fallidos = []
     
     try:
         # Enviar email al representante
-        context_representante = {
-            'asistente_nombre': representante.nombre_completo,
-            'asistente_email': representante.email,
-            'tipo_inscripcion': "Representante de Grupo",
-            'empresa': None,
-            'year': 2025,
-            'evento_nombre': 'Congreso de Logística UNAB',
-            'evento_fecha': '15 de Noviembre de 2025',
-            'evento_hora': '09:00',
-            'evento_ubicacion': 'Campus UNAB, Blas Parera 132, Burzaco, Buenos Aires',
-            'google_calendar_url': "https://www.google.com/calendar/render?action=TEMPLATE&text=Congreso+de+Logística+UNAB&dates=20251115T120000Z/20251115T210000Z&details=Congreso+de+Logística+UNAB+2025&location=Campus+UNAB,+Buenos+Aires"
-        }
-        
-        html_content = render_to_string('api/email/confirmacion.html', context_representante)
-        text_content = strip_tags(html_content)
-        
-        import os
-        from email.mime.image import MIMEImage
-        logo_env = os.getenv('LOGO_CONGRESO_PATH', 'media/logo.png')
-        logo_path = os.path.join(settings.BASE_DIR, logo_env)
-        
-        email_representante = EmailMultiAlternatives(
-            subject='Confirmación de Inscripción Grupal - Congreso de Logística UNAB',
-            body=text_content,
-            from_email=f"Congreso UNAB <{settings.EMAIL_HOST_USER}>",
-            to=[representante.email],
-        )
-        email_representante.attach_alternative(html_content, "text/html")
-        
-        if os.path.exists(logo_path):
-            with open(logo_path, 'rb') as f:
-                logo_img = MIMEImage(f.read(), _subtype="png")
-                logo_img.add_header('Content-ID', '<logo_congreso>')
-                logo_img.add_header('Content-Disposition', 'inline', filename='logo-congreso.png')
-                email_representante.attach(logo_img)
-        
-        email_representante.send()
+        send_group_representative_email(representante, enviador=enviador)
         emails_enviados.append(representante.email)
-        print(f"[INFO] Email enviado al representante: {representante.email}")
-        
     except Exception as e:
         emails_fallidos.append(f"{representante.email}: {str(e)}")
         print(f"[ERROR] Error enviando email al representante {representante.email}: {e}")
@@ -314,41 +342,8 @@ def send_group_confirmation_emails(representante):
     miembros = representante.get_miembros_grupo()
     for miembro in miembros:
         try:
-            context_miembro = {
-                'asistente_nombre': miembro.nombre_completo,
-                'asistente_email': miembro.email,
-                'tipo_inscripcion': f"Miembro del grupo '{representante.group_name}'",
-                'empresa': None,
-                'year': 2025,
-                'evento_nombre': 'Congreso de Logística UNAB',
-                'evento_fecha': '15 de Noviembre de 2025',
-                'evento_hora': '09:00',
-                'evento_ubicacion': 'Campus UNAB, Blas Parera 132, Burzaco, Buenos Aires',
-                'google_calendar_url': "https://www.google.com/calendar/render?action=TEMPLATE&text=Congreso+de+Logística+UNAB&dates=20251115T120000Z/20251115T210000Z&details=Congreso+de+Logística+UNAB+2025&location=Campus+UNAB,+Buenos+Aires"
-            }
-            
-            html_content = render_to_string('api/email/confirmacion.html', context_miembro)
-            text_content = strip_tags(html_content)
-            
-            email_miembro = EmailMultiAlternatives(
-                subject='Confirmación de Inscripción al Congreso de Logística UNAB',
-                body=text_content,
-                from_email=f"Congreso UNAB <{settings.EMAIL_HOST_USER}>",
-                to=[miembro.email],
-            )
-            email_miembro.attach_alternative(html_content, "text/html")
-            
-            if os.path.exists(logo_path):
-                with open(logo_path, 'rb') as f:
-                    logo_img = MIMEImage(f.read(), _subtype="png")
-                    logo_img.add_header('Content-ID', '<logo_congreso>')
-                    logo_img.add_header('Content-Disposition', 'inline', filename='logo-congreso.png')
-                    email_miembro.attach(logo_img)
-            
-            email_miembro.send()
+            send_group_member_email(miembro, representante, enviador=enviador)
             emails_enviados.append(miembro.email)
-            print(f"[INFO] Email enviado al miembro: {miembro.email}")
-            
         except Exception as e:
             emails_fallidos.append(f"{miembro.email}: {str(e)}")
             print(f"[ERROR] Error enviando email al miembro {miembro.email}: {e}")
@@ -371,7 +366,34 @@ def send_group_confirmation_emails(representante):
         'total_fallidos': total_fallidos
     }
 
-def send_certificate_email(certificado_instance):
+def send_dni_update_email(asistente, enviador=None):
+    """
+    Envía al asistente el enlace para que actualice su DNI y lo marca como enviado.
+    """
+    from django.utils import timezone
+
+    # Construir el enlace
+    base_url = getattr(settings, 'FRONTEND_URL', 'https://congresologistica.unab.edu.ar')
+    enlace = f"{base_url}/actualizar-dni?token={asistente.dni_update_token}"
+
+    # Renderizar el template
+    html_content = render_to_string('email/dni_update.html', {
+        'nombre': asistente.first_name,
+        'enlace': enlace
+    })
+
+    # Crear y enviar el email
+    subject = 'Actualización de DNI - Congreso de Logística UNaB 2025'
+    email = EmailMultiAlternatives(subject, '', settings.DEFAULT_FROM_EMAIL, [asistente.email])
+    email.attach_alternative(html_content, "text/html")
+    _enviar(email, enviador)
+
+    # MARCAR como enviado
+    asistente.dni_email_sent = True
+    asistente.dni_email_sent_date = timezone.now()
+    asistente.save(update_fields=['dni_email_sent', 'dni_email_sent_date'])
+
+def send_certificate_email(certificado_instance, enviador=None):
     asistente = certificado_instance.asistente
 
     # Contexto para la plantilla del certificado
@@ -381,8 +403,11 @@ def send_certificate_email(certificado_instance):
     }
 
     try:
-        # Generar el PDF usando el método del modelo Certificado (imagen base personalizada)
-        certificado_instance.generar_pdf(save=True)
+        # Generar el PDF usando el método del modelo Certificado (imagen base personalizada),
+        # salvo que ya lo haya generado el comando generar_certificados (Asistente.save() lo descarta si
+        # después se corrige el nombre)
+        if not certificado_instance.pdf_generado:
+            certificado_instance.generar_pdf(save=True)
         # Leer el PDF generado
         pdf_file = certificado_instance.pdf_generado.read()
         # Crear el email
@@ -398,7 +423,7 @@ def send_certificate_email(certificado_instance):
             'application/pdf'
         )
         # Enviar el email
-        email.send(fail_silently=False)
+        _enviar(email, enviador)
         print(f"Certificado enviado exitosamente a {asistente.email}")
         
     except Exception as e:
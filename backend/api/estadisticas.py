@@ -0,0 +1,190 @@
+"""
+Estadísticas de asistencia precalculadas.
+
+En lugar de contar la tabla de asistentes en cada consulta se mantienen
+contadores (ContadorEstadistica) que se actualizan en el momento, con
+UPDATE ... SET valor = valor + n, en cada alta, baja, modificación y
+confirmación:
+
+- 'registrados' y 'confirmados'
+- 'perfil:<tipo de perfil>': registrados por tipo de perfil
+- 'partido:<partido>': registrados por partido del grupo
+- 'hora:<AAAA-MM-DDTHH>': confirmaciones por hora (hora local)
+
+Los guardados con save() y los borrados se cuentan con las señales de
+signals.py; los caminos que no pasan por save() (bulk_create de la carga
+masiva y de los grupos, los UPDATE del check-in) llaman a registrar_altas() o
+registrar_confirmaciones(). Los deltas se calculan en el momento pero se
+aplican después del commit, fuera de la transacción de la confirmación: así
+los contadores más usados ('confirmados', la hora actual) se bloquean solo
+durante su propio UPDATE y los check-ins simultáneos no se traban entre sí.
+
+resumen() arma la respuesta de /api/estadisticas/ con una sola consulta y la
+guarda ESTADISTICAS_CACHE_SEGUNDOS en la caché, así que las pantallas de la
+entrada pueden consultarla cada pocos segundos. Si los contadores no existen
+todavía (o se sospecha que se desfasaron) recalcular() los reconstruye
+recorriendo la tabla una vez; lo hace también el comando
+`recalcular_estadisticas`.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Asistente, ContadorEstadistica
+
+
+CAMPOS = ('profile_type', 'group_municipality', 'asistencia_confirmada', 'fecha_confirmacion')
+CLAVE_CACHE = 'estadisticas:resumen'
+
+
+def claves_confirmacion(fecha_confirmacion):
+    claves = Counter({'confirmados': 1})
+    if fecha_confirmacion:
+        claves[f'hora:{timezone.localtime(fecha_confirmacion):%Y-%m-%dT%H}'] += 1
+    return claves
+
+
+def claves_asistente(profile_type, group_municipality, asistencia_confirmada, fecha_confirmacion):
+    """Contadores en los que suma un asistente con estos valores."""
+    claves = Counter({'registrados': 1, f'perfil:{profile_type}': 1})
+    if group_municipality and group_municipality.strip():
+        claves[f'partido:{group_municipality.strip()}'] += 1
+    if asistencia_confirmada:
+        claves.update(claves_confirmacion(fecha_confirmacion))
+    return claves
+
+
+def _valores(asistente):
+    return [getattr(asistente, campo) for campo in CAMPOS]
+
+
+def _sumar_uno(clave, delta):
+    if ContadorEstadistica.objects.filter(clave=clave).update(valor=F('valor') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ContadorEstadistica.objects.create(clave=clave, valor=delta)
+    except IntegrityError:
+        # Lo creó otro pedido entre el UPDATE y el INSERT
+        ContadorEstadistica.objects.filter(clave=clave).update(valor=F('valor') + delta)
+
+
+def _aplicar(deltas):
+    """
+    Un UPDATE por valor de delta. Si falta algún contador (primera confirmación
+    de una hora, un partido nuevo) ese UPDATE se revierte y se suma clave por
+    clave, creando los que no existen.
+    """
+    por_delta = defaultdict(list)
+    for clave, delta in deltas.items():
+        por_delta[delta].append(clave)
+    for delta, claves in por_delta.items():
+        with transaction.atomic():
+            completo = ContadorEstadistica.objects.filter(clave__in=claves).update(valor=F('valor') + delta) == len(claves)
+            if not completo:
+                transaction.set_rollback(True)
+        if not completo:
+            for clave in claves:
+                _sumar_uno(clave, delta)
+
+
+def sumar(deltas):
+    """Suma cada delta a su contador después del commit de la transacción actual (ver el docstring del módulo)."""
+    deltas = {clave: delta for clave, delta in deltas.items() if delta}
+    if deltas:
+        # robust: un error en los contadores no debe hacer fallar un check-in ya confirmado
+        transaction.on_commit(lambda: _aplicar(deltas), robust=True)
+
+
+def registrar_altas(asistentes):
+    total = Counter()
+    for asistente in asistentes:
+        total.update(claves_asistente(*_valores(asistente)))
+    sumar(total)
+
+
+def registrar_baja(asistente):
+    sumar({clave: -cantidad for clave, cantidad in claves_asistente(*_valores(asistente)).items()})
+
+
+def registrar_cambio(previos, asistente, guardados=None):
+    """
+    Ajusta los contadores de un asistente modificado. `previos` son los valores
+    leídos de la base ({attname: valor}); si falta alguno no se puede saber qué
+    cambió. Con `guardados` (el update_fields del save) solo cuentan esos campos.
+    """
+    if previos is None or any(campo not in previos for campo in CAMPOS):
+        return
+    antes = [previos[campo] for campo in CAMPOS]
+    despues = [
+        getattr(asistente, campo) if guardados is None or campo in guardados else previos[campo] for campo in CAMPOS
+    ]
+    if antes == despues:
+        return
+    deltas = claves_asistente(*despues)
+    deltas.subtract(claves_asistente(*antes))
+    sumar(deltas)
+
+
+def registrar_confirmaciones(fechas):
+    """Confirmaciones hechas con UPDATE (check-in): una fecha de confirmación por asistente."""
+    total = Counter()
+    for fecha in fechas:
+        total.update(claves_confirmacion(fecha))
+    sumar(total)
+
+
+def recalcular():
+    """Reconstruye todos los contadores recorriendo la tabla de asistentes una vez."""
+    total = Counter({'registrados': 0, 'confirmados': 0})
+    for valores in Asistente.objects.values_list(*CAMPOS).iterator(chunk_size=2000):
+        total.update(claves_asistente(*valores))
+    with transaction.atomic():
+        ContadorEstadistica.objects.all().delete()
+        ContadorEstadistica.objects.bulk_create(
+            [ContadorEstadistica(clave=clave, valor=valor) for clave, valor in total.items()]
+        )
+    cache.delete(CLAVE_CACHE)
+    return total
+
+
+def _agrupar(contadores, prefijo):
+    return {clave[len(prefijo):]: valor for clave, valor in contadores.items() if clave.startswith(prefijo) and valor}
+
+
+def resumen():
+    """Estadísticas para /api/estadisticas/, con una consulta cada ESTADISTICAS_CACHE_SEGUNDOS como máximo."""
+    segundos = settings.ESTADISTICAS_CACHE_SEGUNDOS
+    datos = cache.get(CLAVE_CACHE) if segundos else None
+    if datos is not None:
+        return datos
+
+    contadores = dict(ContadorEstadistica.objects.values_list('clave', 'valor'))
+    if 'registrados' not in contadores:
+        contadores = recalcular()
+
+    registrados = contadores.get('registrados', 0)
+    confirmados = contadores.get('confirmados', 0)
+    etiquetas = dict(Asistente.ProfileType.choices)
+    por_hora = _agrupar(contadores, 'hora:')
+    por_partido = _agrupar(contadores, 'partido:')
+    datos = {
+        'registrados': registrados,
+        'confirmados': confirmados,
+        'porcentaje_confirmados': round(100 * confirmados / registrados, 1) if registrados else 0.0,
+        'por_perfil': {
+            etiquetas.get(perfil, perfil): cantidad for perfil, cantidad in sorted(_agrupar(contadores, 'perfil:').items())
+        },
+        'confirmaciones_por_hora': [
+            {'hora': f'{hora}:00', 'confirmados': cantidad} for hora, cantidad in sorted(por_hora.items())
+        ],
+        'por_partido': dict(sorted(por_partido.items(), key=lambda item: (-item[1], item[0]))),
+        'actualizado': timezone.localtime().isoformat(),
+    }
+    if segundos:
+        cache.set(CLAVE_CACHE, datos, segundos)
+    return datos
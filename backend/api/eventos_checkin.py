@@ -0,0 +1,128 @@
+"""
+Eventos de check-in en vivo para los monitores de la entrada (Server-Sent Events).
+
+Cada confirmación de VerificarDNIView o RegistroRapidoView publica un evento
+chico (asistente, perfil, hora y origen) en un canal en memoria del proceso.
+El canal guarda los últimos CHECKIN_EVENTOS_BUFFER eventos en un buffer
+circular: un monitor que se conecta tarde, o que se reconecta con el header
+Last-Event-ID, recibe primero lo que se perdió y después los eventos nuevos a
+medida que llegan. Si se perdió más de lo que entra en el buffer recibe un
+evento 'desfasado' para que recargue el resumen de /api/estadisticas/.
+
+Cada monitor mantiene una única conexión abierta a /api/checkin/eventos/ que
+no consulta la base de datos: la vista es asíncrona y espera los eventos sin
+ocupar un thread, así que necesita servirse con ASGI (core/asgi.py, por
+ejemplo `uvicorn core.asgi:application`). Como el canal vive en el proceso,
+los check-ins y los monitores tienen que pasar por el mismo proceso de ASGI.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Asistente
+
+
+class CanalCheckIn:
+    """
+    Pub/sub en memoria con buffer circular de los últimos eventos.
+
+    publicar() se llama desde código síncrono (cualquier thread); los
+    suscriptores son corrutinas que esperan un asyncio.Event de su propio loop,
+    que se activa con call_soon_threadsafe.
+    """
+
+    def __init__(self, tamanio):
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=tamanio)
+        self._ultimo_id = 0
+        self._suscriptores = set()
+
+    @property
+    def ultimo_id(self):
+        return self._ultimo_id
+
+    def publicar(self, datos):
+        """Agrega el evento al buffer y despierta a los suscriptores; devuelve su id."""
+        with self._lock:
+            self._ultimo_id += 1
+            id_evento = self._ultimo_id
+            self._buffer.append((id_evento, datos))
+            suscriptores = list(self._suscriptores)
+        for loop, aviso in suscriptores:
+            try:
+                loop.call_soon_threadsafe(aviso.set)
+            except RuntimeError:  # El loop de ese suscriptor ya se cerró
+                pass
+        return id_evento
+
+    def desde(self, ultimo_id):
+        """
+        Eventos posteriores a ultimo_id como (eventos, desfasado); desfasado
+        indica que algunos ya salieron del buffer.
+        """
+        with self._lock:
+            if ultimo_id > self._ultimo_id:
+                # Id de antes de un reinicio del proceso: se reenvía lo que haya
+                ultimo_id = 0
+            eventos = [(id_evento, datos) for id_evento, datos in self._buffer if id_evento > ultimo_id]
+            primero = self._buffer[0][0] if self._buffer else self._ultimo_id + 1
+        return eventos, ultimo_id > 0 and primero > ultimo_id + 1
+
+    async def escuchar(self, ultimo_id=0, latido=None):
+        """
+        Genera los eventos posteriores a ultimo_id en formato SSE, sin terminar
+        nunca; cada `latido` segundos sin eventos envía un comentario para que
+        los proxies no corten la conexión.
+        """
+        latido = latido or settings.CHECKIN_EVENTOS_LATIDO
+        suscriptor = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._suscriptores.add(suscriptor)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                # Limpiar antes de leer: un evento publicado en el medio deja el aviso activo
+                suscriptor[1].clear()
+                eventos, desfasado = self.desde(ultimo_id)
+                if desfasado:
+                    yield 'event: desfasado\ndata: {}\n\n'
+                for id_evento, datos in eventos:
+                    yield f'id: {id_evento}\nevent: checkin\ndata: {json.dumps(datos)}\n\n'
+                    ultimo_id = id_evento
+                if eventos:
+                    continue
+                try:
+                    await asyncio.wait_for(suscriptor[1].wait(), timeout=latido)
+                except asyncio.TimeoutError:
+                    yield ': latido\n\n'
+        finally:
+            # El generador se cancela o se cierra cuando el monitor se desconecta
+            with self._lock:
+                self._suscriptores.discard(suscriptor)
+
+
+canal_checkin = CanalCheckIn(settings.CHECKIN_EVENTOS_BUFFER)
+
+# Columnas del asistente que necesita publicar_checkin()
+CAMPOS_EVENTO = ('id', 'first_name', 'last_name', 'profile_type', 'group_municipality')
+
+
+def publicar_checkin(asistente, fecha, origen):
+    """
+    Publica la confirmación después del commit de la transacción actual.
+    `asistente` es un dict con (al menos) las columnas de CAMPOS_EVENTO.
+    """
+    datos = {
+        'asistente_id': asistente['id'],
+        'nombre': f"{asistente['first_name']} {asistente['last_name']}",
+        'perfil': dict(Asistente.ProfileType.choices).get(asistente['profile_type'], asistente['profile_type']),
+        'partido': asistente['group_municipality'] or None,
+        'fecha': timezone.localtime(fecha).isoformat(),
+        'origen': origen,
+    }
+    transaction.on_commit(lambda: canal_checkin.publicar(datos))
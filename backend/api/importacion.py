@@ -0,0 +1,741 @@
+"""
+Motor de carga masiva de asistentes desde Excel/CSV.
+
+En lugar de recorrer el DataFrame fila por fila con dos exists() y un create()
+(con su full_clean()) por registro, el motor:
+
+1. Normaliza columnas, emails, DNIs y tipos de perfil con operaciones
+   vectorizadas de pandas (con el esquema y las reglas de normalizacion.py,
+   iguales para todos los formatos), y aplica las mismas validaciones que
+   Asistente.full_clean() (DNI de 8 dígitos, largos máximos, email válido).
+2. Detecta los duplicados dentro del archivo con duplicated() y los ya
+   registrados con una sola consulta por lote (ver altas.py), que compara los
+   emails sin distinguir mayúsculas.
+3. Inserta cada lote con bulk_create en su propia transacción, así que un
+   archivo grande no mantiene abierta una única transacción gigante.
+
+Los archivos se leen de a bloques con leer_por_bloques() (CSV con chunksize,
+xlsx con el lector read_only de openpyxl) y cada bloque se valida e inserta
+antes de leer el siguiente, así que la memoria usada no depende del tamaño del
+archivo. Los duplicados entre bloques los detecta la consulta a la base, porque
+el bloque anterior ya está insertado.
+
+El detalle por fila conserva el formato de cada endpoint: de eso se encargan
+las subclases de FormatoImportacion.
+
+Las vistas no importan dentro del request: guardan el archivo y crean un
+TrabajoImportacion, que el comando `procesar_importaciones` procesa con
+procesar_trabajo_importacion(). Los emails de confirmación se encolan en la
+cola de salida (ver cola_emails.py) en lugar de enviarse durante la importación.
+
+Con modo UPSERT, las filas de asistentes ya registrados (por email o DNI) no
+son un error: se completan sus datos vacíos (DNI, celular, rol, institución)
+con un bulk_update por lote y se informa qué cambió.
+
+validar_archivo() hace la misma validación (incluidos los duplicados contra la
+base) sin escribir nada, y escribe las filas con error en un reporte CSV/XLSX a
+medida que las encuentra.
+"""
+import csv
+import io
+import tempfile
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+import openpyxl
+import pandas as pd
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .altas import buscar_registrados, insertar_asistentes
+from .checkin import EntradaCheckIn, indice_checkin
+from .cola_emails import encolar_emails
+from .models import Asistente, EnvioEmail, TrabajoImportacion
+from .normalizacion import (
+    ColumnasFaltantes, ESQUEMA_ASISTENTES, PATRON_DNI, PATRON_EMAIL, normalizar_dni, normalizar_perfil, texto,
+)
+
+
+TAMANIO_LOTE = 500
+# Un trabajo "en proceso" sin avance por más tiempo que esto se considera abandonado por un worker caído
+TIEMPO_RECLAMO = timedelta(minutes=15)
+
+CAMPOS = ('first_name', 'last_name', 'email', 'phone', 'dni', 'profile_type', 'institution', 'rol_especifico')
+# Campos de texto opcionales: vacío se guarda como NULL
+CAMPOS_OPCIONALES = ('phone', 'institution', 'rol_especifico')
+# Campos que el modo UPSERT completa en los asistentes existentes, solo si están vacíos
+CAMPOS_COMPLETABLES = ('dni', 'phone', 'rol_especifico', 'institution')
+
+
+class FormatoImportacion:
+    """
+    Describe un formato de archivo: qué columnas son obligatorias, el perfil por
+    defecto y cómo se informa cada fila en `detalles` (cada formato define
+    detalle_error() y detalle_exito()). Los encabezados, los tipos de perfil y
+    las validaciones son los mismos para todos (ver normalizacion.py).
+    """
+    # campo -> nombre de la columna en la planilla de este formato (para los mensajes)
+    columnas = {}
+    requeridas = ()
+    campos_basicos = ('first_name', 'last_name')
+    perfil_por_defecto = Asistente.ProfileType.VISITOR
+    # Contexto de los emails de confirmación encolados para los asistentes creados
+    contexto_email = {}
+
+    def resolver_columnas(self, columnas_archivo):
+        """Devuelve {campo: columna del archivo}. Lanza ColumnasFaltantes si falta alguna requerida."""
+        return ESQUEMA_ASISTENTES.resolver(columnas_archivo, self.requeridas, self.columnas)
+
+    def detalle_valido(self, fila):
+        """Detalle de una fila que pasaría la importación (validación sin importar)."""
+        return {'fila': fila['fila'], 'email': fila['email'], 'estado': 'valido'}
+
+    def detalle_actualizado(self, fila, asistente_id, cambios):
+        """Detalle de una fila de un asistente existente en modo UPSERT, con los campos completados."""
+        return {
+            'fila': fila['fila'],
+            'email': fila['email'],
+            'id': asistente_id,
+            'estado': 'actualizado' if cambios else 'sin_cambios',
+            'cambios': cambios,
+        }
+
+
+class FormatoCompleto(FormatoImportacion):
+    """Planilla de inscripción (NOMBRE, Apellido, CORREO ELECTRONICO, ...) de CargaMasivaAsistentesCompletaView."""
+    columnas = {
+        'first_name': 'NOMBRE',
+        'last_name': 'Apellido',
+        'email': 'CORREO ELECTRONICO',
+        'phone': 'NUMERO DE CELULAR (con código de área)',
+        'dni': 'DNI',
+        'profile_type': 'TIPO DE PERFIL',
+        'rol_especifico': 'Columna1',
+    }
+    requeridas = ('first_name', 'last_name', 'email')
+    campos_basicos = ('first_name', 'last_name', 'email')
+    perfil_por_defecto = Asistente.ProfileType.OTRO
+
+    def detalle_error(self, fila, codigo, mensaje):
+        datos = {
+            'faltan_datos': {'nombre': fila['first_name'], 'apellido': fila['last_name'], 'email': fila['email']},
+            'email_invalido': {'email': fila['email']},
+            'email_duplicado': {'email': fila['email']},
+            'dni_duplicado': {'dni': fila['dni']},
+        }.get(codigo)
+        detalle = {'fila': fila['fila'], 'error': mensaje}
+        if datos is not None:
+            detalle['datos'] = datos
+        return detalle
+
+    def detalle_exito(self, fila, asistente_id):
+        return {
+            'fila': fila['fila'],
+            'success': 'Registro creado exitosamente',
+            'id': asistente_id,
+            'datos': {
+                'nombre': fila['first_name'],
+                'apellido': fila['last_name'],
+                'email': fila['email'],
+                'dni': fila['dni'] or None,
+                'perfil': fila['profile_type'],
+                'rol_especifico': fila['rol_especifico'] or None
+            }
+        }
+
+
+class FormatoSimple(FormatoImportacion):
+    """Planilla Nombre/Apellido/Email/Institucion/Tipo de Perfil/DNI/Columna1 de CargaMasivaAsistentesView."""
+    columnas = {
+        'first_name': 'Nombre',
+        'last_name': 'Apellido',
+        'email': 'Email',
+        'institution': 'Institucion',
+        'profile_type': 'Tipo de Perfil',
+        'dni': 'DNI',
+        'rol_especifico': 'Columna1',
+    }
+    perfil_por_defecto = Asistente.ProfileType.VISITOR
+    contexto_email = {'fecha_evento': '2025-11-15'}
+
+    MENSAJES = {
+        'email_invalido': 'Email inválido o vacío',
+        'faltan_datos': 'Faltan datos básicos (nombre, apellido)',
+    }
+
+    def detalle_error(self, fila, codigo, mensaje):
+        if codigo in ('email_invalido', 'email_duplicado', 'faltan_datos'):
+            return {'fila': fila['fila'], 'email': fila['email'], 'error': self.MENSAJES.get(codigo, mensaje)}
+        return {'fila': fila['fila'], 'error': mensaje}
+
+    def detalle_exito(self, fila, asistente_id):
+        return {
+            'fila': fila['fila'],
+            'email': fila['email'],
+            'nombre': f"{fila['first_name']} {fila['last_name']}",
+            'profile_type': Asistente.ProfileType(fila['profile_type']).label,
+            'estado': 'creado'
+        }
+
+
+MENSAJES_ERROR = {
+    'faltan_datos': 'Faltan datos básicos (nombre, apellido, email)',
+    'email_invalido': 'Formato de email inválido',
+    'email_duplicado': 'Email ya registrado',
+    'dni_duplicado': 'DNI ya registrado',
+}
+
+
+def _leer_xlsx(archivo, tamanio):
+    """Bloques de la primera hoja leída fila por fila; el índice conserva el número de fila de la hoja."""
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, None) or ()
+        columnas = [c if c is not None else f'Unnamed: {i}' for i, c in enumerate(encabezado)]
+        ancho = len(columnas)
+
+        bloque, indice, emitido = [], [], False
+        for numero, valores in enumerate(filas):
+            # Las filas vacías (formato aplicado a toda la hoja, por ejemplo) no se informan
+            if all(v is None or (isinstance(v, str) and not v.strip()) for v in valores):
+                continue
+            valores = tuple(valores[:ancho])
+            bloque.append(valores + (None,) * (ancho - len(valores)))
+            indice.append(numero)
+            if len(bloque) == tamanio:
+                yield pd.DataFrame(bloque, columns=columnas, index=indice)
+                bloque, indice, emitido = [], [], True
+        if bloque or not emitido:
+            yield pd.DataFrame(bloque, columns=columnas, index=indice)
+    finally:
+        libro.close()
+
+
+def leer_por_bloques(archivo, tamanio=TAMANIO_LOTE):
+    """
+    Lee un archivo .csv, .xlsx o .xls subido y devuelve sus filas en DataFrames
+    de hasta `tamanio` filas, sin cargar el archivo completo. Siempre entrega al
+    menos un bloque (vacío si el archivo no tiene filas) con las columnas del encabezado.
+    """
+    nombre = archivo.name.lower()
+    if nombre.endswith('.csv'):
+        with pd.read_csv(archivo, chunksize=tamanio) as lector:
+            yield from lector
+    elif nombre.endswith('.xlsx'):
+        yield from _leer_xlsx(archivo, tamanio)
+    else:
+        # xlrd no tiene lector incremental; el formato .xls admite como mucho 65536 filas
+        df = pd.read_excel(archivo, engine='xlrd')
+        for inicio in range(0, max(len(df), 1), tamanio):
+            yield df.iloc[inicio:inicio + tamanio]
+
+
+def _email_valido(email):
+    try:
+        validate_email(email)
+    except ValidationError:
+        return False
+    return True
+
+
+def _max_length(campo):
+    return Asistente._meta.get_field(campo).max_length
+
+
+class ImportadorAsistentes:
+    def __init__(self, formato, tamanio_lote=TAMANIO_LOTE, max_detalles=None, simular=False,
+                 modo=TrabajoImportacion.Modo.INSERTAR):
+        self.formato = formato
+        self.modo = modo
+        self.tamanio_lote = tamanio_lote
+        # Tope de filas informadas en `detalles` (None = todas); el resto solo se cuenta
+        self.max_detalles = max_detalles
+        # Con simular=True se valida todo pero no se inserta nada
+        self.simular = simular
+        # Sin insertar, los duplicados entre bloques no los ve la base: se recuerdan acá
+        self._emails_vistos = set()
+        self._dnis_vistos = set()
+
+    def normalizar(self, df):
+        """DataFrame con una columna por campo de CAMPOS (texto normalizado) y la fila del archivo."""
+        mapeo = self.formato.resolver_columnas(df.columns)
+        datos = pd.DataFrame(index=df.index)
+        for campo in CAMPOS:
+            datos[campo] = texto(df[mapeo[campo]]) if campo in mapeo else ''
+
+        datos['email'] = datos['email'].str.lower()
+        # Mismo criterio que Asistente.clean() (ver normalizacion.py)
+        datos['dni'] = normalizar_dni(datos['dni'])
+        datos['profile_type'] = normalizar_perfil(datos['profile_type'], self.formato.perfil_por_defecto)
+
+        datos['fila'] = df.index + 2  # +2 porque empezamos en 0 y hay header
+        return datos
+
+    def validar(self, datos):
+        """Serie con el código de error de cada fila (None si la fila es válida), sin consultar la base."""
+        errores = pd.Series(None, index=datos.index, dtype=object)
+
+        def marcar(mascara, codigo):
+            errores[errores.isna() & mascara] = codigo
+
+        faltan = pd.Series(False, index=datos.index)
+        for campo in self.formato.campos_basicos:
+            faltan |= datos[campo] == ''
+        marcar(faltan, 'faltan_datos')
+        # El regex compartido y, para los que lo pasan, el validador de EmailField
+        marcar(~datos['email'].str.match(PATRON_EMAIL), 'email_invalido')
+        validos = datos.loc[errores.isna(), 'email'].map(_email_valido)
+        marcar(~validos.reindex(datos.index, fill_value=True), 'email_invalido')
+        marcar((datos['dni'] != '') & ~datos['dni'].str.match(PATRON_DNI), 'dni_invalido')
+        for campo in ('first_name', 'last_name', 'email', 'phone', 'institution', 'rol_especifico'):
+            marcar(datos[campo].str.len() > _max_length(campo), f'largo:{campo}')
+
+        # Duplicados dentro del archivo: vale la primera aparición válida
+        validas = errores.isna()
+        marcar(validas & datos['email'].where(validas).duplicated(keep='first'), 'email_duplicado')
+        con_dni = errores.isna() & (datos['dni'] != '')
+        marcar(con_dni & datos['dni'].where(con_dni).duplicated(keep='first'), 'dni_duplicado')
+        return errores
+
+    def _mensaje(self, codigo):
+        if codigo == 'dni_invalido':
+            return "Error procesando fila: {'dni': ['El DNI debe tener exactamente 8 dígitos numéricos.']}"
+        if codigo.startswith('largo:'):
+            campo = codigo.split(':', 1)[1]
+            return f"Error procesando fila: el campo {campo} supera los {_max_length(campo)} caracteres"
+        return MENSAJES_ERROR.get(codigo, codigo)
+
+    def _instancia(self, fila):
+        valores = {campo: fila[campo] for campo in CAMPOS}
+        valores['dni'] = valores['dni'] or None
+        for campo in CAMPOS_OPCIONALES:
+            valores[campo] = valores[campo] or None
+        if valores['phone'] is None:
+            valores['phone'] = ''
+        return Asistente(**valores)
+
+    def _insertar(self, filas):
+        """Inserta el lote; devuelve ({posición: asistente}, {posición: código de error})."""
+        instancias = {pos: self._instancia(fila) for pos, fila in filas.items()}
+        errores = {}
+        try:
+            insertar_asistentes(list(instancias.values()))
+        except IntegrityError:
+            # Otro proceso registró alguno de estos emails/DNIs entre la consulta y el insert:
+            # se reintenta fila por fila para aislar los conflictivos
+            for pos, instancia in list(instancias.items()):
+                try:
+                    insertar_asistentes([instancia])
+                except IntegrityError:
+                    errores[pos] = 'email_duplicado' if buscar_registrados([instancia.email], []).exists() else 'dni_duplicado'
+                    del instancias[pos]
+        return instancias, errores
+
+    def importar(self, df, al_crear=None):
+        """Importa un DataFrame ya leído. Ver importar_bloques()."""
+        return self.importar_bloques([df], al_crear=al_crear)
+
+    def importar_bloques(self, bloques, al_crear=None, al_avanzar=None, al_rechazar=None):
+        """
+        Importa los DataFrames de `bloques` (por ejemplo, los de leer_por_bloques())
+        de a uno y devuelve el diccionario de resultados de la carga masiva.
+        `al_crear(asistentes)` se llama con los asistentes de cada lote insertado,
+        después de confirmarlo; `al_avanzar(resultados)`, al terminar cada bloque,
+        y `al_rechazar(fila, codigo, mensaje)`, por cada fila con error.
+        """
+        resultados = {
+            'total_procesados': 0,
+            'exitosos': 0,
+            'actualizados': 0,
+            'sin_cambios': 0,
+            'errores': 0,
+            'errores_por_tipo': Counter(),
+            'detalles': []
+        }
+        omitidos = 0
+        for df in bloques:
+            datos = self.normalizar(df)
+            detalles = self._importar_bloque(datos, resultados, al_crear, al_rechazar)
+            resultados['total_procesados'] += len(datos)
+            resultados['errores'] = resultados['total_procesados'] - resultados['exitosos'] - resultados['actualizados'] - resultados['sin_cambios']
+            for pos in datos.index:
+                if self.max_detalles is None or len(resultados['detalles']) < self.max_detalles:
+                    resultados['detalles'].append(detalles[pos])
+                else:
+                    omitidos += 1
+            if omitidos:
+                resultados['detalles_omitidos'] = omitidos
+            if al_avanzar is not None:
+                al_avanzar(resultados)
+        resultados['errores_por_tipo'] = dict(resultados['errores_por_tipo'])
+        return resultados
+
+    def _descartar_existentes(self, lote, rechazar):
+        """Rechaza las filas de emails o DNIs ya registrados y devuelve las que se pueden insertar."""
+        # Una sola consulta por lote para los emails y DNIs ya registrados
+        registrados, dnis_registrados = set(), set()
+        for email, dni in buscar_registrados([f['email'] for f in lote.values()], [f['dni'] for f in lote.values()], 'dni'):
+            registrados.add(email)
+            if dni:
+                dnis_registrados.add(dni)
+
+        # Los conjuntos de vistos solo tienen datos al simular
+        a_insertar = {}
+        for pos, fila in lote.items():
+            if fila['email'] in registrados or fila['email'] in self._emails_vistos:
+                codigo = 'email_duplicado'
+            elif fila['dni'] and (fila['dni'] in dnis_registrados or fila['dni'] in self._dnis_vistos):
+                codigo = 'dni_duplicado'
+            else:
+                a_insertar[pos] = fila
+                continue
+            rechazar(pos, fila, codigo)
+        return a_insertar
+
+    def _completar_existentes(self, lote, detalles, resultados, rechazar):
+        """
+        Modo UPSERT: busca con una sola consulta los asistentes del lote ya
+        registrados (por email o por DNI), completa sus campos vacíos y devuelve
+        las filas nuevas, que se insertan como siempre.
+        """
+        existentes = buscar_registrados([f['email'] for f in lote.values()], [f['dni'] for f in lote.values()]).only(
+            'id', 'email', 'asistencia_confirmada', 'fecha_confirmacion', *CAMPOS_COMPLETABLES
+        )
+        por_email, por_dni = {}, {}
+        for asistente in existentes:
+            por_email[asistente.email_minusculas] = asistente
+            if asistente.dni:
+                por_dni[asistente.dni] = asistente
+
+        a_insertar = {}
+        cambiados = {}  # id -> (asistente, campos modificados, posiciones de las filas)
+        for pos, fila in lote.items():
+            asistente = por_email.get(fila['email']) or por_dni.get(fila['dni'] or None)
+            if asistente is None:
+                # Al simular no se insertó nada: una fila repetida en otro bloque sería la ya importada
+                if fila['email'] in self._emails_vistos or fila['dni'] in self._dnis_vistos:
+                    detalles[pos] = self.formato.detalle_actualizado(fila, None, {})
+                    resultados['sin_cambios'] += 1
+                else:
+                    a_insertar[pos] = fila
+                continue
+            # El DNI de la fila ya es de otro asistente
+            otro = por_dni.get(fila['dni'] or None)
+            if otro is not None and otro.pk != asistente.pk:
+                rechazar(pos, fila, 'dni_duplicado')
+                continue
+
+            cambios = {campo: fila[campo] for campo in CAMPOS_COMPLETABLES if fila[campo] and not getattr(asistente, campo)}
+            for campo, valor in cambios.items():
+                setattr(asistente, campo, valor)
+            if 'dni' in cambios:
+                por_dni[asistente.dni] = asistente
+            if cambios:
+                _, campos, posiciones = cambiados.setdefault(asistente.pk, (asistente, set(), []))
+                campos.update(cambios)
+                posiciones.append(pos)
+                resultados['actualizados'] += 1
+            else:
+                resultados['sin_cambios'] += 1
+            detalles[pos] = self.formato.detalle_actualizado(fila, asistente.pk, cambios)
+
+        if cambiados and not self.simular:
+            for asistente_id in self._actualizar(cambiados):
+                for pos in cambiados[asistente_id][2]:
+                    resultados['actualizados'] -= 1
+                    rechazar(pos, lote[pos], 'dni_duplicado')
+        return a_insertar
+
+    def _actualizar(self, cambiados):
+        """bulk_update de los campos completados; devuelve los IDs que no se pudieron guardar."""
+        campos = sorted(set().union(*(c for _, c, _ in cambiados.values())))
+        asistentes = [asistente for asistente, _, _ in cambiados.values()]
+        fallidos = []
+        try:
+            with transaction.atomic():
+                Asistente.objects.bulk_update(asistentes, campos)
+        except IntegrityError:
+            # Otro proceso tomó alguno de estos DNIs entre la consulta y el update
+            for asistente, campos_asistente, _ in cambiados.values():
+                try:
+                    with transaction.atomic():
+                        Asistente.objects.bulk_update([asistente], sorted(campos_asistente))
+                except IntegrityError:
+                    fallidos.append(asistente.pk)
+
+        # bulk_update no dispara post_save: actualizar el índice de check-in a mano
+        for asistente, campos_asistente, _ in cambiados.values():
+            if 'dni' in campos_asistente and asistente.pk not in fallidos:
+                indice_checkin.registrar(asistente.dni, EntradaCheckIn(
+                    asistente.pk, asistente.asistencia_confirmada, asistente.fecha_confirmacion
+                ))
+        return fallidos
+
+    def _importar_bloque(self, datos, resultados, al_crear, al_rechazar=None):
+        """Valida e inserta un bloque normalizado; devuelve {posición: detalle}."""
+        errores = self.validar(datos)
+        filas = datos.to_dict('index')
+
+        detalles = {}
+
+        def rechazar(pos, fila, codigo):
+            mensaje = self._mensaje(codigo)
+            detalles[pos] = self.formato.detalle_error(fila, codigo, mensaje)
+            resultados['errores_por_tipo'][codigo] += 1
+            if al_rechazar is not None:
+                al_rechazar(fila, codigo, mensaje)
+
+        for pos, codigo in errores.dropna().items():
+            rechazar(pos, filas[pos], codigo)
+
+        validas = list(errores[errores.isna()].index)
+        for inicio in range(0, len(validas), self.tamanio_lote):
+            lote = {pos: filas[pos] for pos in validas[inicio:inicio + self.tamanio_lote]}
+            if self.modo == TrabajoImportacion.Modo.UPSERT:
+                a_insertar = self._completar_existentes(lote, detalles, resultados, rechazar)
+            else:
+                a_insertar = self._descartar_existentes(lote, rechazar)
+
+            if self.simular:
+                for pos, fila in a_insertar.items():
+                    detalles[pos] = self.formato.detalle_valido(fila)
+                    self._emails_vistos.add(fila['email'])
+                    if fila['dni']:
+                        self._dnis_vistos.add(fila['dni'])
+                resultados['exitosos'] += len(a_insertar)
+                continue
+
+            creados, conflictos = self._insertar(a_insertar) if a_insertar else ({}, {})
+            for pos, codigo in conflictos.items():
+                rechazar(pos, lote[pos], codigo)
+            for pos, asistente in creados.items():
+                detalles[pos] = self.formato.detalle_exito(lote[pos], asistente.pk)
+                resultados['exitosos'] += 1
+            if creados and al_crear is not None:
+                al_crear(list(creados.values()))
+        return detalles
+
+
+FORMATO_COMPLETO = FormatoCompleto()
+FORMATO_SIMPLE = FormatoSimple()
+
+FORMATOS = {
+    TrabajoImportacion.Formato.COMPLETO: FORMATO_COMPLETO,
+    TrabajoImportacion.Formato.SIMPLE: FORMATO_SIMPLE,
+}
+
+
+class ReporteErrores:
+    """
+    Reporte de las filas con error, en CSV o XLSX. Las filas se escriben en un
+    archivo temporal a medida que aparecen (en XLSX con el modo write_only de
+    openpyxl), así que no se acumulan en memoria.
+    """
+    COLUMNAS = ('Fila', 'Código', 'Error', 'Nombre', 'Apellido', 'Email', 'DNI')
+
+    def __init__(self, formato='csv'):
+        self.formato = 'xlsx' if formato == 'xlsx' else 'csv'
+        self.cantidad = 0
+        self._temporal = tempfile.TemporaryFile()
+        if self.formato == 'xlsx':
+            self._libro = openpyxl.Workbook(write_only=True)
+            self._hoja = self._libro.create_sheet('Errores')
+            self._hoja.append(self.COLUMNAS)
+        else:
+            # utf-8-sig para que Excel reconozca los acentos al abrir el CSV
+            self._texto = io.TextIOWrapper(self._temporal, encoding='utf-8-sig', newline='')
+            self._csv = csv.writer(self._texto)
+            self._csv.writerow(self.COLUMNAS)
+
+    def agregar(self, fila, codigo, mensaje):
+        valores = (fila['fila'], codigo, mensaje, fila['first_name'], fila['last_name'], fila['email'], fila['dni'])
+        if self.formato == 'xlsx':
+            self._hoja.append(valores)
+        else:
+            self._csv.writerow(valores)
+        self.cantidad += 1
+
+    def guardar(self):
+        """Guarda el reporte en el storage (media/cargas_masivas/reportes/) y devuelve su nombre."""
+        if self.formato == 'xlsx':
+            self._libro.save(self._temporal)
+        else:
+            self._texto.flush()
+            self._texto.detach()
+        self._temporal.seek(0)
+        try:
+            nombre = f'cargas_masivas/reportes/errores_{uuid.uuid4().hex}.{self.formato}'
+            return default_storage.save(nombre, File(self._temporal))
+        finally:
+            self._temporal.close()
+
+
+def validar_archivo(archivo, formato, formato_reporte='csv', modo=TrabajoImportacion.Modo.INSERTAR):
+    """
+    Valida el archivo completo como si se fuera a importar, sin escribir en la
+    base, y guarda el reporte de errores. Devuelve el resumen de la validación.
+    """
+    importador = ImportadorAsistentes(formato, max_detalles=0, simular=True, modo=modo)
+    reporte = ReporteErrores(formato_reporte)
+    resultados = importador.importar_bloques(
+        leer_por_bloques(archivo, importador.tamanio_lote), al_rechazar=reporte.agregar
+    )
+    nombre = reporte.guardar()
+    return {
+        'total_procesados': resultados['total_procesados'],
+        'validas': resultados['exitosos'],
+        'actualizables': resultados['actualizados'],
+        'sin_cambios': resultados['sin_cambios'],
+        'errores': resultados['errores'],
+        'errores_por_tipo': resultados['errores_por_tipo'],
+        'reporte': nombre,
+        'reporte_url': default_storage.url(nombre),
+    }
+
+
+def crear_trabajo_importacion(archivo, formato, enviar_emails=False, modo=TrabajoImportacion.Modo.INSERTAR):
+    """Guarda el archivo subido y crea el TrabajoImportacion pendiente. No importa nada."""
+    trabajo = TrabajoImportacion(formato=formato, enviar_emails=enviar_emails, modo=modo)
+    trabajo.archivo.save(archivo.name, archivo, save=False)
+    trabajo.save()
+    return trabajo
+
+
+def _contar_filas(archivo):
+    """Cantidad aproximada de filas de datos, para estimar el avance (0 si no se puede saber sin leerlo)."""
+    nombre = archivo.name.lower()
+    archivo.seek(0)
+    try:
+        if nombre.endswith('.csv'):
+            lineas = sum(bloque.count(b'\n') for bloque in iter(lambda: archivo.read(1 << 20), b''))
+            return max(lineas - 1, 0)
+        if nombre.endswith('.xlsx'):
+            libro = openpyxl.load_workbook(archivo, read_only=True)
+            try:
+                return max((libro.worksheets[0].max_row or 1) - 1, 0)
+            finally:
+                libro.close()
+        return 0
+    finally:
+        archivo.seek(0)
+
+
+def _reclamar_trabajo(trabajo):
+    """Pasa el trabajo a EN_PROCESO si sigue pendiente (o quedó abandonado). False si lo tomó otro worker."""
+    abandonado = Q(estado=TrabajoImportacion.Estado.EN_PROCESO, fecha_actualizacion__lte=timezone.now() - TIEMPO_RECLAMO)
+    return TrabajoImportacion.objects.filter(
+        Q(estado=TrabajoImportacion.Estado.PENDIENTE) | abandonado, pk=trabajo.pk
+    ).update(estado=TrabajoImportacion.Estado.EN_PROCESO, fecha_actualizacion=timezone.now()) == 1
+
+
+def _saltear_procesadas(bloques, procesadas):
+    """Descarta las filas ya importadas por una corrida anterior del trabajo."""
+    for df in bloques:
+        if procesadas >= len(df) and len(df):
+            procesadas -= len(df)
+            continue
+        yield df.iloc[procesadas:] if procesadas else df
+        procesadas = 0
+
+
+def procesar_trabajo_importacion(trabajo, log=print, forzar=False):
+    """
+    Importa el archivo del trabajo por bloques, guardando el avance después de
+    cada uno. Si el trabajo ya había avanzado, continúa desde la primera fila sin
+    procesar. Con forzar=True se procesa aunque no esté pendiente (para retomar
+    uno con error). Devuelve el trabajo, o None si lo está procesando otro worker.
+    """
+    if not forzar and not _reclamar_trabajo(trabajo):
+        return None
+    trabajo.refresh_from_db()
+    formato = FORMATOS[trabajo.formato]
+    ya_procesadas = trabajo.procesados
+    contadores = ('procesados', 'exitosos', 'actualizados', 'sin_cambios', 'errores', 'detalles_omitidos')
+    base = {campo: getattr(trabajo, campo) for campo in contadores}
+    detalles_previos = list(trabajo.detalles)
+    max_detalles = settings.CARGA_MASIVA_MAX_DETALLES
+    importador = ImportadorAsistentes(
+        formato, max_detalles=max(max_detalles - len(detalles_previos), 0), modo=trabajo.modo
+    )
+
+    if trabajo.enviar_emails and trabajo.lote_emails is None:
+        trabajo.lote_emails = uuid.uuid4()
+    trabajo.estado = TrabajoImportacion.Estado.EN_PROCESO
+    trabajo.fecha_inicio = trabajo.fecha_inicio or timezone.now()
+
+    def al_crear(asistentes):
+        _, cantidad = encolar_emails(
+            Asistente.objects.filter(pk__in=[a.pk for a in asistentes]),
+            EnvioEmail.Tipo.CONFIRMACION, contexto=formato.contexto_email, lote=trabajo.lote_emails
+        )
+        trabajo.emails_encolados += cantidad
+
+    def al_avanzar(resultados):
+        campos = [*contadores, 'emails_encolados', 'fecha_actualizacion']
+        trabajo.procesados = base['procesados'] + resultados['total_procesados']
+        for campo in contadores[1:-1]:
+            setattr(trabajo, campo, base[campo] + resultados[campo])
+        trabajo.detalles_omitidos = base['detalles_omitidos'] + resultados.get('detalles_omitidos', 0)
+        # Una vez alcanzado el tope, el detalle no cambia: no reescribirlo en cada bloque
+        if len(trabajo.detalles) < max_detalles:
+            trabajo.detalles = detalles_previos + resultados['detalles']
+            campos.append('detalles')
+        trabajo.save(update_fields=campos)
+        log(f"[INFO] Carga masiva #{trabajo.pk}: {trabajo.procesados}/{trabajo.total} filas ({trabajo.progreso}%)")
+
+    try:
+        with trabajo.archivo.open('rb') as archivo:
+            trabajo.total = max(_contar_filas(archivo), trabajo.procesados)
+            trabajo.save(update_fields=['estado', 'total', 'lote_emails', 'fecha_inicio', 'fecha_actualizacion'])
+            log(f"[INFO] Carga masiva #{trabajo.pk}: {trabajo.total - ya_procesadas} filas por procesar de {trabajo.total}")
+            bloques = _saltear_procesadas(leer_por_bloques(archivo, importador.tamanio_lote), ya_procesadas)
+            importador.importar_bloques(
+                bloques, al_crear=al_crear if trabajo.enviar_emails else None, al_avanzar=al_avanzar
+            )
+    except Exception as e:
+        # Lo ya importado queda confirmado; el trabajo se puede retomar con --trabajo ID
+        trabajo.estado = TrabajoImportacion.Estado.ERROR
+        trabajo.ultimo_error = str(e)
+        print(f"[ERROR] Carga masiva #{trabajo.pk}: {e}")
+    else:
+        trabajo.estado = TrabajoImportacion.Estado.COMPLETADO
+        trabajo.total = trabajo.procesados
+        trabajo.ultimo_error = ''
+    trabajo.save(update_fields=['estado', 'total', 'ultimo_error', 'fecha_actualizacion'])
+    return trabajo
+
+
+def resumen_trabajo_importacion(trabajo):
+    """Avance del trabajo y tiempo restante estimado según el ritmo que lleva."""
+    eta = None
+    if trabajo.estado == TrabajoImportacion.Estado.EN_PROCESO and trabajo.fecha_inicio and trabajo.procesados:
+        transcurrido = (timezone.now() - trabajo.fecha_inicio).total_seconds()
+        restantes = max(trabajo.total - trabajo.procesados, 0)
+        eta = round(transcurrido / trabajo.procesados * restantes)
+    return {
+        'trabajo_id': trabajo.pk,
+        'estado': trabajo.estado,
+        'modo': trabajo.modo,
+        'completado': trabajo.estado == TrabajoImportacion.Estado.COMPLETADO,
+        'total_filas': trabajo.total,
+        'procesados': trabajo.procesados,
+        'exitosos': trabajo.exitosos,
+        'actualizados': trabajo.actualizados,
+        'sin_cambios': trabajo.sin_cambios,
+        'errores': trabajo.errores,
+        'progreso': trabajo.progreso,
+        'eta_segundos': eta,
+        'emails_encolados': trabajo.emails_encolados,
+        'lote_emails': str(trabajo.lote_emails) if trabajo.lote_emails else None,
+        'ultimo_error': trabajo.ultimo_error,
+        'detalles': trabajo.detalles,
+        'detalles_omitidos': trabajo.detalles_omitidos,
+    }
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from api.models import Asistente, TrabajoCertificados
+from api.certificados import encolar_certificados, procesar_trabajo
+
+
+class Command(BaseCommand):
+    help = 'Genera en segundo plano los PDFs de los trabajos de certificados pendientes usando todos los núcleos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todos-confirmados',
+            action='store_true',
+            help='Crea un trabajo nuevo con todos los asistentes con asistencia confirmada',
+        )
+        parser.add_argument(
+            '--trabajo',
+            type=int,
+            help='Procesa (o retoma) solo el trabajo con este ID',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=None,
+            help='Cantidad de procesos del pool (por defecto, uno por núcleo)',
+        )
+        parser.add_argument(
+            '--regenerar',
+            action='store_true',
+            help='Vuelve a generar también los certificados que ya tienen PDF',
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Queda esperando trabajos nuevos en lugar de terminar',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=10,
+            help='Segundos entre consultas en modo continuo (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        if options['todos_confirmados']:
+            trabajo = encolar_certificados(Asistente.objects.filter(asistencia_confirmada=True))
+            self.stdout.write(self.style.SUCCESS(f'Trabajo #{trabajo.pk} creado con {trabajo.total} certificados.'))
+
+        while True:
+            # Los trabajos con errores se reintentan solo a pedido (--trabajo ID)
+            trabajos = TrabajoCertificados.objects.filter(
+                estado__in=[TrabajoCertificados.Estado.PENDIENTE, TrabajoCertificados.Estado.EN_PROCESO]
+            )
+            if options['trabajo']:
+                trabajos = TrabajoCertificados.objects.filter(pk=options['trabajo'])
+
+            for trabajo in trabajos:
+                procesar_trabajo(trabajo, procesos=options['procesos'], regenerar=options['regenerar'], log=self.stdout.write)
+                estilo = self.style.SUCCESS if trabajo.estado == TrabajoCertificados.Estado.COMPLETADO else self.style.WARNING
+                self.stdout.write(estilo(
+                    f'Trabajo #{trabajo.pk}: {trabajo.procesados}/{trabajo.total} generados, {trabajo.errores} errores.'
+                ))
+                if trabajo.ultimo_error:
+                    self.stdout.write(self.style.ERROR(f'Último error: {trabajo.ultimo_error}'))
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
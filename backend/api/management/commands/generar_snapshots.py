@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.snapshots import generar_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Escribe los snapshots JSON (y sus variantes comprimidas) del programa, los disertantes y las empresas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directorio',
+            help=f'Directorio de salida (default: SNAPSHOTS_DIR = {settings.SNAPSHOTS_DIR})',
+        )
+
+    def handle(self, *args, **options):
+        escritos = generar_snapshots(options['directorio'])
+        if escritos:
+            self.stdout.write(self.style.SUCCESS(f"Snapshots actualizados: {', '.join(escritos)}"))
+        else:
+            self.stdout.write('Los snapshots ya estaban al día.')
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from api.cola_emails import procesar_cola, resumen_lote
+
+
+class Command(BaseCommand):
+    help = 'Envía los emails pendientes de la cola de salida con varias conexiones SMTP en paralelo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=4,
+            help='Cantidad de hilos (y conexiones SMTP) concurrentes (default: 4)',
+        )
+        parser.add_argument(
+            '--lote',
+            help='Envía solo los emails de este lote',
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Queda esperando emails nuevos en lugar de terminar',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=10,
+            help='Segundos entre consultas en modo continuo (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            enviados, errores = procesar_cola(hilos=options['hilos'], lote=options['lote'], log=self.stdout.write)
+            if enviados or errores:
+                estilo = self.style.WARNING if errores else self.style.SUCCESS
+                self.stdout.write(estilo(f'{enviados} emails enviados, {errores} con error (se reintentan más tarde).'))
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+        if options['lote']:
+            resumen = resumen_lote(options['lote'])
+            if resumen:
+                self.stdout.write(
+                    f"Lote {resumen['lote']}: {resumen['enviados']}/{resumen['total']} enviados, "
+                    f"{resumen['pendientes']} pendientes, {resumen['errores']} con error."
+                )
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from api.models import TrabajoImportacion
+from api.importacion import procesar_trabajo_importacion
+
+
+class Command(BaseCommand):
+    help = 'Importa en segundo plano los archivos de carga masiva de asistentes pendientes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trabajo',
+            type=int,
+            help='Procesa (o retoma, aunque haya terminado con error) solo el trabajo con este ID',
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Queda esperando trabajos nuevos en lugar de terminar',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=10,
+            help='Segundos entre consultas en modo continuo (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Los trabajos con error se retoman solo a pedido (--trabajo ID)
+            trabajos = TrabajoImportacion.objects.filter(
+                estado__in=[TrabajoImportacion.Estado.PENDIENTE, TrabajoImportacion.Estado.EN_PROCESO]
+            )
+            if options['trabajo']:
+                trabajos = TrabajoImportacion.objects.filter(pk=options['trabajo'])
+
+            for trabajo in trabajos:
+                # Los que están en proceso solo se toman si quedaron abandonados por otro worker
+                trabajo = procesar_trabajo_importacion(trabajo, log=self.stdout.write, forzar=bool(options['trabajo']))
+                if trabajo is None:
+                    continue
+                estilo = self.style.SUCCESS if trabajo.estado == TrabajoImportacion.Estado.COMPLETADO else self.style.WARNING
+                self.stdout.write(estilo(
+                    f'Carga masiva #{trabajo.pk}: {trabajo.procesados} filas, {trabajo.exitosos} creados, '
+                    f'{trabajo.errores} errores, {trabajo.emails_encolados} emails encolados.'
+                ))
+                if trabajo.ultimo_error:
+                    self.stdout.write(self.style.ERROR(f'Último error: {trabajo.ultimo_error}'))
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.estadisticas import recalcular
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores de estadísticas de asistencia recorriendo la tabla de asistentes.'
+
+    def handle(self, *args, **options):
+        total = recalcular()
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores recalculados: {total['registrados']} registrados, {total['confirmados']} confirmados."
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_alter_asistente_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoCertificados',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('COMPLETADO', 'Completado'), ('ERROR', 'Con errores')], default='PENDIENTE', max_length=15, verbose_name='Estado')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('procesados', models.PositiveIntegerField(default=0, verbose_name='Procesados')),
+                ('errores', models.PositiveIntegerField(default=0, verbose_name='Errores')),
+                ('ultimo_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+                ('certificados', models.ManyToManyField(blank=True, related_name='trabajos', to='api.certificado', verbose_name='Certificados')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de certificados',
+                'verbose_name_plural': 'Trabajos de certificados',
+                'ordering': ['fecha_creacion'],
+            },
+        ),
+    ]
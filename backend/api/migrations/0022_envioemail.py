@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_trabajocertificados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lote', models.UUIDField(db_index=True, verbose_name='Lote')),
+                ('tipo', models.CharField(choices=[('CONFIRMACION', 'Confirmación de inscripción'), ('RECORDATORIO', 'Recordatorio del evento'), ('CERTIFICADO', 'Certificado de asistencia'), ('SOLICITUD_DNI', 'Solicitud de actualización de DNI')], max_length=20, verbose_name='Tipo de email')),
+                ('destinatario', models.EmailField(max_length=254, verbose_name='Destinatario')),
+                ('contexto', models.JSONField(blank=True, default=dict, verbose_name='Contexto')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('ENVIANDO', 'Enviando'), ('ENVIADO', 'Enviado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=10, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('ultimo_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo intento')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de envío')),
+                ('asistente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='envios_email', to='api.asistente', verbose_name='Asistente')),
+            ],
+            options={
+                'verbose_name': 'Envío de email',
+                'verbose_name_plural': 'Envíos de email',
+                'ordering': ['fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='api_envioem_estado_7e85af_idx')],
+            },
+        ),
+    ]
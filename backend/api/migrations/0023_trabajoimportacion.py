@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_envioemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoImportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.FileField(upload_to='cargas_masivas/', verbose_name='Archivo')),
+                ('formato', models.CharField(choices=[('COMPLETO', 'Planilla de inscripción completa'), ('SIMPLE', 'Planilla simple')], max_length=10, verbose_name='Formato')),
+                ('enviar_emails', models.BooleanField(default=False, verbose_name='Enviar emails de confirmación')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('COMPLETADO', 'Completado'), ('ERROR', 'Con errores')], default='PENDIENTE', max_length=15, verbose_name='Estado')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Filas (estimado)')),
+                ('procesados', models.PositiveIntegerField(default=0, verbose_name='Filas procesadas')),
+                ('exitosos', models.PositiveIntegerField(default=0, verbose_name='Exitosos')),
+                ('errores', models.PositiveIntegerField(default=0, verbose_name='Errores')),
+                ('emails_encolados', models.PositiveIntegerField(default=0, verbose_name='Emails encolados')),
+                ('lote_emails', models.UUIDField(blank=True, null=True, verbose_name='Lote de emails')),
+                ('detalles', models.JSONField(blank=True, default=list, verbose_name='Detalle por fila')),
+                ('detalles_omitidos', models.PositiveIntegerField(default=0, verbose_name='Filas sin detalle')),
+                ('ultimo_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de inicio')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de carga masiva',
+                'verbose_name_plural': 'Trabajos de carga masiva',
+                'ordering': ['fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_trabajoimportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='actualizados',
+            field=models.PositiveIntegerField(default=0, verbose_name='Actualizados'),
+        ),
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='modo',
+            field=models.CharField(choices=[('INSERTAR', 'Solo asistentes nuevos'), ('UPSERT', 'Nuevos y completar los existentes')], default='INSERTAR', max_length=10, verbose_name='Modo'),
+        ),
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='sin_cambios',
+            field=models.PositiveIntegerField(default=0, verbose_name='Sin cambios'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_trabajoimportacion_modo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='programa',
+            index=models.Index(fields=['dia', 'hora_inicio'], name='api_program_dia_1afc99_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='programa',
+            index=models.Index(fields=['categoria', 'dia'], name='api_program_categor_d03e5a_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_programa_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorEstadistica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=300, unique=True, verbose_name='Clave')),
+                ('valor', models.IntegerField(default=0, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Contador de estadísticas',
+                'verbose_name_plural': 'Contadores de estadísticas',
+                'ordering': ['clave'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+def eliminar_certificados_duplicados(apps, schema_editor):
+    """Deja un certificado por asistente y tipo (el que ya tiene PDF, si hay) antes de crear la restricción."""
+    Certificado = apps.get_model('api', 'Certificado')
+    vistos = set()
+    duplicados = []
+    filas = Certificado.objects.order_by('asistente_id', 'tipo_certificado', models.F('pdf_generado').desc(nulls_last=True), 'pk')
+    for pk, asistente_id, tipo in filas.values_list('pk', 'asistente_id', 'tipo_certificado').iterator():
+        if (asistente_id, tipo) in vistos:
+            duplicados.append(pk)
+        else:
+            vistos.add((asistente_id, tipo))
+    Certificado.objects.filter(pk__in=duplicados).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_contadorestadistica'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_certificados_duplicados, reverse_code=migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='certificado',
+            constraint=models.UniqueConstraint(fields=('asistente', 'tipo_certificado'), name='certificado_unico_por_tipo'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from io import BytesIO
@@ -6,7 +6,7 @@ from django.core.files.base import ContentFile
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from django.utils import timezone
-import re
+from .normalizacion import normalizar_dni_valor, dni_valido
 
 
 class Disertante(models.Model):
@@ -63,6 +63,13 @@ class Programa(models.Model):
     def __str__(self):
         return f"{self.titulo} - {self.dia} {self.hora_inicio}"
 
+    class Meta:
+        # La agenda se consulta por día y horario, y por categoría dentro de un día (ver ProgramaViewSet)
+        indexes = [
+            models.Index(fields=['dia', 'hora_inicio']),
+            models.Index(fields=['categoria', 'dia']),
+        ]
+
 class Empresa(models.Model):
     # Main Info
     nombre_empresa = models.CharField(max_length=255, verbose_name="Nombre de la empresa o institución")
@@ -151,23 +158,80 @@ class Asistente(models.Model):
         """Valida que el DNI tenga exactamente 8 dígitos numéricos"""
         super().clean()
         if self.dni:
-            # Limpiar caracteres no numéricos
-            dni_limpio = re.sub(r'\D', '', self.dni)
-            # Si tiene 9 dígitos y termina en 0, eliminar el último 0
-            if len(dni_limpio) == 9 and dni_limpio.endswith('0'):
-                dni_limpio = dni_limpio[:-1]
+            # Solo dígitos y sin el 0 de más al final (ver api/normalizacion.py)
+            dni_limpio = normalizar_dni_valor(self.dni)
             # Validar que tenga exactamente 8 dígitos
-            if len(dni_limpio) != 8 or not dni_limpio.isdigit():
+            if not dni_valido(dni_limpio):
                 raise ValidationError({
                     'dni': 'El DNI debe tener exactamente 8 dígitos numéricos.'
                 })
             # Actualizar el DNI limpio
             self.dni = dni_limpio
 
+    # Campos únicos, en el orden en que se buscan en el mensaje de un IntegrityError
+    # (dni_update_token antes que dni porque lo contiene)
+    CAMPOS_UNICOS = ('dni_update_token', 'email', 'dni')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Valores leídos de la base, para saber qué campos cambiaron al guardar
+        instancia._valores_originales = dict(zip(field_names, values))
+        return instancia
+
+    def campos_modificados(self):
+        """
+        Nombres de los campos cargados cuyo valor cambió desde que se leyó el
+        asistente (o desde el último save()). None si todavía no está en la base.
+        """
+        originales = getattr(self, '_valores_originales', None)
+        if self._state.adding or originales is None:
+            return None
+        diferidos = self.get_deferred_fields()
+        return {
+            campo.name for campo in self._meta.concrete_fields
+            if campo.attname not in diferidos
+            and (campo.attname not in originales or originales[campo.attname] != getattr(self, campo.attname))
+        }
+
     def save(self, *args, **kwargs):
-        """Limpia y valida el DNI antes de guardar"""
-        self.full_clean()
-        super().save(*args, **kwargs)
+        """
+        Limpia y valida solo los campos que cambiaron (todos si es un alta) antes
+        de guardar. Los duplicados de email, DNI o token no se buscan con un
+        SELECT previo: los detecta la base y el IntegrityError se convierte en
+        el mismo ValidationError que daba full_clean().
+        """
+        campos = self.campos_modificados()
+        if campos is not None and kwargs.get('update_fields') is not None:
+            campos &= set(kwargs['update_fields'])
+        if campos is None:
+            self.full_clean(validate_unique=False, validate_constraints=False)
+        elif campos:
+            excluidos = [campo.name for campo in self._meta.fields if campo.name not in campos]
+            self.full_clean(exclude=excluidos, validate_unique=False, validate_constraints=False)
+
+        # Valores anteriores a este guardado, para las señales post_save (ver estadisticas.py)
+        self._valores_previos = getattr(self, '_valores_originales', None)
+
+        try:
+            # Savepoint: un duplicado no deja inutilizable la transacción de quien llama
+            with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            mensaje = str(e)
+            campo = next((campo for campo in self.CAMPOS_UNICOS if campo in mensaje), None)
+            if campo is None:
+                raise
+            raise ValidationError({campo: self.unique_error_message(type(self), (campo,))}) from e
+
+        if campos and campos & {'first_name', 'last_name'}:
+            # Los PDFs ya generados tienen el nombre anterior: se vuelven a generar al enviarlos
+            Certificado.objects.filter(asistente=self).exclude(pdf_generado='').exclude(pdf_generado__isnull=True).update(pdf_generado=None)
+
+        guardados = kwargs.get('update_fields')
+        valores = {campo.attname: getattr(self, campo.attname) for campo in self._meta.concrete_fields
+                   if campo.attname not in self.get_deferred_fields() and (guardados is None or campo.name in guardados)}
+        self._valores_originales = {**getattr(self, '_valores_originales', {}), **valores}
 
     @property
     def nombre_completo(self):
@@ -214,6 +278,12 @@ class Certificado(models.Model):
     pdf_generado = models.FileField(upload_to='certificados/', blank=True, null=True, verbose_name="PDF Generado")
     fecha_generacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Generación")
 
+    class Meta:
+        constraints = [
+            # Un certificado de cada tipo por asistente: la confirmación lo crea con INSERT ... ON CONFLICT DO NOTHING
+            models.UniqueConstraint(fields=['asistente', 'tipo_certificado'], name='certificado_unico_por_tipo'),
+        ]
+
     def __str__(self):
         return f"Certificado de {self.get_tipo_certificado_display()} para {self.asistente.first_name} {self.asistente.last_name}"
 
@@ -221,48 +291,156 @@ class Certificado(models.Model):
         """
         Genera un PDF personalizado usando la imagen base y superponiendo el nombre del asistente.
         """
-        import os
-        from PIL import Image, ImageDraw, ImageFont
-        from io import BytesIO
-        from django.core.files.base import ContentFile
-
-        # Ruta de la imagen base
-        base_path = os.path.join(os.path.dirname(__file__), '../certificates/Certificados-congreso.png')
-        base_path = os.path.abspath(base_path)
+        from .certificados import renderizar_certificado
+
         # Escribir el nombre en mayúsculas para reemplazar el texto de la plantilla
         nombre_apellido = f"{self.asistente.first_name} {self.asistente.last_name}".upper()
+        file_name = f"certificado_{self.asistente.email}.pdf"
+        self.pdf_generado.save(file_name, ContentFile(renderizar_certificado(nombre_apellido, tipo=self.tipo_certificado)), save=save)
+
+class TrabajoCertificados(models.Model):
+    """
+    Trabajo de generación de certificados en segundo plano.
+    Lo procesa el comando `generar_certificados`; como cada PDF se guarda apenas
+    se genera, un trabajo interrumpido se retoma con los certificados pendientes.
+    """
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_PROCESO = 'EN_PROCESO', 'En proceso'
+        COMPLETADO = 'COMPLETADO', 'Completado'
+        ERROR = 'ERROR', 'Con errores'
+
+    certificados = models.ManyToManyField(Certificado, blank=True, related_name='trabajos', verbose_name="Certificados")
+    estado = models.CharField(max_length=15, choices=Estado.choices, default=Estado.PENDIENTE, verbose_name="Estado")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total")
+    procesados = models.PositiveIntegerField(default=0, verbose_name="Procesados")
+    errores = models.PositiveIntegerField(default=0, verbose_name="Errores")
+    ultimo_error = models.TextField(blank=True, verbose_name="Último error")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
 
-        # Abrir la imagen base
-        img = Image.open(base_path).convert("RGBA")
-        draw = ImageDraw.Draw(img)
+    def __str__(self):
+        return f"Trabajo de certificados #{self.pk} ({self.procesados}/{self.total})"
 
-        # Fuente (ajusta la ruta y tamaño según el diseño y el servidor)
-        # Puedes cambiar la ruta a una fuente que tengas disponible
-        font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-        # Ajustar tamaño de fuente y posición para que reemplace exactamente 'NOMBRE Y APELLIDO'
-        font_size = 110  # Puedes ajustar este valor si el texto no encaja perfecto
-        try:
-            font = ImageFont.truetype(font_path, font_size)
-        except Exception:
-            font = ImageFont.load_default()
-
-        # Medir el texto para centrarlo (Pillow moderno: usar textbbox)
-        bbox = draw.textbbox((0, 0), nombre_apellido, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        x = (img.width - text_width) // 2
-        y = 470  # Ajusta este valor para que el texto quede justo encima de 'ha participado del'
-
-        # Escribir el texto (color azul similar al diseño)
-        draw.text((x, y), nombre_apellido, font=font, fill=(18, 90, 150, 255))
-
-        # Convertir la imagen a PDF en memoria
-        buffer = BytesIO()
-        rgb_img = img.convert('RGB')
-        rgb_img.save(buffer, format="PDF")
-        buffer.seek(0)
-        file_name = f"certificado_{self.asistente.email}.pdf"
-        self.pdf_generado.save(file_name, ContentFile(buffer.getvalue()), save=save)
+    @property
+    def progreso(self):
+        return round(100 * self.procesados / self.total, 1) if self.total else 100.0
+
+    class Meta:
+        ordering = ['fecha_creacion']
+        verbose_name = "Trabajo de certificados"
+        verbose_name_plural = "Trabajos de certificados"
+
+class EnvioEmail(models.Model):
+    """
+    Email en la cola de salida. Las vistas y acciones del admin solo crean estos
+    registros (agrupados por lote); los envía el comando `procesar_emails`,
+    que reintenta con espera creciente los que fallan.
+    """
+    class Tipo(models.TextChoices):
+        CONFIRMACION = 'CONFIRMACION', 'Confirmación de inscripción'
+        RECORDATORIO = 'RECORDATORIO', 'Recordatorio del evento'
+        CERTIFICADO = 'CERTIFICADO', 'Certificado de asistencia'
+        SOLICITUD_DNI = 'SOLICITUD_DNI', 'Solicitud de actualización de DNI'
+
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        ENVIANDO = 'ENVIANDO', 'Enviando'
+        ENVIADO = 'ENVIADO', 'Enviado'
+        ERROR = 'ERROR', 'Error'
+
+    lote = models.UUIDField(db_index=True, verbose_name="Lote")
+    tipo = models.CharField(max_length=20, choices=Tipo.choices, verbose_name="Tipo de email")
+    destinatario = models.EmailField(verbose_name="Destinatario")
+    asistente = models.ForeignKey(Asistente, on_delete=models.SET_NULL, null=True, blank=True, related_name='envios_email', verbose_name="Asistente")
+    contexto = models.JSONField(default=dict, blank=True, verbose_name="Contexto")
+    estado = models.CharField(max_length=10, choices=Estado.choices, default=Estado.PENDIENTE, verbose_name="Estado")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    ultimo_error = models.TextField(blank=True, verbose_name="Último error")
+    proximo_intento = models.DateTimeField(default=timezone.now, verbose_name="Próximo intento")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_envio = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de envío")
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} a {self.destinatario} ({self.get_estado_display()})"
+
+    class Meta:
+        ordering = ['fecha_creacion']
+        indexes = [models.Index(fields=['estado', 'proximo_intento'])]
+        verbose_name = "Envío de email"
+        verbose_name_plural = "Envíos de email"
+
+class TrabajoImportacion(models.Model):
+    """
+    Carga masiva de asistentes en segundo plano. La vista guarda el archivo y
+    crea el trabajo; el comando `procesar_importaciones` lo importa por bloques,
+    confirmando cada uno, y guarda el avance después de cada bloque para que un
+    trabajo interrumpido se retome desde la primera fila sin procesar.
+    """
+    class Formato(models.TextChoices):
+        COMPLETO = 'COMPLETO', 'Planilla de inscripción completa'
+        SIMPLE = 'SIMPLE', 'Planilla simple'
+
+    class Modo(models.TextChoices):
+        INSERTAR = 'INSERTAR', 'Solo asistentes nuevos'
+        UPSERT = 'UPSERT', 'Nuevos y completar los existentes'
+
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_PROCESO = 'EN_PROCESO', 'En proceso'
+        COMPLETADO = 'COMPLETADO', 'Completado'
+        ERROR = 'ERROR', 'Con errores'
+
+    archivo = models.FileField(upload_to='cargas_masivas/', verbose_name="Archivo")
+    formato = models.CharField(max_length=10, choices=Formato.choices, verbose_name="Formato")
+    modo = models.CharField(max_length=10, choices=Modo.choices, default=Modo.INSERTAR, verbose_name="Modo")
+    enviar_emails = models.BooleanField(default=False, verbose_name="Enviar emails de confirmación")
+    estado = models.CharField(max_length=15, choices=Estado.choices, default=Estado.PENDIENTE, verbose_name="Estado")
+    total = models.PositiveIntegerField(default=0, verbose_name="Filas (estimado)")
+    procesados = models.PositiveIntegerField(default=0, verbose_name="Filas procesadas")
+    exitosos = models.PositiveIntegerField(default=0, verbose_name="Exitosos")
+    actualizados = models.PositiveIntegerField(default=0, verbose_name="Actualizados")
+    sin_cambios = models.PositiveIntegerField(default=0, verbose_name="Sin cambios")
+    errores = models.PositiveIntegerField(default=0, verbose_name="Errores")
+    emails_encolados = models.PositiveIntegerField(default=0, verbose_name="Emails encolados")
+    lote_emails = models.UUIDField(null=True, blank=True, verbose_name="Lote de emails")
+    detalles = models.JSONField(default=list, blank=True, verbose_name="Detalle por fila")
+    detalles_omitidos = models.PositiveIntegerField(default=0, verbose_name="Filas sin detalle")
+    ultimo_error = models.TextField(blank=True, verbose_name="Último error")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de inicio")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
+
+    def __str__(self):
+        return f"Carga masiva #{self.pk} ({self.procesados}/{self.total})"
+
+    @property
+    def progreso(self):
+        if self.estado == self.Estado.COMPLETADO:
+            return 100.0
+        return min(round(100 * self.procesados / self.total, 1), 99.9) if self.total else 0.0
+
+    class Meta:
+        ordering = ['fecha_creacion']
+        verbose_name = "Trabajo de carga masiva"
+        verbose_name_plural = "Trabajos de carga masiva"
+
+class ContadorEstadistica(models.Model):
+    """
+    Contador acumulado de las estadísticas de asistencia (ver api/estadisticas.py).
+    La clave indica qué cuenta: 'registrados', 'confirmados', 'perfil:<tipo>',
+    'partido:<partido>' o 'hora:<AAAA-MM-DDTHH>'.
+    """
+    clave = models.CharField(max_length=300, unique=True, verbose_name="Clave")
+    valor = models.IntegerField(default=0, verbose_name="Valor")
+
+    def __str__(self):
+        return f"{self.clave}: {self.valor}"
+
+    class Meta:
+        ordering = ['clave']
+        verbose_name = "Contador de estadísticas"
+        verbose_name_plural = "Contadores de estadísticas"
 
 class Inscripcion(models.Model):
     asistente = models.ForeignKey(Asistente, on_delete=models.CASCADE)
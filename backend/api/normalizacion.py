@@ -0,0 +1,131 @@
+"""
+Esquema de columnas y normalización de datos de asistentes.
+
+Es el único lugar donde se decide cómo se llaman las columnas de una planilla,
+cómo se limpia un DNI, qué tipos de perfil se aceptan y qué es un email válido.
+Lo usan las dos cargas masivas (api/importacion.py), Asistente.clean() y el
+script fix_dni.py, así que cualquier planilla o corrección da el mismo resultado.
+
+Todo se prepara una sola vez al importar el módulo: el índice de alias de
+encabezados (normalizados sin tildes, mayúsculas ni guiones bajos) y las
+expresiones regulares. Las funciones que reciben una Series trabajan sobre la
+columna completa con operaciones vectorizadas de pandas.
+
+No importa los modelos: models.py lo usa para validar el DNI.
+"""
+import re
+import unicodedata
+
+import pandas as pd
+
+
+PATRON_EMAIL = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PATRON_NO_DIGITOS = re.compile(r'\D')
+PATRON_DNI = re.compile(r'^\d{8}$')
+_ESPACIOS = re.compile(r'[\s_]+')
+
+# Encabezados aceptados para cada campo de Asistente (se comparan con _clave())
+ALIAS_COLUMNAS = {
+    'first_name': ('nombre', 'first_name', 'primer_nombre'),
+    'last_name': ('apellido', 'last_name'),
+    'email': ('correo electronico', 'correo', 'email', 'mail'),
+    'phone': ('numero de celular (con codigo de area)', 'numero de celular', 'numero celular', 'celular', 'telefono', 'phone'),
+    'dni': ('dni', 'documento'),
+    'profile_type': ('tipo de perfil', 'tipo perfil', 'profile_type'),
+    'institution': ('institucion', 'institution'),
+    'rol_especifico': ('columna1', 'column1', 'rol especifico', 'rol'),
+}
+
+# Tipos de perfil aceptados (en mayúsculas, en inglés o en castellano) -> Asistente.ProfileType
+PERFILES = {
+    'VISITOR': 'VISITOR',
+    'VISITANTE': 'VISITOR',
+    'STUDENT': 'STUDENT',
+    'ESTUDIANTE': 'STUDENT',
+    'TEACHER': 'TEACHER',
+    'DOCENTE': 'TEACHER',
+    'PROFESSIONAL': 'PROFESSIONAL',
+    'PROFESIONAL': 'PROFESSIONAL',
+    'GRADUADO': 'GRADUADO',
+    'OTRO': 'OTRO',
+}
+
+
+class ColumnasFaltantes(Exception):
+    def __init__(self, faltantes, disponibles):
+        super().__init__(f'Faltan columnas requeridas: {", ".join(faltantes)}')
+        self.faltantes = faltantes
+        self.disponibles = disponibles
+
+
+def _clave(encabezado):
+    """Encabezado comparable: sin tildes, en minúsculas y con '_' y espacios repetidos como un espacio."""
+    texto = unicodedata.normalize('NFKD', str(encabezado)).encode('ascii', 'ignore').decode()
+    return _ESPACIOS.sub(' ', texto).strip().lower()
+
+
+class EsquemaColumnas:
+    """Índice alias -> campo, armado una vez, para reconocer los encabezados de una planilla."""
+
+    def __init__(self, alias=ALIAS_COLUMNAS):
+        self._indice = {}
+        for campo, variantes in alias.items():
+            for variante in variantes:
+                self._indice.setdefault(_clave(variante), campo)
+
+    def resolver(self, columnas_archivo, requeridas=(), nombres=None):
+        """
+        Devuelve {campo: columna del archivo}; si un campo aparece dos veces vale la
+        primera. Lanza ColumnasFaltantes (con los `nombres` para mostrar) si falta alguna requerida.
+        """
+        mapeo = {}
+        for columna in columnas_archivo:
+            campo = self._indice.get(_clave(columna))
+            if campo is not None and campo not in mapeo:
+                mapeo[campo] = columna
+        faltantes = [(nombres or {}).get(campo, campo) for campo in requeridas if campo not in mapeo]
+        if faltantes:
+            raise ColumnasFaltantes(faltantes, list(columnas_archivo))
+        return mapeo
+
+
+ESQUEMA_ASISTENTES = EsquemaColumnas()
+
+
+def texto(serie):
+    """Serie como texto sin espacios; NaN queda vacío y los números enteros leídos como float pierden el '.0'."""
+    if pd.api.types.is_float_dtype(serie):
+        enteros = serie.notna() & (serie % 1 == 0)
+        resultado = serie.astype(object).astype(str)
+        resultado[enteros] = serie[enteros].astype('int64').astype(str)
+    elif serie.dtype == object:
+        # Columnas mixtas (por ejemplo DNIs como número y como texto en la misma columna)
+        resultado = serie.map(lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v))
+    else:
+        resultado = serie.astype(str)
+    return resultado.where(serie.notna(), '').str.strip()
+
+
+def normalizar_dni_valor(dni):
+    """Solo los dígitos y, si quedan 9 terminados en 0, sin el último (un 0 de más al tipearlo)."""
+    limpio = PATRON_NO_DIGITOS.sub('', dni or '')
+    if len(limpio) == 9 and limpio.endswith('0'):
+        limpio = limpio[:-1]
+    return limpio
+
+
+def normalizar_dni(serie):
+    """normalizar_dni_valor() aplicado a toda una Series de texto."""
+    limpio = serie.str.replace(PATRON_NO_DIGITOS, '', regex=True)
+    nueve = (limpio.str.len() == 9) & limpio.str.endswith('0')
+    return limpio.mask(nueve, limpio.str[:-1])
+
+
+def dni_valido(dni):
+    """True si el DNI (ya normalizado) tiene exactamente 8 dígitos."""
+    return bool(dni and PATRON_DNI.match(dni))
+
+
+def normalizar_perfil(serie, por_defecto):
+    """Valor de Asistente.ProfileType para cada tipo de perfil escrito en la planilla; `por_defecto` si no se reconoce."""
+    return serie.str.strip().str.upper().map(PERFILES).fillna(por_defecto)
@@ -0,0 +1,145 @@
+"""
+Registro de plantillas de certificados.
+
+Cada plantilla (asistente, disertante, empresa) se decodifica una sola vez por
+proceso junto con su fuente, y se entregan copias en memoria de la imagen base.
+Si el archivo PNG cambia en disco (mtime distinto) se vuelve a cargar.
+Para los PDFs vectoriales se genera además, una vez por versión de la
+plantilla, un JPEG del fondo que reportlab embebe sin volver a decodificarlo.
+Como el nombre va como texto, el fondo se reduce a FONDO_DPI sobre la página
+A4 apaisada: alcanza para imprimirlo y el PDF pesa menos que el raster.
+"""
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+from PIL import Image, ImageFont
+from reportlab.lib.pagesizes import A4, landscape
+
+
+CERTIFICATES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../certificates'))
+FONDOS_DIR = os.path.join(tempfile.gettempdir(), 'congreso-unab-certificados')
+FONDO_JPEG_CALIDAD = 75
+FONDO_DPI = 150
+# Ancho del fondo en píxeles para una página A4 apaisada (72 puntos por pulgada) a FONDO_DPI
+FONDO_ANCHO_PX = round(landscape(A4)[0] / 72 * FONDO_DPI)
+FUENTE_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+# posicion_y: justo encima de 'ha participado del'; fuente de 110 para reemplazar 'NOMBRE Y APELLIDO'
+Plantilla = namedtuple('Plantilla', ['archivo', 'fuente_path', 'fuente_tamanio', 'posicion_y', 'color'])
+
+PLANTILLAS = {
+    'ASISTENCIA': Plantilla('Certificados-congreso.png', FUENTE_BOLD, 110, 470, (18, 90, 150, 255)),
+    'DISERTANTE': Plantilla('Certificados-congreso-disertantes.png', FUENTE_BOLD, 110, 470, (18, 90, 150, 255)),
+    # Mientras no haya un diseño propio para empresas se usa el de asistencia
+    'EMPRESA': Plantilla('Certificados-congreso-empresas.png', FUENTE_BOLD, 110, 470, (18, 90, 150, 255)),
+}
+PLANTILLA_POR_DEFECTO = 'ASISTENCIA'
+
+
+def _cargar_fuente(path, tamanio):
+    try:
+        return ImageFont.truetype(path, tamanio)
+    except Exception:
+        return ImageFont.load_default()
+
+
+class RegistroPlantillas:
+    """Caché por proceso de plantillas decodificadas (RGBA) y sus fuentes."""
+
+    def __init__(self, plantillas=PLANTILLAS, directorio=CERTIFICATES_DIR):
+        self._plantillas = plantillas
+        self._directorio = directorio
+        self._imagenes = {}
+        self._fuentes = {}
+        self._fuentes_pdf = {}
+        self._lock = threading.Lock()
+
+    def path(self, tipo):
+        plantilla = self._plantillas[tipo]
+        path = os.path.join(self._directorio, plantilla.archivo)
+        if not os.path.exists(path) and tipo != PLANTILLA_POR_DEFECTO:
+            return self.path(PLANTILLA_POR_DEFECTO)
+        return path
+
+    def plantilla(self, tipo=PLANTILLA_POR_DEFECTO):
+        return self._plantillas[tipo]
+
+    def fuente(self, path, tamanio):
+        clave = (path, tamanio)
+        if clave not in self._fuentes:
+            self._fuentes[clave] = _cargar_fuente(path, tamanio)
+        return self._fuentes[clave]
+
+    def _imagen(self, path):
+        """Imagen base decodificada; se recarga si el archivo cambió en disco."""
+        mtime = os.stat(path).st_mtime
+        cargada = self._imagenes.get(path)
+        if cargada is None or cargada[0] != mtime:
+            with self._lock:
+                imagen = Image.open(path).convert("RGBA")
+                imagen.load()
+                cargada = (mtime, imagen)
+                self._imagenes[path] = cargada
+        return cargada[1]
+
+    def obtener(self, tipo=PLANTILLA_POR_DEFECTO):
+        """
+        Devuelve (imagen, fuente, plantilla): una copia de la imagen base lista
+        para dibujar, la fuente ya cargada y la configuración de la plantilla.
+        """
+        plantilla = self._plantillas[tipo]
+        imagen = self._imagen(self.path(tipo))
+        return imagen.copy(), self.fuente(plantilla.fuente_path, plantilla.fuente_tamanio), plantilla
+
+    def dimensiones(self, tipo=PLANTILLA_POR_DEFECTO):
+        """(ancho, alto) en píxeles de la plantilla, sin copiar la imagen."""
+        return self._imagen(self.path(tipo)).size
+
+    def fondo_jpeg(self, tipo=PLANTILLA_POR_DEFECTO):
+        """
+        Ruta a un JPEG con el fondo de la plantilla reducido a FONDO_ANCHO_PX, para
+        embeberlo tal cual en el PDF. El nombre incluye el mtime de la plantilla y
+        la resolución y calidad, así que cualquier cambio genera uno nuevo.
+        """
+        path = self.path(tipo)
+        mtime = os.stat(path).st_mtime
+        nombre = os.path.splitext(os.path.basename(path))[0]
+        jpeg_path = os.path.join(FONDOS_DIR, f"{nombre}-{int(mtime)}-{FONDO_ANCHO_PX}-{FONDO_JPEG_CALIDAD}.jpg")
+        if not os.path.exists(jpeg_path):
+            os.makedirs(FONDOS_DIR, exist_ok=True)
+            temporal = f"{jpeg_path}.{os.getpid()}.tmp"
+            fondo = self._imagen(path).convert('RGB')
+            if fondo.width > FONDO_ANCHO_PX:
+                fondo = fondo.resize((FONDO_ANCHO_PX, round(fondo.height * FONDO_ANCHO_PX / fondo.width)), Image.LANCZOS)
+            fondo.save(temporal, format='JPEG', quality=FONDO_JPEG_CALIDAD, optimize=True)
+            os.replace(temporal, jpeg_path)
+        return jpeg_path
+
+    def fuente_pdf(self, tipo=PLANTILLA_POR_DEFECTO):
+        """Nombre de la fuente de la plantilla registrada en reportlab (Helvetica-Bold si no está disponible)."""
+        plantilla = self._plantillas[tipo]
+        nombre = os.path.splitext(os.path.basename(plantilla.fuente_path))[0]
+        if nombre not in self._fuentes_pdf:
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+            try:
+                pdfmetrics.registerFont(TTFont(nombre, plantilla.fuente_path))
+                self._fuentes_pdf[nombre] = nombre
+            except Exception:
+                self._fuentes_pdf[nombre] = 'Helvetica-Bold'
+        return self._fuentes_pdf[nombre]
+
+    def precargar(self, *tipos):
+        for tipo in tipos or self._plantillas:
+            plantilla = self._plantillas[tipo]
+            self._imagen(self.path(tipo))
+            self.fuente(plantilla.fuente_path, plantilla.fuente_tamanio)
+
+    def invalidar(self):
+        with self._lock:
+            self._imagenes.clear()
+
+
+registro_plantillas = RegistroPlantillas()
@@ -0,0 +1,102 @@
+"""
+Plantillas de email precompiladas.
+
+En un envío masivo lo único que cambia entre destinatarios es el nombre (y el
+email y el tipo de inscripción). Por eso la plantilla se renderiza una sola
+vez con marcadores en esos campos y se guarda junto con su versión en texto
+plano; para cada destinatario solo se reemplazan los marcadores por los
+valores escapados. El resultado es idéntico al de render_to_string() con el
+contexto completo.
+
+El logo embebido se lee y se codifica como MIMEImage una sola vez por proceso
+(se vuelve a leer si el archivo cambia). Django solo adjunta ese objeto al
+mensaje sin modificarlo, así que todos los emails comparten la misma parte.
+
+Los campos por destinatario solo se pueden usar como {{ campo }} en la
+plantilla, no dentro de {% if %} ni con filtros.
+"""
+import os
+import threading
+from email.mime.image import MIMEImage
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape, strip_tags
+
+
+CAMPOS_DESTINATARIO = ('asistente_nombre', 'asistente_email', 'tipo_inscripcion')
+MAX_PLANTILLAS = 64
+
+
+def _marcador(campo):
+    return f"\x00{campo}\x00"
+
+
+class PlantillaEmail:
+    """Plantilla ya renderizada con marcadores en los campos de cada destinatario."""
+
+    def __init__(self, template_name, contexto):
+        marcadores = {campo: _marcador(campo) for campo in CAMPOS_DESTINATARIO}
+        self.html = render_to_string(template_name, {**contexto, **marcadores})
+        self.texto = strip_tags(self.html)
+        self.campos = [campo for campo in CAMPOS_DESTINATARIO if _marcador(campo) in self.html]
+
+    def renderizar(self, valores):
+        """Devuelve (html, texto) para un destinatario."""
+        html, texto = self.html, self.texto
+        for campo in self.campos:
+            # Igual que el template: una variable ausente queda vacía y None se muestra como 'None'
+            valor = str(conditional_escape(valores.get(campo, '')))
+            html = html.replace(_marcador(campo), valor)
+            texto = texto.replace(_marcador(campo), valor)
+        return html, texto
+
+
+class RegistroPlantillasEmail:
+    """Caché por proceso de plantillas compiladas (por plantilla y contexto común) y del logo."""
+
+    def __init__(self):
+        self._plantillas = {}
+        self._logo = None
+        self._lock = threading.Lock()
+
+    def compilar(self, template_name, contexto):
+        """PlantillaEmail para el contexto común dado (sin los campos de cada destinatario)."""
+        clave = (template_name, repr(sorted(contexto.items())))
+        plantilla = self._plantillas.get(clave)
+        if plantilla is None:
+            plantilla = PlantillaEmail(template_name, contexto)
+            with self._lock:
+                if len(self._plantillas) >= MAX_PLANTILLAS:
+                    self._plantillas.clear()
+                self._plantillas[clave] = plantilla
+        return plantilla
+
+    def logo(self):
+        """MIMEImage del logo del congreso lista para adjuntar, o None si no existe el archivo."""
+        logo_env = os.getenv('LOGO_CONGRESO_PATH', 'media/logo.png')
+        logo_path = os.path.join(settings.BASE_DIR, logo_env)
+        try:
+            mtime = os.stat(logo_path).st_mtime
+        except OSError:
+            if self._logo is None or self._logo[0] != logo_path:
+                print(f"[ERROR] No se encontró el logo en {logo_path}")
+                self._logo = (logo_path, None, None)
+            return None
+
+        if self._logo is None or self._logo[:2] != (logo_path, mtime):
+            with open(logo_path, 'rb') as f:
+                logo_img = MIMEImage(f.read(), _subtype="png")
+            logo_img.add_header('Content-ID', '<logo_congreso>')
+            logo_img.add_header('Content-Disposition', 'inline', filename='logo-congreso.png')
+            with self._lock:
+                self._logo = (logo_path, mtime, logo_img)
+        return self._logo[2]
+
+    def invalidar(self):
+        with self._lock:
+            self._plantillas.clear()
+            self._logo = None
+
+
+registro_plantillas_email = RegistroPlantillasEmail()
@@ -0,0 +1,94 @@
+"""
+Envío de emails en paralelo, fuera del request.
+
+Las confirmaciones de un grupo se despachan con transaction.on_commit(): el
+registro responde apenas se guardan las filas y, recién entonces, cada email
+del grupo se manda como una tarea a un pool acotado de hilos
+(EMAIL_POOL_HILOS). Cada hilo mantiene su propio EnviadorEmails, así que
+reutiliza una misma conexión SMTP entre tareas (si el servidor la cerró por
+inactividad, EnviadorEmails reconecta) y los emails de un grupo de 40 salen
+por varias conexiones en paralelo.
+
+Con EMAIL_POOL_HILOS = 0 las tareas se ejecutan en el mismo hilo (útil en tests).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .email import EnviadorEmails, send_group_member_email, send_group_representative_email
+from .models import Asistente
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'EMAIL_POOL_HILOS', 4),
+                    thread_name_prefix='emails',
+                )
+    return _pool
+
+
+def _enviador_del_hilo():
+    """EnviadorEmails propio del hilo: la conexión SMTP se reutiliza entre tareas."""
+    enviador = getattr(_local, 'enviador', None)
+    if enviador is None:
+        enviador = _local.enviador = EnviadorEmails()
+    return enviador
+
+
+def _ejecutar(funcion, *args):
+    if getattr(settings, 'EMAIL_POOL_HILOS', 4) <= 0:
+        funcion(*args)
+    else:
+        _obtener_pool().submit(_tarea_en_hilo, funcion, *args)
+
+
+def _tarea_en_hilo(funcion, *args):
+    close_old_connections()
+    try:
+        funcion(*args)
+    finally:
+        # La conexión a la base es del hilo del pool: no dejarla abierta entre tareas
+        close_old_connections()
+
+
+def _email_representante(representante_id):
+    representante = Asistente.objects.get(pk=representante_id)
+    try:
+        send_group_representative_email(representante, enviador=_enviador_del_hilo())
+    except Exception as e:
+        print(f"[ERROR] Error enviando email al representante {representante.email}: {e}")
+
+
+def _email_miembro(miembro_id):
+    miembro = Asistente.objects.select_related('representante_grupo').get(pk=miembro_id)
+    try:
+        send_group_member_email(miembro, miembro.representante_grupo, enviador=_enviador_del_hilo())
+    except Exception as e:
+        print(f"[ERROR] Error enviando email al miembro {miembro.email}: {e}")
+
+
+def _despachar_grupo(representante_id):
+    miembros = list(Asistente.objects.filter(representante_grupo_id=representante_id).values_list('id', flat=True))
+    print(f"[INFO] Despachando {len(miembros) + 1} emails del grupo del representante #{representante_id}")
+    _ejecutar(_email_representante, representante_id)
+    for miembro_id in miembros:
+        _ejecutar(_email_miembro, miembro_id)
+
+
+def despachar_confirmaciones_grupo(representante):
+    """
+    Programa los emails de confirmación del representante y de cada miembro
+    para después del commit de la transacción actual (si se revierte, no se envía nada).
+    """
+    transaction.on_commit(lambda: _despachar_grupo(representante.pk))
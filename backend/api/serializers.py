@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from .models import Disertante, Empresa, Programa, Asistente, MiembroGrupo, Inscripcion
-from django.db import transaction
-from .email import send_group_confirmation_emails, send_individual_confirmation_email
+from django.db import IntegrityError
+from .altas import buscar_registrados, insertar_asistentes
+from .normalizacion import dni_valido, normalizar_dni_valor
+from .email import send_individual_confirmation_email
+from .pool_emails import despachar_confirmaciones_grupo
 import re
 
 class DisertanteSerializer(serializers.ModelSerializer):
@@ -64,17 +67,13 @@ class DisertanteSerializer(serializers.ModelSerializer):
         return foto_url
 
 class ProgramaSerializer(serializers.ModelSerializer):
-    disertantes = serializers.SerializerMethodField()
+    # Un solo DisertanteSerializer para todo el programa (recibe el contexto de la request
+    # del serializer padre); los disertantes salen del prefetch_related de ProgramaViewSet
+    disertantes = DisertanteSerializer(many=True, read_only=True)
 
     class Meta:
         model = Programa
         fields = ['titulo', 'disertantes', 'hora_inicio', 'hora_fin', 'dia', 'descripcion', 'aula', 'categoria']
-    
-    def get_disertantes(self, obj):
-        """Serializa los disertantes pasando el contexto de la request"""
-        disertantes = obj.disertantes.all()
-        serializer = DisertanteSerializer(disertantes, many=True, context=self.context)
-        return serializer.data
 
 class EmpresaSerializer(serializers.ModelSerializer):
     def to_internal_value(self, data):
@@ -131,6 +130,13 @@ class AsistenteGrupoSerializer(serializers.Serializer):
     email = serializers.EmailField()
     dni = serializers.CharField(max_length=10)
 
+    def validate_dni(self, value):
+        """Mismas reglas que Asistente.clean(): los miembros se insertan con bulk_create, sin full_clean()"""
+        dni = normalizar_dni_valor(value)
+        if not dni_valido(dni):
+            raise serializers.ValidationError('El DNI debe tener exactamente 8 dígitos numéricos.')
+        return dni
+
 class AsistenteSerializer(serializers.ModelSerializer):
     miembros_grupo = MiembroGrupoSerializer(many=True, required=False)  # Mantenemos compatibilidad
     miembros_grupo_nuevos = AsistenteGrupoSerializer(many=True, required=False, write_only=True)  # Nueva estructura
@@ -169,46 +175,17 @@ class AsistenteSerializer(serializers.ModelSerializer):
         
         if asistente.profile_type == Asistente.ProfileType.GROUP_REPRESENTATIVE:
             # Sistema anterior (MiembroGrupo) - mantenemos compatibilidad
-            for miembro_data in miembros_data:
-                MiembroGrupo.objects.create(representante=asistente, **miembro_data)
-            
+            MiembroGrupo.objects.bulk_create([
+                MiembroGrupo(representante=asistente, **miembro_data) for miembro_data in miembros_data
+            ])
+
             # Nuevo sistema - crear asistentes individuales
-            for miembro_data in miembros_nuevos_data:
-                # Validar que no exista DNI o email duplicado
-                dni = miembro_data.get('dni')
-                email = miembro_data.get('email')
-                
-                if dni and Asistente.objects.filter(dni=dni).exists():
-                    raise serializers.ValidationError({
-                        'miembros_grupo_nuevos': f'Ya existe un asistente con DNI {dni}'
-                    })
-                
-                if email and Asistente.objects.filter(email=email).exists():
-                    raise serializers.ValidationError({
-                        'miembros_grupo_nuevos': f'Ya existe un asistente con email {email}'
-                    })
-                
-                # Crear asistente miembro del grupo
-                Asistente.objects.create(
-                    first_name=miembro_data['first_name'],
-                    last_name=miembro_data['last_name'],
-                    email=miembro_data['email'],
-                    dni=miembro_data['dni'],
-                    phone='',  # Opcional para miembros
-                    profile_type=Asistente.ProfileType.VISITOR,  # Por defecto visitante
-                    representante_grupo=asistente,
-                    # Heredar algunos datos del grupo
-                    group_name=asistente.group_name,
-                    group_municipality=asistente.group_municipality,
-                )
-            
-            # Enviar emails de confirmación a todos los miembros del grupo
-            try:
-                resultado_envio = send_group_confirmation_emails(asistente)
-                print(f"[INFO] Emails enviados: {resultado_envio['total_emails']}, Fallidos: {resultado_envio['total_fallidos']}")
-            except Exception as e:
-                print(f"[ERROR] Error enviando emails grupales: {e}")
-                # No interrumpimos el proceso de registro por fallos en el email
+            if miembros_nuevos_data:
+                self._crear_miembros(asistente, miembros_nuevos_data)
+
+            # Enviar emails de confirmación a todos los miembros del grupo, en paralelo
+            # y después del commit: el registro no espera al servidor SMTP
+            despachar_confirmaciones_grupo(asistente)
         else:
             # Para inscripciones individuales, enviar email de confirmación
             try:
@@ -219,6 +196,60 @@ class AsistenteSerializer(serializers.ModelSerializer):
         
         return asistente
 
+    def _crear_miembros(self, representante, miembros_data):
+        """
+        Crea los asistentes miembros del grupo con una sola consulta de duplicados
+        (contra la base y dentro de la lista enviada) y un bulk_create. Si hay
+        duplicados se informan todos, indicando el número de miembro.
+        """
+        errores = []
+        primeros_emails, primeros_dnis = {}, {}
+        for numero, miembro_data in enumerate(miembros_data, start=1):
+            email = miembro_data['email'].strip().lower()
+            dni = miembro_data['dni']
+            if email in primeros_emails:
+                errores.append(f'Miembro {numero} ({email}): el email está repetido en el miembro {primeros_emails[email]}')
+            if dni in primeros_dnis:
+                errores.append(f'Miembro {numero} ({email}): el DNI {dni} está repetido en el miembro {primeros_dnis[dni]}')
+            primeros_emails.setdefault(email, numero)
+            primeros_dnis.setdefault(dni, numero)
+
+        emails_registrados, dnis_registrados = set(), set()
+        for email, dni in buscar_registrados(primeros_emails, primeros_dnis, 'dni'):
+            emails_registrados.add(email)
+            dnis_registrados.add(dni)
+        for email, numero in primeros_emails.items():
+            if email in emails_registrados:
+                errores.append(f'Miembro {numero} ({email}): ya existe un asistente con email {email}')
+        for dni, numero in primeros_dnis.items():
+            if dni in dnis_registrados:
+                errores.append(f'Miembro {numero} ({miembros_data[numero - 1]["email"].strip().lower()}): ya existe un asistente con DNI {dni}')
+        if errores:
+            raise serializers.ValidationError({'miembros_grupo_nuevos': errores})
+
+        miembros = [
+            Asistente(
+                first_name=miembro_data['first_name'],
+                last_name=miembro_data['last_name'],
+                email=miembro_data['email'].strip(),
+                dni=miembro_data['dni'],
+                phone='',  # Opcional para miembros
+                profile_type=Asistente.ProfileType.VISITOR,  # Por defecto visitante
+                representante_grupo=representante,
+                # Heredar algunos datos del grupo
+                group_name=representante.group_name,
+                group_municipality=representante.group_municipality,
+            )
+            for miembro_data in miembros_data
+        ]
+        try:
+            return insertar_asistentes(miembros)
+        except IntegrityError:
+            # Otra inscripción registró alguno de estos emails/DNIs entre la consulta y el insert
+            raise serializers.ValidationError({
+                'miembros_grupo_nuevos': ['Alguno de los miembros se registró en este momento por otra inscripción. Revisá la lista y volvé a enviarla.']
+            })
+
     def validate_dni(self, value):
         """Valida que el DNI tenga exactamente 8 dígitos numéricos"""
         if value:
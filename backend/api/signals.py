@@ -0,0 +1,55 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Asistente, Disertante, Empresa, Programa
+from . import estadisticas
+from .cache_publica import invalidar_cache_publica
+from .snapshots import programar_snapshots
+from .checkin import indice_checkin
+
+
+@receiver(post_save, sender=Asistente)
+def sincronizar_indice_checkin(sender, instance, update_fields=None, **kwargs):
+    """Mantiene el índice de check-in al día con cada alta o modificación"""
+    indice_checkin.sincronizar(instance, update_fields)
+
+
+@receiver(post_delete, sender=Asistente)
+def quitar_de_indice_checkin(sender, instance, **kwargs):
+    indice_checkin.eliminar(instance.dni)
+
+
+@receiver(post_save, sender=Asistente)
+def actualizar_estadisticas(sender, instance, created, update_fields=None, **kwargs):
+    """Mantiene los contadores de estadísticas.py al día con cada alta o modificación"""
+    if created:
+        estadisticas.registrar_altas([instance])
+    else:
+        estadisticas.registrar_cambio(getattr(instance, '_valores_previos', None), instance, update_fields)
+
+
+@receiver(post_delete, sender=Asistente)
+def descontar_de_estadisticas(sender, instance, **kwargs):
+    estadisticas.registrar_baja(instance)
+
+
+@receiver(post_save, sender=Programa)
+@receiver(post_delete, sender=Programa)
+@receiver(post_save, sender=Disertante)
+@receiver(post_delete, sender=Disertante)
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+def invalidar_api_publica(sender, **kwargs):
+    """
+    Cualquier cambio en el programa, los disertantes o las empresas invalida las
+    respuestas cacheadas y regenera los snapshots estáticos al confirmar.
+    """
+    invalidar_cache_publica()
+    programar_snapshots()
+
+
+@receiver(m2m_changed, sender=Programa.disertantes.through)
+def invalidar_api_publica_disertantes(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_cache_publica()
+        programar_snapshots()
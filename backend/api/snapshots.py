@@ -0,0 +1,118 @@
+"""
+Snapshots estáticos de la API pública.
+
+Escribe programa.json, disertantes.json y empresas.json (con el mismo
+contenido que /api/programa/, /api/disertantes/ y /api/empresas/ pedidos a
+SNAPSHOTS_URL_BASE, que es de donde salen las URLs absolutas de fotos y
+logos) en SNAPSHOTS_DIR, junto con sus versiones .gz y, si está instalado el paquete
+brotli, .br. El frontend puede pedir esos archivos al servidor web o a la CDN
+sin pasar por Django, así que los picos de visitas no llegan al backend y los
+datos siguen disponibles aunque se reinicie.
+
+Se regeneran con el comando `generar_snapshots` y al confirmarse cualquier
+transacción que guarde o borre programa, disertantes o empresas, venga del
+admin, de la API (registro de empresas), del shell o de un comando (ver las
+señales en signals.py).
+Solo se reescriben los archivos cuyo contenido cambió, cada uno con un
+reemplazo atómico para que nunca se sirva un JSON a medio escribir.
+"""
+import gzip
+import os
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete solo se generan las variantes .gz
+    brotli = None
+
+
+def _vistas():
+    # Los mismos querysets y serializers que la API, para que el contenido sea idéntico
+    from .views import DisertanteViewSet, EmpresaViewSet, ProgramaViewSet
+    return (
+        ('programa.json', ProgramaViewSet),
+        ('disertantes.json', DisertanteViewSet),
+        ('empresas.json', EmpresaViewSet),
+    )
+
+
+def _request_publico():
+    """Request de mentira con el origen de SNAPSHOTS_URL_BASE, para que las URLs de las imágenes sean absolutas."""
+    base = urlsplit(settings.SNAPSHOTS_URL_BASE)
+    return RequestFactory().get('/', HTTP_HOST=base.netloc, secure=base.scheme == 'https')
+
+
+def _escribir(ruta, contenido):
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _sin_cambios(ruta, contenido):
+    try:
+        with open(ruta, 'rb') as f:
+            return f.read() == contenido
+    except OSError:
+        return False
+
+
+def generar_snapshots(directorio=None):
+    """Escribe los snapshots que cambiaron y devuelve sus nombres."""
+    directorio = directorio or settings.SNAPSHOTS_DIR
+    os.makedirs(directorio, exist_ok=True)
+    escritos = []
+    contexto = {'request': _request_publico()}
+    for nombre, vista in _vistas():
+        datos = vista.serializer_class(vista.queryset.all(), many=True, context=contexto).data
+        contenido = JSONRenderer().render(datos)
+        ruta = os.path.join(directorio, nombre)
+        if _sin_cambios(ruta, contenido):
+            continue
+
+        variantes = [(f'{ruta}.gz', gzip.compress(contenido, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variantes.append((f'{ruta}.br', brotli.compress(contenido)))
+        # El .json va último: si algo falla antes, la próxima corrida vuelve a escribir todo
+        for destino, bytes_archivo in variantes + [(ruta, contenido)]:
+            _escribir(destino, bytes_archivo)
+        escritos.append(nombre)
+    return escritos
+
+
+def _generar_sin_fallar():
+    try:
+        escritos = generar_snapshots()
+    except Exception as e:
+        print(f"[ERROR] No se pudieron generar los snapshots de la API pública: {e}")
+    else:
+        if escritos:
+            print(f"[INFO] Snapshots actualizados: {', '.join(escritos)}")
+
+
+# Pedidos de regeneración por thread: los on_commit corren en el thread de la
+# transacción, así que al confirmar todos los pedidos anteriores ya están incluidos
+_pedidos = threading.local()
+
+
+def _generar_pedido(numero):
+    if numero <= getattr(_pedidos, 'generado', 0):
+        return
+    _pedidos.generado = _pedidos.ultimo
+    _generar_sin_fallar()
+
+
+def programar_snapshots():
+    """
+    Regenera los snapshots después del commit de la transacción actual (si se
+    revierte, no hace nada). Una transacción que cambia muchas filas los
+    regenera una sola vez.
+    """
+    _pedidos.ultimo = numero = getattr(_pedidos, 'ultimo', 0) + 1
+    transaction.on_commit(lambda: _generar_pedido(numero))
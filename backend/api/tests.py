@@ -1,9 +1,9 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from .models import Disertante, Asistente, Inscripcion, MiembroGrupo, Empresa, Certificado
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from django.utils import timezone
 
 class DisertanteViewSetTest(TestCase):
@@ -25,6 +25,165 @@ class DisertanteViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['nombre'], self.disertante_data['nombre'])
 
+class ProgramaViewSetTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def _crear_programa(self, cantidad):
+        import datetime
+        from .models import Programa
+        for i in range(cantidad):
+            programa = Programa.objects.create(
+                titulo=f'Charla {i}', hora_inicio=datetime.time(9 + i % 8), hora_fin=datetime.time(10 + i % 8),
+                dia=datetime.date(2025, 11, 15 + i // 8), aula='Aula 1', categoria='TECNOLOGIA'
+            )
+            disertantes = [
+                Disertante.objects.create(nombre=f'Disertante {i}-{j}', bio='Bio', foto_url=f'ponencias/{i}-{j}.png')
+                for j in range(2)
+            ]
+            programa.disertantes.set(disertantes)
+
+    def test_agenda_en_cantidad_fija_de_consultas(self):
+        self._crear_programa(3)
+        # Una consulta para las charlas y otra para los disertantes de todas
+        with self.assertNumQueries(2):
+            response = APIClient().get(reverse('programa-list'))
+        self.assertEqual(len(response.data), 3)
+
+        self._crear_programa(12)
+        with self.assertNumQueries(2):
+            response = APIClient().get(reverse('programa-list'))
+        self.assertEqual(len(response.data), 15)
+        primera = response.data[0]
+        self.assertEqual(primera['titulo'], 'Charla 0')
+        self.assertEqual([d['nombre'] for d in primera['disertantes']], ['Disertante 0-0', 'Disertante 0-1'])
+        self.assertEqual(
+            primera['disertantes'][0]['foto_url'], 'https://www.congresologistica.unab.edu.ar/media/ponencias/0-0.png'
+        )
+
+    def test_respuestas_cacheadas_con_etag_hasta_que_cambian_los_datos(self):
+        from .models import Programa
+        self._crear_programa(2)
+        cliente = APIClient()
+        primera = cliente.get(reverse('programa-list'))
+        etag = primera['ETag']
+        with self.assertNumQueries(0):
+            segunda = cliente.get(reverse('programa-list'))
+            no_modificada = cliente.get(reverse('programa-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(no_modificada.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Agregar un disertante a una charla (m2m_changed) invalida la respuesta
+        nuevo = Disertante.objects.create(nombre='Agregado', bio='Bio')
+        Programa.objects.get(titulo='Charla 1').disertantes.add(nuevo)
+        respuesta = cliente.get(reverse('programa-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertIn('Agregado', [d['nombre'] for d in respuesta.json()[1]['disertantes']])
+
+        # Los otros endpoints públicos también se invalidan con sus modelos
+        self.assertEqual(cliente.get(reverse('empresa-list')).json(), [])
+        Empresa.objects.create(nombre_empresa='Logística SA', logo='logos_empresas/logo.png')
+        self.assertEqual(len(cliente.get(reverse('empresa-list')).json()), 1)
+        Disertante.objects.filter(nombre='Agregado').delete()
+        self.assertNotIn('Agregado', [d['nombre'] for d in cliente.get(reverse('disertante-list')).json()])
+
+    def test_filtros_del_programa_y_paginacion_por_cursor(self):
+        import datetime
+        from .models import Programa
+        self._crear_programa(10)  # 8 charlas el 15/11 (9 a 16 hs) y 2 el 16/11, todas en Aula 1
+        magna = Programa.objects.create(
+            titulo='Apertura', hora_inicio=datetime.time(10, 30), hora_fin=datetime.time(12), dia=datetime.date(2025, 11, 15),
+            aula='Aula Magna', categoria='RADIO'
+        )
+        magna.disertantes.set([Disertante.objects.get(nombre='Disertante 0-0')])
+        cliente = APIClient()
+
+        def titulos(**parametros):
+            response = cliente.get(reverse('programa-list'), parametros)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [p['titulo'] for p in response.data]
+
+        with self.assertNumQueries(2):
+            self.assertEqual(titulos(dia='2025-11-15', aula='Aula Magna', hora='11:00'), ['Apertura'])
+        self.assertEqual(titulos(dia='2025-11-16'), ['Charla 8', 'Charla 9'])
+        self.assertEqual(titulos(categoria='radio'), ['Apertura'])
+        self.assertEqual(titulos(dia='2025-11-15', desde='10:45', hasta='12:00'), ['Charla 1', 'Apertura', 'Charla 2'])
+        self.assertEqual(titulos(disertante=magna.disertantes.get().pk), ['Charla 0', 'Apertura'])
+        response = cliente.get(reverse('programa-list'), {'dia': '15/11/2025'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('dia', response.data)
+
+        # Sin cursor ni page_size sigue siendo la lista completa; con page_size, páginas por cursor
+        self.assertEqual(len(titulos()), 11)
+        pagina = cliente.get(reverse('programa-list'), {'page_size': 4, 'dia': '2025-11-15'}).data
+        self.assertEqual([p['titulo'] for p in pagina['results']], ['Charla 0', 'Charla 1', 'Apertura', 'Charla 2'])
+        siguiente = cliente.get(pagina['next']).data
+        self.assertEqual([p['titulo'] for p in siguiente['results']], ['Charla 3', 'Charla 4', 'Charla 5', 'Charla 6'])
+
+    def test_snapshots_estaticos_iguales_a_la_api(self):
+        import gzip
+        import json
+        import os
+        import tempfile
+        from io import StringIO
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+        from .snapshots import generar_snapshots
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self._crear_programa(2)
+
+        with override_settings(SNAPSHOTS_DIR=directorio.name):
+            call_command('generar_snapshots', stdout=StringIO())
+            ruta = os.path.join(directorio.name, 'programa.json')
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+            self.assertEqual(json.loads(contenido), APIClient().get(reverse('programa-list')).json())
+            with open(f'{ruta}.gz', 'rb') as f:
+                self.assertEqual(gzip.decompress(f.read()), contenido)
+            salida = StringIO()
+            call_command('generar_snapshots', stdout=salida)
+            self.assertIn('al día', salida.getvalue())
+
+            # Guardar un disertante desde el admin regenera los snapshots al confirmar
+            cliente = APIClient()
+            cliente.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+            disertante = Disertante.objects.get(nombre='Disertante 0-0')
+            with self.captureOnCommitCallbacks(execute=True):
+                response = cliente.post(reverse('admin:api_disertante_change', args=[disertante.pk]), {
+                    'nombre': 'Disertante Renombrado', 'bio': 'Bio', 'foto_url': '', 'tema_presentacion': 'Tema', 'linkedin': ''
+                })
+            self.assertEqual(response.status_code, 302)
+            with open(os.path.join(directorio.name, 'disertantes.json'), 'rb') as f:
+                self.assertIn('Disertante Renombrado', [d['nombre'] for d in json.loads(f.read())])
+
+            # Lo mismo con escrituras fuera del admin (registro público, shell), una sola vez por transacción
+            with patch('api.snapshots.generar_snapshots', wraps=generar_snapshots) as generar:
+                with self.captureOnCommitCallbacks(execute=True):
+                    Empresa.objects.create(nombre_empresa='Acme', logo='logos_empresas/acme.png')
+                    Empresa.objects.create(nombre_empresa='Beta', logo='logos_empresas/beta.png')
+            self.assertEqual(generar.call_count, 1)
+            with open(os.path.join(directorio.name, 'empresas.json'), 'rb') as f:
+                self.assertEqual([e['nombre_empresa'] for e in json.loads(f.read())], ['Acme', 'Beta'])
+
+    def test_snapshot_de_empresas_igual_byte_a_byte_con_logos_absolutos(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        Empresa.objects.create(nombre_empresa='Acme', logo='logos_empresas/acme.png', sitio_web='https://acme.com')
+
+        with override_settings(SNAPSHOTS_DIR=directorio.name, SNAPSHOTS_URL_BASE='http://testserver'):
+            call_command('generar_snapshots', stdout=StringIO())
+        with open(os.path.join(directorio.name, 'empresas.json'), 'rb') as f:
+            contenido = f.read()
+        self.assertEqual(contenido, APIClient().get(reverse('empresa-list')).content)
+        self.assertIn(b'"logo":"http://testserver/media/logos_empresas/acme.png"', contenido)
+
 class RegistroTests(TestCase):
     @patch('api.email.send_empresa_confirmation_email')
     def test_registro_empresas_envia_email_confirmacion(self, mock_send_email):
@@ -480,4 +639,933 @@ class RegistroTests(TestCase):
         # Further assertions can be added based on the expected structure of the QR data
         # For example, if it returns a list of URLs:
         # self.assertGreater(len(response.data), 0)
-        # self.assertIn('url', response.data[0])
\ No newline at end of file
+        # self.assertIn('url', response.data[0])
+
+class IndiceCheckInTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.verificar_dni_url = reverse('verificar-dni')
+        from .checkin import indice_checkin
+        self.indice = indice_checkin
+        self.indice.invalidar()
+        self.asistente = Asistente.objects.create(
+            first_name="Indice", last_name="Test", dni="30111222", email="indice@example.com",
+            phone="123", profile_type=Asistente.ProfileType.VISITOR
+        )
+
+    def test_confirmar_y_rechazar_doble_escaneo_desde_indice(self):
+        self.indice.cargar()
+        # SAVEPOINT, UPDATE condicional, INSERT del certificado, RELEASE y la lectura de la respuesta
+        # (los contadores de estadísticas se actualizan después del commit)
+        with self.assertNumQueries(5):
+            response = self.client.post(self.verificar_dni_url, {"dni": "30111222"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['asistente']['nombre_completo'], 'Indice Test')
+        self.assertEqual(response.json()['asistente']['dni'], '30111222')
+        self.asistente.refresh_from_db()
+        self.assertTrue(self.asistente.asistencia_confirmada)
+
+        # El segundo escaneo solo relee la fila antes de responder "ya confirmado"
+        with self.assertNumQueries(1):
+            response = self.client.post(self.verificar_dni_url, {"dni": "30111222"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_confirmacion_revertida_en_otro_proceso_se_vuelve_a_confirmar(self):
+        self.indice.cargar()
+        self.assertEqual(self.client.post(self.verificar_dni_url, {"dni": "30111222"}, format='json').status_code, status.HTTP_200_OK)
+        # Otro worker revierte la confirmación desde el admin, sin pasar por este índice
+        Asistente.objects.filter(pk=self.asistente.pk).update(asistencia_confirmada=False, fecha_confirmacion=None)
+        response = self.client.post(self.verificar_dni_url, {"dni": "30111222"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cambio_de_dni_saca_la_clave_vieja_del_indice(self):
+        self.indice.cargar()
+        asistente = Asistente.objects.get(pk=self.asistente.pk)
+        asistente.dni = '30999888'
+        asistente.save()
+        self.assertNotIn('30111222', self.indice._entradas)
+        self.assertEqual(self.indice._entradas['30999888'].id, asistente.pk)
+        response = self.client.post(self.verificar_dni_url, {"dni": "30111222"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_indice_desactualizado_no_confirma_dos_veces(self):
+        self.indice.cargar()
+        # Otro proceso confirmó la asistencia sin pasar por este índice
+        Asistente.objects.filter(pk=self.asistente.pk).update(asistencia_confirmada=True, fecha_confirmacion=timezone.now())
+        response = self.client.post(self.verificar_dni_url, {"dni": "30111222"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Certificado.objects.count(), 0)
+
+    def test_confirmar_asistencia_compare_and_set(self):
+        from .checkin import confirmar_asistencia
+        self.assertTrue(confirmar_asistencia(self.asistente.pk, dni=self.asistente.dni))
+        self.assertFalse(confirmar_asistencia(self.asistente.pk, dni=self.asistente.dni))
+        self.assertEqual(Certificado.objects.filter(asistente=self.asistente).count(), 1)
+
+        # Un certificado que ya existía (p. ej. generado antes de desconfirmar) no se duplica
+        Asistente.objects.filter(pk=self.asistente.pk).update(asistencia_confirmada=False)
+        self.assertTrue(confirmar_asistencia(self.asistente.pk, dni=self.asistente.dni))
+        self.assertEqual(Certificado.objects.filter(asistente=self.asistente).count(), 1)
+
+
+class VerificarDNILoteTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('verificar-dni-lote')
+        self.pendiente = Asistente.objects.create(
+            first_name="Lote", last_name="Uno", dni="40111222", email="lote1@example.com",
+            profile_type=Asistente.ProfileType.VISITOR
+        )
+        self.confirmado = Asistente.objects.create(
+            first_name="Lote", last_name="Dos", dni="40333444", email="lote2@example.com",
+            profile_type=Asistente.ProfileType.VISITOR, asistencia_confirmada=True, fecha_confirmacion=timezone.now()
+        )
+
+    def test_lote_confirma_con_fecha_del_escaneo(self):
+        data = {"escaneos": [
+            {"dni": "40111222", "fecha": "2025-11-15T09:30:00-03:00"},
+            {"dni": "40333444", "fecha": "2025-11-15T09:31:00-03:00"},
+            {"dni": "99999999"},
+        ]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resultados = {r['dni']: r['resultado'] for r in response.json()['resultados']}
+        self.assertEqual(resultados, {'40111222': 'confirmado', '40333444': 'ya_confirmado', '99999999': 'no_encontrado'})
+
+        self.pendiente.refresh_from_db()
+        self.assertTrue(self.pendiente.asistencia_confirmada)
+        self.assertEqual(self.pendiente.fecha_confirmacion.isoformat(), '2025-11-15T12:30:00+00:00')
+        self.assertTrue(Certificado.objects.filter(asistente=self.pendiente).exists())
+
+    def test_lote_con_fecha_imposible_usa_la_hora_del_servidor(self):
+        data = {"escaneos": [
+            {"dni": "40111222", "fecha": "2025-13-45T10:00:00"},
+            {"dni": "40333444", "fecha": "2025-11-15T09:31:00-03:00"},
+        ]}
+        antes = timezone.now()
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resultados = {r['dni']: r['resultado'] for r in response.json()['resultados']}
+        self.assertEqual(resultados, {'40111222': 'confirmado', '40333444': 'ya_confirmado'})
+        self.pendiente.refresh_from_db()
+        self.assertGreaterEqual(self.pendiente.fecha_confirmacion, antes)
+
+    def test_lote_usa_consultas_fijas(self):
+        for i in range(20):
+            Asistente.objects.create(
+                first_name="Lote", last_name=str(i), dni=f"5000{i:04d}", email=f"lote{i}@ex.com",
+                profile_type=Asistente.ProfileType.VISITOR
+            )
+        data = {"escaneos": [{"dni": f"5000{i:04d}"} for i in range(20)]}
+        # SELECT ... FOR UPDATE, UPDATE e INSERT en bloque de certificados que ignora los existentes
+        # (+ SAVEPOINT/RELEASE del test; los contadores de estadísticas se actualizan después del commit)
+        with self.assertNumQueries(5):
+            from .checkin import confirmar_asistencias_lote
+            confirmar_asistencias_lote(data['escaneos'])
+        self.assertEqual(Certificado.objects.count(), 20)
+
+
+class CertificadosTest(TestCase):
+    def test_renderizar_certificado_devuelve_pdf(self):
+        from .certificados import renderizar_certificado
+        pdf = renderizar_certificado("NOMBRE DE PRUEBA")
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_certificado_vectorial_pesa_menos_que_el_raster(self):
+        from .certificados import renderizar_certificado
+        vectorial = renderizar_certificado("NOMBRE DE PRUEBA", formato='vectorial')
+        raster = renderizar_certificado("NOMBRE DE PRUEBA", formato='raster')
+        self.assertLess(len(vectorial), len(raster))
+
+    def test_encolar_certificados_crea_los_faltantes(self):
+        from .certificados import encolar_certificados
+        for i in range(3):
+            Asistente.objects.create(
+                first_name="Cert", last_name=str(i), email=f"cert{i}@example.com",
+                profile_type=Asistente.ProfileType.VISITOR, asistencia_confirmada=True
+            )
+        trabajo = encolar_certificados(Asistente.objects.filter(asistencia_confirmada=True))
+        self.assertEqual(trabajo.total, 3)
+        self.assertEqual(Certificado.objects.count(), 3)
+        self.assertEqual(trabajo.estado, 'PENDIENTE')
+
+    def test_registro_plantillas_reutiliza_la_imagen_decodificada(self):
+        from PIL import Image
+        from .plantillas_certificado import RegistroPlantillas
+        registro = RegistroPlantillas()
+        with patch('api.plantillas_certificado.Image.open', wraps=Image.open) as abrir:
+            img1, _, _ = registro.obtener('ASISTENCIA')
+            img2, _, _ = registro.obtener('ASISTENCIA')
+        self.assertEqual(abrir.call_count, 1)
+        # Cada llamada entrega una copia independiente de la plantilla
+        self.assertIsNot(img1, img2)
+
+    def test_renderizar_lote_un_pdf_con_una_pagina_por_nombre(self):
+        from .certificados import renderizar_lote, renderizar_certificado
+        nombres = [f"DISERTANTE {i}" for i in range(5)]
+        lote = renderizar_lote(nombres, tipo='DISERTANTE')
+        self.assertTrue(lote.startswith(b'%PDF'))
+        self.assertEqual(lote.count(b'/Type /Page\n'), 5)
+        # El fondo se embebe una sola vez: el lote pesa mucho menos que cinco certificados sueltos
+        individual = renderizar_certificado("DISERTANTE 0", tipo='DISERTANTE', formato='vectorial')
+        self.assertLess(len(lote), 2 * len(individual))
+
+
+class EnviadorEmailsTest(TestCase):
+    def _mensaje(self, destinatario):
+        from django.core.mail import EmailMultiAlternatives
+        return EmailMultiAlternatives('Asunto', 'Cuerpo', 'congreso@example.com', [destinatario])
+
+    def test_reutiliza_la_conexion_y_la_renueva_cada_n_mensajes(self):
+        from .email import EnviadorEmails
+        conexion = MagicMock()
+        with EnviadorEmails(mensajes_por_conexion=2, connection=conexion) as enviador:
+            for i in range(5):
+                enviador.enviar(self._mensaje(f"a{i}@example.com"))
+        self.assertEqual(enviador.enviados, 5)
+        self.assertEqual(conexion.open.call_count, 3)
+        self.assertEqual(conexion.send_messages.call_count, 5)
+
+    def test_reconecta_y_reintenta_si_el_servidor_corta(self):
+        import smtplib
+        from .email import EnviadorEmails
+        conexion = MagicMock()
+        conexion.send_messages.side_effect = [smtplib.SMTPServerDisconnected('cerrada'), 1, 1]
+        with EnviadorEmails(connection=conexion) as enviador:
+            enviador.enviar(self._mensaje("a@example.com"))
+            enviador.enviar(self._mensaje("b@example.com"))
+        self.assertEqual(enviador.enviados, 2)
+        self.assertEqual(conexion.open.call_count, 2)
+
+
+
+class ColaEmailsTest(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Asistente.objects.create(
+                first_name="Mail", last_name=str(i), email=f"mail{i}@example.com", dni=f"4000000{i}",
+                profile_type=Asistente.ProfileType.VISITOR
+            )
+
+    def test_envio_masivo_solo_encola_y_el_worker_envia(self):
+        from django.core import mail
+        from .cola_emails import procesar_cola
+        client = APIClient()
+        response = client.post(reverse('envio-masivo-emails'), {'tipo_email': 'recordatorio'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(len(mail.outbox), 0)
+
+        estado = client.get(response.data['estado_url'])
+        self.assertEqual(estado.data['resultados']['pendientes'], 3)
+
+        self.assertEqual(procesar_cola(hilos=1, log=lambda *a: None), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        estado = client.get(response.data['estado_url'])
+        self.assertTrue(estado.data['resultados']['completado'])
+        self.assertEqual(estado.data['resultados']['enviados'], 3)
+
+    def test_fallo_se_reprograma_con_espera_y_luego_queda_en_error(self):
+        from .cola_emails import encolar_emails, procesar_cola, MAX_INTENTOS
+        from .models import EnvioEmail
+        lote, _ = encolar_emails(Asistente.objects.filter(last_name="0"), EnvioEmail.Tipo.RECORDATORIO)
+        with patch('api.cola_emails.send_bulk_confirmation_email', side_effect=Exception("SMTP caído")):
+            self.assertEqual(procesar_cola(hilos=1, log=lambda *a: None), (0, 1))
+            envio = EnvioEmail.objects.get(lote=lote)
+            self.assertEqual(envio.estado, EnvioEmail.Estado.PENDIENTE)
+            self.assertGreater(envio.proximo_intento, timezone.now())
+            # Mientras no se cumpla la espera no se vuelve a intentar
+            self.assertEqual(procesar_cola(hilos=1, log=lambda *a: None), (0, 0))
+
+            EnvioEmail.objects.filter(pk=envio.pk).update(intentos=MAX_INTENTOS - 1, proximo_intento=timezone.now())
+            procesar_cola(hilos=1, log=lambda *a: None)
+        envio.refresh_from_db()
+        self.assertEqual(envio.estado, EnvioEmail.Estado.ERROR)
+        self.assertEqual(envio.ultimo_error, "SMTP caído")
+
+    def test_envio_abandonado_por_un_worker_caido_vuelve_a_la_cola(self):
+        from datetime import timedelta
+        from .cola_emails import encolar_emails, procesar_cola
+        from .models import EnvioEmail
+        lote, _ = encolar_emails(Asistente.objects.all(), EnvioEmail.Tipo.RECORDATORIO)
+        EnvioEmail.objects.filter(lote=lote).update(
+            estado=EnvioEmail.Estado.ENVIANDO, proximo_intento=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(procesar_cola(hilos=1, log=lambda *a: None), (3, 0))
+
+
+class PlantillasEmailTest(TestCase):
+    def test_plantilla_compilada_igual_a_render_completo(self):
+        from django.template.loader import render_to_string
+        from django.utils.html import strip_tags
+        from .plantillas_email import PlantillaEmail
+        comun = {'evento_nombre': 'Congreso de Logística UNAB', 'evento_fecha': '15 de Noviembre de 2025', 'year': 2025}
+        destinatario = {'asistente_nombre': "Ana <O'Brien> & Cía", 'asistente_email': 'ana@example.com', 'tipo_inscripcion': 'Docente'}
+        html, texto = PlantillaEmail('api/email/confirmacion.html', comun).renderizar(destinatario)
+        esperado = render_to_string('api/email/confirmacion.html', {**comun, **destinatario})
+        self.assertEqual(html, esperado)
+        self.assertEqual(texto, strip_tags(esperado))
+
+    def test_envio_masivo_renderiza_la_plantilla_una_sola_vez(self):
+        from django.core import mail
+        from django.template.loader import render_to_string
+        from .email import send_bulk_confirmation_email, EnviadorEmails
+        from .plantillas_email import registro_plantillas_email
+        registro_plantillas_email.invalidar()
+        asistentes = [
+            Asistente.objects.create(
+                first_name="Plantilla", last_name=str(i), email=f"plantilla{i}@example.com", dni=f"5000000{i}",
+                profile_type=Asistente.ProfileType.VISITOR
+            )
+            for i in range(4)
+        ]
+        from email.mime.image import MIMEImage
+        with patch('api.plantillas_email.render_to_string', wraps=render_to_string) as render, \
+                patch('api.plantillas_email.MIMEImage', wraps=MIMEImage) as logo:
+            with EnviadorEmails() as enviador:
+                for asistente in asistentes:
+                    self.assertTrue(send_bulk_confirmation_email(asistente, es_recordatorio=True, enviador=enviador))
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertIn("Plantilla 3", mail.outbox[3].alternatives[0][0])
+        # El logo se lee y codifica una sola vez para todos los mensajes
+        self.assertEqual(logo.call_count, 1)
+        self.assertEqual(len(mail.outbox[3].attachments), 1)
+
+
+@override_settings(EMAIL_POOL_HILOS=0)
+class ConfirmacionesGrupoTest(TestCase):
+    def test_emails_del_grupo_se_envian_despues_del_commit(self):
+        from django.core import mail
+        data = {
+            "first_name": "Laura", "last_name": "Rep", "dni": "30111222", "email": "laura.rep@example.com",
+            "phone": "1122334455", "profile_type": Asistente.ProfileType.GROUP_REPRESENTATIVE,
+            "group_name": "Escuela 5", "group_size": 2,
+            "miembros_grupo_nuevos": [
+                {"first_name": "Alumno", "last_name": "Uno", "email": "uno@example.com", "dni": "40111222"},
+                {"first_name": "Alumno", "last_name": "Dos", "email": "dos@example.com", "dni": "40111333"},
+            ],
+        }
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = APIClient().post(reverse('inscripcion-grupal'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # El registro respondió sin haber enviado nada todavía
+        self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            ['dos@example.com', 'laura.rep@example.com', 'uno@example.com']
+        )
+
+
+    def _datos_grupo(self, cantidad):
+        return {
+            "first_name": "Laura", "last_name": "Rep", "dni": "30111222", "email": "laura.rep@example.com",
+            "phone": "1122334455", "profile_type": Asistente.ProfileType.GROUP_REPRESENTATIVE,
+            "group_name": "Escuela 5", "group_size": cantidad,
+            "miembros_grupo_nuevos": [
+                {"first_name": "Alumno", "last_name": str(i), "email": f"alumno{i}@example.com", "dni": str(40000000 + i)}
+                for i in range(cantidad)
+            ],
+        }
+
+    def test_delegacion_grande_se_registra_en_pocas_consultas(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as consultas:
+            response = APIClient().post(reverse('inscripcion-grupal'), self._datos_grupo(60), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Sin consultas por miembro: validación y alta del representante, una búsqueda de duplicados y el bulk_create
+        # (SQLite parte el INSERT de 60 filas en dos)
+        self.assertLessEqual(len(consultas), 12)
+        miembros = Asistente.objects.filter(representante_grupo_id=response.data['id'])
+        self.assertEqual(miembros.count(), 60)
+        self.assertEqual(miembros.get(dni='40000059').group_name, 'Escuela 5')
+
+    def test_duplicados_de_la_delegacion_se_informan_por_miembro(self):
+        Asistente.objects.create(first_name="Ya", last_name="Registrado", email="alumno1@example.com", profile_type='VISITOR')
+        datos = self._datos_grupo(4)
+        datos['miembros_grupo_nuevos'][2]['dni'] = '40000000'
+        datos['miembros_grupo_nuevos'][3]['email'] = 'ALUMNO0@example.com'
+        response = APIClient().post(reverse('inscripcion-grupal'), datos, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message']['miembros_grupo_nuevos'], [
+            'Miembro 3 (alumno2@example.com): el DNI 40000000 está repetido en el miembro 1',
+            'Miembro 4 (alumno0@example.com): el email está repetido en el miembro 1',
+            'Miembro 2 (alumno1@example.com): ya existe un asistente con email alumno1@example.com',
+        ])
+        # No quedó nada a medias: ni el representante ni los miembros válidos
+        self.assertEqual(Asistente.objects.count(), 1)
+
+        datos = self._datos_grupo(2)
+        datos['miembros_grupo_nuevos'][1]['dni'] = '123'
+        response = APIClient().post(reverse('inscripcion-grupal'), datos, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('miembros_grupo_nuevos', response.data['message'])
+
+
+class ImportacionAsistentesTest(TestCase):
+    def setUp(self):
+        import tempfile
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajuste = override_settings(MEDIA_ROOT=media.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+    def _excel(self, filas, columnas):
+        import io
+        import pandas as pd
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        buffer = io.BytesIO()
+        pd.DataFrame(filas, columns=columnas).to_excel(buffer, index=False)
+        return SimpleUploadedFile('asistentes.xlsx', buffer.getvalue())
+
+    def test_carga_masiva_detecta_duplicados_e_inserta_en_lote(self):
+        Asistente.objects.create(
+            first_name="Ya", last_name="Registrado", email="existente@example.com", dni="30000001",
+            profile_type=Asistente.ProfileType.VISITOR
+        )
+        columnas = ['Nombre', 'Apellido', 'Email', 'Institucion', 'Tipo de Perfil', 'DNI', 'Columna1']
+        filas = [
+            ['Ana', 'Uno', 'ana@example.com', 'UNAB', 'STUDENT', '30.000.002', None],
+            ['Beto', 'Dos', 'Existente@example.com', None, 'TEACHER', None, None],
+            ['Caro', 'Tres', 'ana@example.com', None, None, None, None],
+            ['Dani', 'Cuatro', 'no-es-email', None, None, None, None],
+            ['Eva', 'Cinco', 'eva@example.com', None, 'OTRO', '30000001', 'Colaboradora'],
+            ['Fede', 'Seis', 'fede@example.com', None, 'GRADUADO', '123', None],
+        ]
+        response = APIClient().post(reverse('carga-masiva'), {'archivo': self._excel(filas, columnas)}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(Asistente.objects.count(), 1)
+
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('procesar_importaciones', stdout=StringIO())
+        resultados = APIClient().get(response.data['estado_url']).data['resultados']
+        self.assertEqual(resultados['estado'], 'COMPLETADO')
+        self.assertEqual(resultados['exitosos'], 1)
+        self.assertEqual(resultados['errores'], 5)
+        detalles = resultados['detalles']
+        self.assertEqual([d['fila'] for d in detalles], [2, 3, 4, 5, 6, 7])
+        self.assertEqual(detalles[0]['estado'], 'creado')
+        self.assertEqual(detalles[0]['profile_type'], 'Estudiante')
+        self.assertEqual(detalles[1]['error'], 'Email ya registrado')
+        self.assertEqual(detalles[2]['error'], 'Email ya registrado')
+        self.assertEqual(detalles[3]['error'], 'Email inválido o vacío')
+        self.assertEqual(detalles[4]['error'], 'DNI ya registrado')
+        self.assertIn('dni', detalles[5]['error'])
+        self.assertEqual(Asistente.objects.get(email='ana@example.com').dni, '30000002')
+
+    def test_consultas_por_lote_y_no_por_fila(self):
+        import pandas as pd
+        from .importacion import ImportadorAsistentes, FORMATO_COMPLETO
+        df = pd.DataFrame({
+            'NOMBRE': [f'Nombre{i}' for i in range(120)],
+            'Apellido': ['Apellido'] * 120,
+            'CORREO ELECTRONICO': [f'persona{i}@example.com' for i in range(120)],
+            'DNI': [float(20000000 + i) for i in range(120)],
+        })
+        importador = ImportadorAsistentes(FORMATO_COMPLETO, tamanio_lote=40)
+        # 3 lotes x (emails y DNIs registrados + SAVEPOINT + INSERT + RELEASE), sin importar la cantidad de filas
+        with self.assertNumQueries(12):
+            resultados = importador.importar(df)
+        self.assertEqual(resultados['exitosos'], 120)
+        self.assertEqual(resultados['detalles'][0]['datos']['dni'], '20000000')
+        self.assertIsNotNone(resultados['detalles'][119]['id'])
+
+    def test_lectura_por_bloques_conserva_numero_de_fila(self):
+        import io
+        import pandas as pd
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .importacion import leer_por_bloques
+        filas = [[f'N{i}', 'A', f'p{i}@example.com', None if i % 2 else 20000000 + i] for i in range(7)]
+        filas.insert(3, [None, None, None, None])
+        df = pd.DataFrame(filas, columns=['Nombre', 'Apellido', 'Email', 'DNI'])
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False)
+
+        bloques = list(leer_por_bloques(SimpleUploadedFile('a.xlsx', buffer.getvalue()), 3))
+        self.assertEqual([len(b) for b in bloques], [3, 3, 1])
+        # La fila vacía (fila 5 de la hoja) se saltea sin correr la numeración
+        self.assertEqual([i + 2 for b in bloques for i in b.index], [2, 3, 4, 6, 7, 8, 9])
+
+        csv = SimpleUploadedFile('a.csv', df.to_csv(index=False).encode())
+        self.assertEqual([len(b) for b in leer_por_bloques(csv, 3)], [3, 3, 2])
+
+        vacio = io.BytesIO()
+        pd.DataFrame(columns=['Nombre', 'Apellido']).to_excel(vacio, index=False)
+        bloques = list(leer_por_bloques(SimpleUploadedFile('v.xlsx', vacio.getvalue()), 3))
+        self.assertEqual(len(bloques), 1)
+        self.assertEqual(list(bloques[0].columns), ['Nombre', 'Apellido'])
+
+    def test_carga_csv_por_bloques_con_tope_de_detalles(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .importacion import ImportadorAsistentes, leer_por_bloques, FORMATO_COMPLETO
+        lineas = ['NOMBRE,Apellido,CORREO ELECTRONICO,DNI']
+        lineas += [f'N{i},A,p{i}@example.com,{30000000 + i}' for i in range(5)]
+        lineas.append('Repe,A,P0@example.com,')
+        archivo = SimpleUploadedFile('asistentes.csv', '\n'.join(lineas).encode())
+
+        importador = ImportadorAsistentes(FORMATO_COMPLETO, tamanio_lote=2, max_detalles=2)
+        resultados = importador.importar_bloques(leer_por_bloques(archivo, 2))
+
+        self.assertEqual(resultados['total_procesados'], 6)
+        self.assertEqual(resultados['exitosos'], 5)
+        # El duplicado está en otro bloque que el original: lo detecta la consulta a la base
+        self.assertEqual(resultados['errores'], 1)
+        self.assertEqual([d['fila'] for d in resultados['detalles']], [2, 3])
+        self.assertEqual(resultados['detalles_omitidos'], 4)
+        self.assertEqual(Asistente.objects.count(), 5)
+
+    def test_trabajo_encola_emails_y_retoma_donde_quedo(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.core import mail
+        from .importacion import crear_trabajo_importacion, procesar_trabajo_importacion
+        from .models import EnvioEmail, TrabajoImportacion
+        lineas = ['NOMBRE,Apellido,CORREO ELECTRONICO'] + [f'N{i},A,p{i}@example.com' for i in range(5)]
+        archivo = SimpleUploadedFile('asistentes.csv', '\n'.join(lineas).encode())
+        trabajo = crear_trabajo_importacion(archivo, TrabajoImportacion.Formato.COMPLETO, enviar_emails=True)
+
+        # Una corrida anterior ya importó las dos primeras filas antes de caerse
+        Asistente.objects.create(first_name='N0', last_name='A', email='p0@example.com', profile_type='OTRO')
+        Asistente.objects.create(first_name='N1', last_name='A', email='p1@example.com', profile_type='OTRO')
+        TrabajoImportacion.objects.filter(pk=trabajo.pk).update(procesados=2, exitosos=2)
+
+        trabajo = procesar_trabajo_importacion(trabajo, log=lambda *a: None)
+
+        self.assertEqual(trabajo.estado, TrabajoImportacion.Estado.COMPLETADO)
+        self.assertEqual((trabajo.procesados, trabajo.exitosos, trabajo.errores), (5, 5, 0))
+        self.assertEqual([d['fila'] for d in trabajo.detalles], [4, 5, 6])
+        # Los emails no se envían durante la importación: quedan en la cola de salida
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(trabajo.emails_encolados, 3)
+        self.assertEqual(
+            set(EnvioEmail.objects.filter(lote=trabajo.lote_emails).values_list('destinatario', flat=True)),
+            {'p2@example.com', 'p3@example.com', 'p4@example.com'}
+        )
+        # Ya no está pendiente: otro worker no lo vuelve a tomar
+        self.assertIsNone(procesar_trabajo_importacion(trabajo, log=lambda *a: None))
+
+    def test_estado_carga_masiva_informa_eta(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import TrabajoImportacion
+        trabajo = TrabajoImportacion.objects.create(
+            archivo='cargas_masivas/x.csv', formato=TrabajoImportacion.Formato.SIMPLE,
+            estado=TrabajoImportacion.Estado.EN_PROCESO, total=400, procesados=100,
+            fecha_inicio=timezone.now() - timedelta(seconds=10)
+        )
+        response = APIClient().get(reverse('estado-carga-masiva', kwargs={'trabajo_id': trabajo.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resultados']['progreso'], 25.0)
+        self.assertAlmostEqual(response.data['resultados']['eta_segundos'], 30, delta=2)
+        response = APIClient().get(reverse('estado-carga-masiva', kwargs={'trabajo_id': trabajo.pk + 1}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_dry_run_valida_sin_escribir_y_genera_reporte(self):
+        import csv
+        import io
+        from django.core.files.storage import default_storage
+        Asistente.objects.create(
+            first_name="Ya", last_name="Registrado", email="existente@example.com", profile_type='VISITOR'
+        )
+        columnas = ['Nombre', 'Apellido', 'Email', 'DNI']
+        filas = [
+            ['Ana', 'Uno', 'ana@example.com', '30000002'],
+            ['Beto', 'Dos', 'existente@example.com', None],
+            ['Caro', 'Tres', 'no-es-email', None],
+            ['Dani', 'Cuatro', 'dani@example.com', '123'],
+            ['Eva', 'Cinco', 'eva@example.com', '30000002'],
+        ]
+        response = APIClient().post(
+            reverse('carga-masiva'), {'archivo': self._excel(filas, columnas), 'dry_run': 'true'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['dry_run'])
+        resultados = response.data['resultados']
+        self.assertEqual((resultados['validas'], resultados['errores']), (1, 4))
+        self.assertEqual(resultados['errores_por_tipo'], {
+            'email_invalido': 1, 'dni_invalido': 1, 'dni_duplicado': 1, 'email_duplicado': 1
+        })
+        # No se escribió nada: ni asistentes ni trabajos de importación
+        from .models import TrabajoImportacion
+        self.assertEqual(Asistente.objects.count(), 1)
+        self.assertFalse(TrabajoImportacion.objects.exists())
+
+        with default_storage.open(resultados['reporte']) as f:
+            reporte = list(csv.reader(io.TextIOWrapper(f, encoding='utf-8-sig')))
+        self.assertEqual(reporte[0][:3], ['Fila', 'Código', 'Error'])
+        self.assertEqual(sorted(int(r[0]) for r in reporte[1:]), [3, 4, 5, 6])
+
+    def test_dry_run_detecta_duplicados_entre_bloques(self):
+        import openpyxl
+        from django.core.files.storage import default_storage
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .importacion import ImportadorAsistentes, ReporteErrores, leer_por_bloques, FORMATO_COMPLETO
+        lineas = ['NOMBRE,Apellido,CORREO ELECTRONICO,DNI', 'A,B,a@example.com,30000001', 'C,D,c@example.com,',
+                  'E,F,A@example.com,', 'G,H,g@example.com,30000001']
+        archivo = SimpleUploadedFile('asistentes.csv', '\n'.join(lineas).encode())
+        importador = ImportadorAsistentes(FORMATO_COMPLETO, max_detalles=0, simular=True)
+        reporte = ReporteErrores('xlsx')
+        resultados = importador.importar_bloques(leer_por_bloques(archivo, 2), al_rechazar=reporte.agregar)
+
+        self.assertEqual(resultados['exitosos'], 2)
+        self.assertEqual(resultados['errores_por_tipo'], {'email_duplicado': 1, 'dni_duplicado': 1})
+        with default_storage.open(reporte.guardar()) as f:
+            hoja = openpyxl.load_workbook(f).active
+            self.assertEqual([fila[0] for fila in hoja.iter_rows(min_row=2, values_only=True)], [4, 5])
+
+    def test_email_registrado_con_otras_mayusculas_es_duplicado(self):
+        import pandas as pd
+        from .importacion import ImportadorAsistentes, FORMATO_COMPLETO
+        Asistente.objects.create(first_name='Ana', last_name='B', email='Ana.Perez@Example.com', profile_type='OTRO')
+        df = pd.DataFrame({
+            'NOMBRE': ['Ana', 'Juan'],
+            'Apellido': ['B', 'C'],
+            'CORREO ELECTRONICO': ['ana.perez@example.com', 'juan@example.com'],
+            'DNI': ['30000001', '30000002'],
+        })
+        resultados = ImportadorAsistentes(FORMATO_COMPLETO).importar(df)
+
+        self.assertEqual(resultados['exitosos'], 1)
+        self.assertEqual(resultados['errores_por_tipo'], {'email_duplicado': 1})
+        self.assertEqual(Asistente.objects.filter(email__iexact='ana.perez@example.com').count(), 1)
+
+
+    def test_reimportar_con_upsert_completa_los_existentes(self):
+        import pandas as pd
+        from io import StringIO
+        from django.core.management import call_command
+        from .importacion import ImportadorAsistentes, FORMATO_COMPLETO
+        for i in range(40):
+            Asistente.objects.create(
+                first_name=f'N{i}', last_name='A', email=f'p{i}@example.com', profile_type='OTRO',
+                phone='1100000000' if i == 0 else None
+            )
+        # La planilla corregida trae los DNI y celulares que faltaban
+        df = pd.DataFrame({
+            'NOMBRE': [f'N{i}' for i in range(40)],
+            'Apellido': ['A'] * 40,
+            'CORREO ELECTRONICO': [f'P{i}@example.com' for i in range(40)],
+            'DNI': [str(20000000 + i) for i in range(40)],
+            'NUMERO DE CELULAR (con codigo de area)': ['1122334455'] * 40,
+        })
+        importador = ImportadorAsistentes(FORMATO_COMPLETO, tamanio_lote=40, modo='UPSERT')
+        # Una consulta para buscar a los existentes y un solo UPDATE para todo el lote
+        with self.assertNumQueries(4):
+            resultados = importador.importar(df)
+        self.assertEqual((resultados['exitosos'], resultados['actualizados'], resultados['errores']), (0, 40, 0))
+        self.assertEqual(resultados['detalles'][0]['cambios'], {'dni': '20000000'})
+        self.assertEqual(resultados['detalles'][1]['cambios'], {'dni': '20000001', 'phone': '1122334455'})
+        self.assertEqual(Asistente.objects.get(email='p0@example.com').phone, '1100000000')
+        self.assertEqual(Asistente.objects.filter(dni__isnull=False).count(), 40)
+
+        # Volver a importar el mismo archivo no cambia nada ni da errores
+        resultados = ImportadorAsistentes(FORMATO_COMPLETO, modo='UPSERT').importar(df)
+        self.assertEqual((resultados['actualizados'], resultados['sin_cambios'], resultados['errores']), (0, 40, 0))
+
+        # Por la API: una fila nueva se inserta y un DNI de otro asistente es error
+        columnas = ['NOMBRE', 'Apellido', 'CORREO ELECTRONICO', 'DNI']
+        filas = [['Nuevo', 'A', 'nuevo@example.com', '20000100'], ['N2', 'A', 'p2@example.com', '20000003']]
+        response = APIClient().post(
+            reverse('carga-masiva'), {'archivo': self._excel(filas, columnas), 'modo': 'upsert'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        call_command('procesar_importaciones', stdout=StringIO())
+        resultados = APIClient().get(response.data['estado_url']).data['resultados']
+        self.assertEqual(resultados['modo'], 'UPSERT')
+        self.assertEqual((resultados['exitosos'], resultados['errores']), (1, 1))
+        self.assertEqual(resultados['detalles'][1]['error'], 'DNI ya registrado')
+
+        response = APIClient().post(
+            reverse('carga-masiva'), {'archivo': self._excel(filas, columnas), 'modo': 'reemplazar'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NormalizacionTest(TestCase):
+    def test_esquema_reconoce_variantes_de_encabezado(self):
+        from .normalizacion import ESQUEMA_ASISTENTES, ColumnasFaltantes
+        mapeo = ESQUEMA_ASISTENTES.resolver(
+            [' Correo_Electrónico ', 'NOMBRE', 'apellido', 'Número de celular (con código de área)', 'Otra'],
+            requeridas=('first_name', 'last_name', 'email')
+        )
+        self.assertEqual(mapeo, {
+            'email': ' Correo_Electrónico ', 'first_name': 'NOMBRE', 'last_name': 'apellido',
+            'phone': 'Número de celular (con código de área)',
+        })
+        with self.assertRaises(ColumnasFaltantes) as ctx:
+            ESQUEMA_ASISTENTES.resolver(['Nombre'], requeridas=('first_name', 'email'), nombres={'email': 'Email'})
+        self.assertEqual(ctx.exception.faltantes, ['Email'])
+
+    def test_mismas_reglas_de_dni_y_perfil_en_todos_los_formatos(self):
+        import pandas as pd
+        from .normalizacion import normalizar_dni, normalizar_dni_valor, normalizar_perfil
+        dnis = ['12.345.678', '123456780', ' 30-111-222 ', '']
+        self.assertEqual(normalizar_dni(pd.Series(dnis)).tolist(), [normalizar_dni_valor(d) for d in dnis])
+        self.assertEqual(normalizar_dni_valor('123456780'), '12345678')
+        self.assertEqual(
+            normalizar_perfil(pd.Series(['estudiante', 'TEACHER', ' Docente', 'x']), 'OTRO').tolist(),
+            ['STUDENT', 'TEACHER', 'TEACHER', 'OTRO']
+        )
+        asistente = Asistente(first_name='A', last_name='B', email='a@example.com', dni='123456780', profile_type='OTRO')
+        asistente.full_clean()
+        self.assertEqual(asistente.dni, '12345678')
+
+
+class GuardadoAsistenteTest(TestCase):
+    def test_save_valida_solo_lo_que_cambio_y_sin_selects_de_unicidad(self):
+        from django.core.exceptions import ValidationError
+        Asistente.objects.create(first_name='Otro', last_name='A', email='otro@example.com', dni='30000009', profile_type='OTRO')
+        # SAVEPOINT + INSERT + RELEASE, sin buscar duplicados antes
+        with self.assertNumQueries(3):
+            asistente = Asistente.objects.create(
+                first_name='Ana', last_name='B', email='ana@example.com', dni='30.000.001', profile_type='OTRO'
+            )
+        self.assertEqual(asistente.dni, '30000001')
+
+        asistente = Asistente.objects.get(pk=asistente.pk)
+        self.assertEqual(asistente.campos_modificados(), set())
+        asistente.asistencia_confirmada = True
+        self.assertEqual(asistente.campos_modificados(), {'asistencia_confirmada'})
+        with self.assertNumQueries(3):
+            asistente.save()
+        self.assertEqual(asistente.campos_modificados(), set())
+
+        # Un campo modificado inválido se sigue rechazando antes de escribir
+        asistente.dni = '123'
+        with self.assertRaises(ValidationError) as ctx:
+            asistente.save()
+        self.assertIn('dni', ctx.exception.message_dict)
+
+        # Los duplicados los detecta la base, con el mismo error que daba full_clean()
+        asistente.dni = '30000009'
+        with self.assertRaises(ValidationError) as ctx:
+            asistente.save()
+        self.assertEqual(ctx.exception.message_dict['dni'], ['Ya existe un/a Asistente con este/a DNI.'])
+        # El savepoint deja la transacción usable para corregir y volver a guardar
+        asistente.dni = '30000002'
+        asistente.save()
+        self.assertEqual(Asistente.objects.get(pk=asistente.pk).dni, '30000002')
+
+    def test_cambiar_el_nombre_descarta_los_pdfs_ya_generados(self):
+        asistente = Asistente.objects.create(first_name='Ana', last_name='B', email='ana@example.com', profile_type='OTRO')
+        certificado = Certificado.objects.create(
+            asistente=asistente, tipo_certificado='ASISTENCIA', pdf_generado='certificados/certificado_ana.pdf'
+        )
+        asistente = Asistente.objects.get(pk=asistente.pk)
+        asistente.phone = '1122334455'
+        asistente.save()
+        certificado.refresh_from_db()
+        self.assertEqual(certificado.pdf_generado.name, 'certificados/certificado_ana.pdf')
+
+        # Con el nombre corregido, el próximo envío vuelve a generar el PDF
+        asistente.last_name = 'Bustos'
+        asistente.save()
+        certificado.refresh_from_db()
+        self.assertFalse(certificado.pdf_generado)
+
+    def test_actualizar_dni_rechaza_uno_ya_registrado(self):
+        Asistente.objects.create(first_name='Otro', last_name='A', email='otro@example.com', dni='30000009', profile_type='OTRO')
+        asistente = Asistente.objects.create(
+            first_name='Ana', last_name='B', email='ana@example.com', profile_type='OTRO', dni_update_token='token-ana'
+        )
+        response = APIClient().post(reverse('actualizar-dni'), {'token': 'token-ana', 'dni': '30.000.009'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], 'Este DNI ya está registrado en el sistema.')
+
+        response = APIClient().post(reverse('actualizar-dni'), {'token': 'token-ana', 'dni': '30.000.001'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        asistente.refresh_from_db()
+        self.assertEqual((asistente.dni, asistente.dni_update_token), ('30000001', None))
+
+
+class ExportacionAsistentesTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        self.cliente = APIClient()
+        self.cliente.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        self.asistentes = [
+            Asistente.objects.create(first_name='José', last_name='Núñez', email='jose@example.com', dni='30000001', profile_type='TEACHER'),
+            Asistente.objects.create(first_name='Ana', last_name='B', email='ana@example.com', profile_type='STUDENT', year_of_study=2),
+        ]
+
+    def _exportar(self, accion):
+        return self.cliente.post(reverse('admin:api_asistente_changelist'), {
+            'action': accion, '_selected_action': [a.pk for a in self.asistentes],
+        })
+
+    def test_csv_en_streaming_con_las_columnas_compartidas(self):
+        import csv
+        import io
+        from .exportacion import COLUMNAS_EXPORTACION
+        response = self._exportar('exportar_asistentes_csv')
+        self.assertTrue(response.streaming)
+        filas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(filas[0], list(COLUMNAS_EXPORTACION))
+        self.assertEqual(filas[1][:4], ['José', 'Núñez', 'jose@example.com', '30000001'])
+        self.assertEqual(filas[2][COLUMNAS_EXPORTACION.index('dni')], '')
+        self.assertEqual(filas[2][COLUMNAS_EXPORTACION.index('year_of_study')], '2')
+
+    def test_xlsx_de_no_estudiantes(self):
+        import io
+        import openpyxl
+        from .exportacion import COLUMNAS_EXPORTACION
+        response = self._exportar('exportar_no_estudiantes_xlsx')
+        self.assertIn('asistentes_no_estudiantes.xlsx', response['Content-Disposition'])
+        hoja = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        filas = list(hoja.iter_rows(values_only=True))
+        self.assertEqual(filas[0], COLUMNAS_EXPORTACION)
+        self.assertEqual([f[2] for f in filas[1:]], ['jose@example.com'])
+
+
+@override_settings(ESTADISTICAS_CACHE_SEGUNDOS=0)
+class EstadisticasAsistenciaTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+
+    def _contadores(self):
+        from .models import ContadorEstadistica
+        return {clave: valor for clave, valor in ContadorEstadistica.objects.values_list('clave', 'valor') if valor}
+
+    def _recalculados(self):
+        from collections import Counter
+        from .estadisticas import recalcular
+        return {clave: valor for clave, valor in Counter(recalcular()).items() if valor}
+
+    def test_contadores_siguen_altas_checkin_cambios_y_bajas(self):
+        from datetime import datetime
+        from .checkin import confirmar_asistencia
+        # Los contadores se actualizan después del commit de cada operación
+        with self.captureOnCommitCallbacks(execute=True):
+            docente = Asistente.objects.create(
+                first_name='Ana', last_name='B', email='ana@example.com', dni='30000001',
+                profile_type='TEACHER', group_municipality='Quilmes'
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            # 'registrados' ya existe y 'perfil:OTRO' no: el UPDATE conjunto se revierte y se suma de a uno
+            otro = Asistente.objects.create(first_name='Juan', last_name='C', email='juan@example.com', dni='30000002', profile_type='OTRO')
+        self.assertEqual(self._contadores()['registrados'], 2)
+        fecha = timezone.make_aware(datetime(2025, 11, 15, 9, 30))
+        with self.captureOnCommitCallbacks(execute=True):
+            confirmar_asistencia(docente.pk, docente.dni, fecha)
+            # Hasta el commit la confirmación no toca los contadores
+            self.assertNotIn('confirmados', self._contadores())
+
+        otro = Asistente.objects.get(pk=otro.pk)
+        otro.profile_type = 'PRESS'
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.save()
+        self.assertEqual(self._contadores(), {
+            'registrados': 2, 'confirmados': 1, 'perfil:TEACHER': 1, 'perfil:PRESS': 1,
+            'partido:Quilmes': 1, 'hora:2025-11-15T09': 1,
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Asistente.objects.get(pk=docente.pk).delete()
+        contadores = self._contadores()
+        self.assertEqual(contadores, {'registrados': 1, 'perfil:PRESS': 1})
+        self.assertEqual(contadores, self._recalculados())
+
+    def test_endpoint_lee_solo_los_contadores(self):
+        from .estadisticas import recalcular
+        Asistente.objects.create(first_name='Ana', last_name='B', email='ana@example.com', dni='30000001', profile_type='TEACHER')
+        Asistente.objects.create(
+            first_name='Juan', last_name='C', email='juan@example.com', dni='30000002', profile_type='TEACHER',
+            asistencia_confirmada=True, fecha_confirmacion=timezone.now()
+        )
+        recalcular()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('estadisticas'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        estadisticas = response.data['estadisticas']
+        self.assertEqual((estadisticas['registrados'], estadisticas['confirmados']), (2, 1))
+        self.assertEqual(estadisticas['porcentaje_confirmados'], 50.0)
+        self.assertEqual(estadisticas['por_perfil'], {'Docente': 2})
+        self.assertEqual(len(estadisticas['confirmaciones_por_hora']), 1)
+
+    def test_resumen_se_reutiliza_mientras_dura_la_cache(self):
+        from .estadisticas import resumen
+        Asistente.objects.create(first_name='Ana', last_name='B', email='ana@example.com', dni='30000001', profile_type='TEACHER')
+        with self.settings(ESTADISTICAS_CACHE_SEGUNDOS=60):
+            self.assertEqual(resumen()['registrados'], 1)
+            with self.assertNumQueries(0):
+                self.assertEqual(resumen()['registrados'], 1)
+
+
+class EventosCheckInTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def _eventos_nuevos(self, desde):
+        from .eventos_checkin import canal_checkin
+        eventos, _ = canal_checkin.desde(desde)
+        return [datos for _, datos in eventos]
+
+    def test_checkin_y_registro_rapido_publican_un_evento(self):
+        from .eventos_checkin import canal_checkin
+        Asistente.objects.create(
+            first_name='Ana', last_name='B', email='ana@example.com', dni='30000001',
+            profile_type='TEACHER', group_municipality='Quilmes'
+        )
+        ultimo = canal_checkin.ultimo_id
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('verificar-dni'), {'dni': '30000001'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('registro-rapido'), {'asistente': {
+                'first_name': 'Rapido', 'last_name': 'Test', 'dni': '10000000', 'email': 'rapido@example.com',
+                'phone': '1111111111', 'profile_type': Asistente.ProfileType.VISITOR,
+            }}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        eventos = self._eventos_nuevos(ultimo)
+        self.assertEqual([(e['nombre'], e['perfil'], e['origen']) for e in eventos], [
+            ('Ana B', 'Docente', 'dni'), ('Rapido Test', 'Visitante', 'registro_rapido'),
+        ])
+        self.assertEqual(eventos[0]['partido'], 'Quilmes')
+
+        # Un DNI ya confirmado no vuelve a publicar
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('verificar-dni'), {'dni': '30000001'}, format='json')
+        self.assertEqual(len(self._eventos_nuevos(ultimo)), 2)
+
+    def test_buffer_circular_avisa_cuando_se_perdieron_eventos(self):
+        from .eventos_checkin import CanalCheckIn
+        canal = CanalCheckIn(3)
+        for i in range(5):
+            canal.publicar({'n': i})
+        eventos, desfasado = canal.desde(0)
+        self.assertEqual([datos['n'] for _, datos in eventos], [2, 3, 4])
+        self.assertFalse(desfasado)
+        self.assertTrue(canal.desde(1)[1])
+        self.assertEqual(canal.desde(3), ([(4, {'n': 3}), (5, {'n': 4})], False))
+        # Un id de antes de un reinicio reenvía todo el buffer
+        self.assertEqual(len(canal.desde(50)[0]), 3)
+
+    async def test_stream_sse_envia_lo_perdido_y_los_eventos_nuevos(self):
+        import asyncio
+        from .eventos_checkin import canal_checkin
+        anterior = canal_checkin.publicar({'nombre': 'Anterior'})
+        perdido = canal_checkin.publicar({'nombre': 'Perdido'})
+        response = await self.async_client.get(reverse('eventos-checkin'), headers={'Last-Event-ID': str(anterior)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        try:
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            self.assertEqual(await anext(stream), f'id: {perdido}\nevent: checkin\ndata: {{"nombre": "Perdido"}}\n\n'.encode())
+            siguiente = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0)
+            nuevo = canal_checkin.publicar({'nombre': 'Nuevo'})
+            self.assertIn(f'id: {nuevo}\n'.encode(), await asyncio.wait_for(siguiente, timeout=5))
+        finally:
+            await stream.aclose()
+
+    def test_stream_requiere_asgi(self):
+        response = self.client.get(reverse('eventos-checkin'))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
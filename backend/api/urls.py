@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DisertanteViewSet, VerificarDNIView, ProgramaViewSet, RegistroEmpresasView, RegistroParticipantesView, InscripcionViewSet, RegistroRapidoView, EmpresaViewSet, CargaMasivaAsistentesView, EnvioMasivoEmailsView, ActualizarDNIView, GetCSRFTokenView
+from .views import DisertanteViewSet, VerificarDNIView, VerificarDNILoteView, ProgramaViewSet, RegistroEmpresasView, RegistroParticipantesView, InscripcionViewSet, RegistroRapidoView, EmpresaViewSet, CargaMasivaAsistentesView, EstadoCargaMasivaView, EnvioMasivoEmailsView, EstadoEnvioEmailsView, EstadisticasView, EventosCheckInView, ActualizarDNIView, GetCSRFTokenView
 from .qr_views import GenerateStaticQRView
 
 # Se crea un router para registrar los ViewSets
@@ -14,6 +14,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('csrf/', GetCSRFTokenView.as_view(), name='get-csrf-token'),
     path('verificar-dni/', VerificarDNIView.as_view(), name='verificar-dni'),
+    path('verificar-dni/lote/', VerificarDNILoteView.as_view(), name='verificar-dni-lote'),
     path('generar-qrs/', GenerateStaticQRView.as_view(), name='generar-qrs'),
     path('registro-empresas/', RegistroEmpresasView.as_view({'post': 'create'}), name='registro-empresas'),
     path('inscripcion/', InscripcionViewSet.as_view({'post': 'create'}), name='inscripcion-individual'),
@@ -21,6 +22,10 @@ urlpatterns = [
     path('participantes/', RegistroParticipantesView.as_view({'get': 'list', 'post': 'create'}), name='participantes'),
     path('registro-rapido/', RegistroRapidoView.as_view({'post': 'create'}), name='registro-rapido'),
     path('carga-masiva/', CargaMasivaAsistentesView.as_view(), name='carga-masiva'),
+    path('carga-masiva/<int:trabajo_id>/', EstadoCargaMasivaView.as_view(), name='estado-carga-masiva'),
     path('envio-masivo-emails/', EnvioMasivoEmailsView.as_view(), name='envio-masivo-emails'),
+    path('envio-masivo-emails/<uuid:lote>/', EstadoEnvioEmailsView.as_view(), name='estado-envio-emails'),
+    path('checkin/eventos/', EventosCheckInView.as_view(), name='eventos-checkin'),
+    path('estadisticas/', EstadisticasView.as_view(), name='estadisticas'),
     path('actualizar-dni/', ActualizarDNIView.as_view(), name='actualizar-dni'),
 ]
\ No newline at end of file
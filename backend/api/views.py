@@ -1,16 +1,29 @@
 from rest_framework import viewsets, mixins, status, views, serializers
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
-from .models import Disertante, Inscripcion, Programa, Certificado, Asistente, Empresa, MiembroGrupo
+from django.db.models import Count, Q
+from .models import Disertante, Inscripcion, Programa, Asistente, Empresa, MiembroGrupo, EnvioEmail, TrabajoImportacion
 from .serializers import DisertanteSerializer, InscripcionSerializer, AsistenteSerializer, ProgramaSerializer, EmpresaSerializer, MiembroGrupoSerializer, EmpresaLogoSerializer
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+from rest_framework.pagination import CursorPagination
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 from django.middleware.csrf import get_token
-from .email import send_certificate_email, send_confirmation_email, send_bulk_confirmation_email
-import pandas as pd
-import re
+from .email import send_certificate_email, send_confirmation_email
+from .cache_publica import RespuestaCacheadaMixin
+from .checkin import indice_checkin, confirmar_asistencia, confirmar_asistencias_lote
+from .cola_emails import encolar_emails, resumen_lote
+from .estadisticas import resumen as resumen_estadisticas
+from .eventos_checkin import CAMPOS_EVENTO, canal_checkin, publicar_checkin
+from .importacion import ColumnasFaltantes, leer_por_bloques, validar_archivo, crear_trabajo_importacion, resumen_trabajo_importacion, FORMATO_COMPLETO, FORMATO_SIMPLE
+from django.urls import reverse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.forms.models import model_to_dict
 
 
 class GetCSRFTokenView(views.APIView):
@@ -32,7 +45,7 @@ class GetCSRFTokenView(views.APIView):
             'csrfToken': csrf_token  # También lo devolvemos en la respuesta por si acaso
         }, status=status.HTTP_200_OK)
 
-class DisertanteViewSet(viewsets.ReadOnlyModelViewSet):
+class DisertanteViewSet(RespuestaCacheadaMixin, viewsets.ReadOnlyModelViewSet):
     """
     Un ViewSet para ver la lista de disertantes y los detalles de uno específico.
     """
@@ -40,13 +53,81 @@ class DisertanteViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = DisertanteSerializer
     permission_classes = [AllowAny]
 
-class ProgramaViewSet(viewsets.ReadOnlyModelViewSet):
+class ProgramaCursorPagination(CursorPagination):
+    """
+    Paginación por cursor del programa, solo si se pide con `cursor` o `page_size`:
+    sin esos parámetros la respuesta sigue siendo la lista completa.
+    """
+    ordering = ('dia', 'hora_inicio', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not any(parametro in request.query_params for parametro in (self.cursor_query_param, self.page_size_query_param)):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class ProgramaViewSet(RespuestaCacheadaMixin, viewsets.ReadOnlyModelViewSet):
     """
     Un ViewSet para ver el programa del congreso, ordenado por día y hora.
+    Los disertantes de todas las charlas se traen en una sola consulta adicional.
+
+    Filtros opcionales (se combinan): dia=AAAA-MM-DD, aula, categoria,
+    disertante=<id>, desde/hasta=HH:MM (charlas que se superponen con esa
+    franja), hora=HH:MM (charlas en curso a esa hora) y ahora=true (en curso
+    hoy en este momento). Por ejemplo, ?ahora=true&aula=Aula Magna.
     """
-    queryset = Programa.objects.all().order_by('dia', 'hora_inicio')
+    queryset = Programa.objects.prefetch_related('disertantes').order_by('dia', 'hora_inicio')
     serializer_class = ProgramaSerializer
     permission_classes = [AllowAny]
+    pagination_class = ProgramaCursorPagination
+    parametros_sin_cache = ('ahora',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        parametros = self.request.query_params
+        errores = {}
+
+        def leer(nombre, conversor, formato):
+            valor = parametros.get(nombre)
+            if not valor:
+                return None
+            try:
+                convertido = conversor(valor)
+            except ValueError:
+                convertido = None
+            if convertido is None:
+                errores[nombre] = f'Formato inválido, use {formato}.'
+            return convertido
+
+        dia = leer('dia', parse_date, 'AAAA-MM-DD')
+        desde = leer('desde', parse_time, 'HH:MM')
+        hasta = leer('hasta', parse_time, 'HH:MM')
+        hora = leer('hora', parse_time, 'HH:MM')
+        disertante = leer('disertante', int, 'el id del disertante')
+        if errores:
+            raise serializers.ValidationError(errores)
+
+        if parametros.get('ahora', 'false').lower() == 'true':
+            ahora = timezone.localtime()
+            dia, hora = ahora.date(), ahora.time()
+        if dia:
+            queryset = queryset.filter(dia=dia)
+        if parametros.get('aula'):
+            queryset = queryset.filter(aula=parametros['aula'])
+        if parametros.get('categoria'):
+            queryset = queryset.filter(categoria=parametros['categoria'].upper())
+        if disertante is not None:
+            queryset = queryset.filter(disertantes__id=disertante)
+        if desde:
+            queryset = queryset.filter(hora_fin__gt=desde)
+        if hasta:
+            queryset = queryset.filter(hora_inicio__lt=hasta)
+        if hora:
+            queryset = queryset.filter(hora_inicio__lte=hora, hora_fin__gt=hora)
+        return queryset
 
 class RegistroEmpresasView(mixins.CreateModelMixin, viewsets.GenericViewSet):
     """
@@ -156,48 +237,81 @@ class VerificarDNIView(views.APIView):
     Vista para verificar si un DNI está registrado y confirmar asistencia.
     """
     permission_classes = [AllowAny]
+    # Datos del asistente en la respuesta, leídos con una sola consulta después de confirmar
+    CAMPOS_ASISTENTE = (
+        'id', 'first_name', 'last_name', 'email', 'phone', 'dni', 'profile_type',
+        'is_unab_student', 'institution', 'career', 'year_of_study',
+        'career_taught', 'work_area', 'occupation', 'company_name',
+        'group_name', 'group_municipality', 'group_size', 'rol_especifico'
+    )
 
     def post(self, request, *args, **kwargs):
         dni = request.data.get('dni')
         if not dni:
             return Response({'status': 'error', 'message': 'No se proporcionó DNI.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            asistente = Asistente.objects.get(dni=dni)
-            print(f"DEBUG: Asistente {asistente.dni} asistencia_confirmada: {asistente.asistencia_confirmada}")
-        except Asistente.DoesNotExist:
+        # Búsqueda y confirmación contra el índice en memoria (un único UPDATE condicional)
+        resultado, entrada = indice_checkin.confirmar(dni)
+        if resultado == 'no_encontrado':
             return Response({'status': 'error', 'message': 'DNI no encontrado en el listado de registrados.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if asistente.asistencia_confirmada:
+        if resultado == 'ya_confirmado':
             # Ensure fecha_confirmacion is not None before calling strftime
-            fecha_confirmacion_str = asistente.fecha_confirmacion.strftime("%d/%m/%Y a las %H:%M:%S") if asistente.fecha_confirmacion else "fecha desconocida"
+            fecha_confirmacion_str = entrada.fecha_confirmacion.strftime("%d/%m/%Y a las %H:%M:%S") if entrada.fecha_confirmacion else "fecha desconocida"
             return Response({
                 'status': 'error',
                 'message': f'La asistencia ya fue confirmada el {fecha_confirmacion_str}.',
             }, status=status.HTTP_409_CONFLICT)
 
-        # Confirmar asistencia
-        asistente.asistencia_confirmada = True
-        asistente.fecha_confirmacion = timezone.now()
-        asistente.save()
+        # El certificado de asistencia ya se creó en la misma transacción de la confirmación
+        asistente_data = Asistente.objects.values(*self.CAMPOS_ASISTENTE).get(pk=entrada.id)
+        asistente_data['nombre_completo'] = f"{asistente_data['first_name']} {asistente_data['last_name']}"
+        publicar_checkin(asistente_data, entrada.fecha_confirmacion, 'dni')
 
-        # Crear certificado de asistencia
-        certificado, created = Certificado.objects.get_or_create(
-            asistente=asistente,
-            tipo_certificado=Certificado.TipoCertificado.ASISTENCIA
-        )
-        
         # send_certificate_email(certificado) # Commented out for testing
 
-        # Preparar la respuesta con los datos del asistente
-        asistente_data = AsistenteSerializer(asistente).data
-        
         return Response({
             'status': 'success',
             'message': 'Asistencia confirmada con éxito. Certificado enviado por email.',
             'asistente': asistente_data
         }, status=status.HTTP_200_OK)
 
+class VerificarDNILoteView(views.APIView):
+    """
+    Vista para sincronizar los escaneos que una estación de check-in acumuló sin conexión.
+    Recibe un lote de DNIs con la fecha/hora en que fueron escaneados y los confirma
+    con un número fijo de consultas, sin importar el tamaño del lote.
+    """
+    permission_classes = [AllowAny]
+    MAX_ESCANEOS = 2000
+
+    def post(self, request, *args, **kwargs):
+        escaneos = request.data.get('escaneos')
+        if not isinstance(escaneos, list) or not escaneos:
+            return Response({'status': 'error', 'message': 'Debe enviar una lista "escaneos" con objetos {"dni", "fecha"}.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(escaneos) > self.MAX_ESCANEOS:
+            return Response({'status': 'error', 'message': f'El lote supera el máximo de {self.MAX_ESCANEOS} escaneos.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Se aceptan también DNIs sueltos, sin fecha de escaneo
+        escaneos = [e if isinstance(e, dict) else {'dni': e} for e in escaneos]
+        resultados = confirmar_asistencias_lote(escaneos)
+
+        resumen = {'confirmados': 0, 'ya_confirmados': 0, 'no_encontrados': 0}
+        for resultado in resultados:
+            if resultado['resultado'] == 'confirmado':
+                resumen['confirmados'] += 1
+            elif resultado['resultado'] == 'ya_confirmado':
+                resumen['ya_confirmados'] += 1
+            else:
+                resumen['no_encontrados'] += 1
+
+        return Response({
+            'status': 'success',
+            'message': f"Lote sincronizado. {resumen['confirmados']} confirmados, {resumen['ya_confirmados']} ya confirmados, {resumen['no_encontrados']} no encontrados.",
+            'resumen': resumen,
+            'resultados': resultados
+        }, status=status.HTTP_200_OK)
+
 class RegistroRapidoView(mixins.CreateModelMixin, viewsets.GenericViewSet):
     """
     Vista para registro rápido in-situ en el evento.
@@ -212,17 +326,11 @@ class RegistroRapidoView(mixins.CreateModelMixin, viewsets.GenericViewSet):
             serializer.is_valid(raise_exception=True)
             inscripcion = serializer.save()
             
-            # Confirmar asistencia inmediatamente para registro in-situ
+            # Confirmar asistencia inmediatamente para registro in-situ (crea también el certificado)
             asistente = inscripcion.asistente
-            asistente.asistencia_confirmada = True
-            asistente.fecha_confirmacion = timezone.now()
-            asistente.save()
-            
-            # Crear certificado de asistencia
-            certificado, created = Certificado.objects.get_or_create(
-                asistente=asistente,
-                tipo_certificado=Certificado.TipoCertificado.ASISTENCIA
-            )
+            fecha = timezone.now()
+            if confirmar_asistencia(asistente.pk, dni=asistente.dni, fecha=fecha):
+                publicar_checkin(model_to_dict(asistente, fields=CAMPOS_EVENTO), fecha, 'registro_rapido')
             
             # send_certificate_email(certificado) # Commented out for testing
             
@@ -237,7 +345,7 @@ class RegistroRapidoView(mixins.CreateModelMixin, viewsets.GenericViewSet):
             return Response({'status': 'error', 'message': f'Ha ocurrido un error inesperado: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class EmpresaViewSet(viewsets.ReadOnlyModelViewSet):
+class EmpresaViewSet(RespuestaCacheadaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para ver la lista de empresas participantes.
     Solo permite lectura (GET) para mostrar logos en carrusel/slider.
@@ -251,15 +359,20 @@ class EnvioMasivoEmailsView(views.APIView):
     """
     Vista para envío masivo de emails a todos los asistentes registrados.
     Envía emails de confirmación con la fecha correcta del evento: 15 de noviembre de 2025.
+    El POST solo encola los emails y devuelve el lote; el avance se consulta en
+    /api/envio-masivo-emails/<lote>/.
     """
     permission_classes = [AllowAny]  # En producción, cambiar por permisos de administrador
 
     def get(self, request, *args, **kwargs):
         """Método GET para mostrar estadísticas de emails"""
-        total_asistentes = Asistente.objects.count()
-        sin_dni = Asistente.objects.filter(dni__isnull=True).count()
-        con_dni = Asistente.objects.filter(dni__isnull=False).count()
-        
+        conteos = Asistente.objects.aggregate(
+            total=Count('id'), sin_dni=Count('id', filter=Q(dni__isnull=True))
+        )
+        total_asistentes = conteos['total']
+        sin_dni = conteos['sin_dni']
+        con_dni = total_asistentes - sin_dni
+
         return Response({
             'status': 'info',
             'message': 'Endpoint para envío masivo de emails',
@@ -298,77 +411,144 @@ class EnvioMasivoEmailsView(views.APIView):
                 'message': f'No hay {descripcion} para enviar emails.'
             }, status=status.HTTP_200_OK)
         
-        # Inicializar contadores
-        resultados = {
-            'total_procesados': 0,
-            'emails_enviados': 0,
-            'emails_fallidos': 0,
+        # Solo se encolan: los envía el comando `procesar_emails`, fuera del request
+        tipo = EnvioEmail.Tipo.RECORDATORIO if tipo_email == 'recordatorio' else EnvioEmail.Tipo.CONFIRMACION
+        lote, total = encolar_emails(asistentes, tipo, contexto={'fecha_evento': fecha_evento})
+
+        return Response({
+            'status': 'success',
+            'message': f"{total} emails encolados para {descripcion}. Consultá el avance del envío en estado_url.",
+            'lote': str(lote),
+            'total': total,
             'tipo_email': tipo_email,
             'fecha_evento': fecha_evento,
             'filtro_aplicado': descripcion,
-            'detalles': []
-        }
-        
-        # Enviar emails
-        for asistente in asistentes:
-            try:
-                # Aquí puedes personalizar el email según el tipo
-                if tipo_email == 'recordatorio':
-                    # Email de recordatorio del evento
-                    email_enviado = send_bulk_confirmation_email(
-                        asistente, 
-                        es_recordatorio=True,
-                        fecha_evento=fecha_evento
-                    )
-                else:
-                    # Email de confirmación estándar
-                    email_enviado = send_bulk_confirmation_email(
-                        asistente, 
-                        es_carga_masiva=True,
-                        fecha_evento=fecha_evento
-                    )
-                
-                if email_enviado:
-                    resultados['emails_enviados'] += 1
-                    resultados['detalles'].append({
-                        'email': asistente.email,
-                        'nombre': f"{asistente.first_name} {asistente.last_name}",
-                        'estado': 'enviado'
-                    })
-                else:
-                    resultados['emails_fallidos'] += 1
-                    resultados['detalles'].append({
-                        'email': asistente.email,
-                        'nombre': f"{asistente.first_name} {asistente.last_name}",
-                        'estado': 'error'
-                    })
-            
-            except Exception as e:
-                resultados['emails_fallidos'] += 1
-                resultados['detalles'].append({
-                    'email': asistente.email,
-                    'nombre': f"{asistente.first_name} {asistente.last_name}",
-                    'estado': 'error',
-                    'error': str(e)
-                })
-            
-            resultados['total_procesados'] += 1
-        
-        # Preparar mensaje de respuesta
-        if resultados['emails_enviados'] > 0:
-            status_code = status.HTTP_200_OK
-            status_msg = 'success'
-            message = f"Envío masivo completado. {resultados['emails_enviados']} emails enviados, {resultados['emails_fallidos']} errores."
-        else:
-            status_code = status.HTTP_500_INTERNAL_SERVER_ERROR  
-            status_msg = 'error'
-            message = f"Error en envío masivo. {resultados['emails_fallidos']} emails fallidos."
-        
+            'estado_url': reverse('estado-envio-emails', kwargs={'lote': lote}),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class EstadoEnvioEmailsView(views.APIView):
+    """
+    Estado de un lote de emails encolado por el envío masivo o el admin:
+    cantidad enviada, pendiente y con error, y los destinatarios que fallaron.
+    """
+    permission_classes = [AllowAny]  # En producción, cambiar por permisos de administrador
+
+    def get(self, request, lote, *args, **kwargs):
+        resumen = resumen_lote(lote)
+        if resumen is None:
+            return Response({
+                'status': 'error',
+                'message': 'No existe un envío de emails con ese lote.'
+            }, status=status.HTTP_404_NOT_FOUND)
+
         return Response({
-            'status': status_msg,
-            'message': message,
-            'resultados': resultados
-        }, status=status_code)
+            'status': 'success',
+            'message': f"{resumen['enviados']} de {resumen['total']} emails enviados.",
+            'resultados': resumen
+        }, status=status.HTTP_200_OK)
+
+
+class EstadisticasView(views.APIView):
+    """
+    Estadísticas de asistencia en vivo para las pantallas de la entrada:
+    registrados, confirmados, distribución por perfil y por partido y
+    confirmaciones por hora. Se leen de los contadores precalculados de
+    estadisticas.py, sin recorrer la tabla de asistentes.
+    """
+    permission_classes = [AllowAny]  # En producción, cambiar por permisos de administrador
+
+    def get(self, request, *args, **kwargs):
+        estadisticas = resumen_estadisticas()
+        return Response({
+            'status': 'success',
+            'message': f"{estadisticas['confirmados']} de {estadisticas['registrados']} asistentes confirmados.",
+            'estadisticas': estadisticas
+        }, status=status.HTTP_200_OK)
+
+
+class EventosCheckInView(View):
+    """
+    Stream de Server-Sent Events con cada check-in confirmado, para los
+    monitores de la entrada (ver api/eventos_checkin.py). Al conectarse se
+    reciben los últimos eventos del buffer, o los posteriores al header
+    Last-Event-ID (o ?desde=<id>) al reconectarse. Solo funciona con ASGI.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            # Con WSGI la conexión abierta ocuparía un worker entero
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Los eventos de check-in requieren servir la aplicación con ASGI.'
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        desde = request.headers.get('Last-Event-ID') or request.GET.get('desde') or '0'
+        if not desde.isdigit():
+            return JsonResponse({
+                'status': 'error',
+                'message': 'El id del último evento debe ser un número entero.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(canal_checkin.escuchar(int(desde)), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Que nginx no acumule los eventos
+        return response
+
+
+def _respuesta_modo_invalido():
+    return Response({
+        'status': 'error',
+        'message': 'Modo no válido. Use "insertar" o "upsert".'
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _respuesta_validacion(archivo, formato, formato_reporte, modo):
+    """Respuesta de dry_run=true: resumen de la validación y URL del reporte de errores. No importa nada."""
+    resumen = validar_archivo(archivo, formato, formato_reporte=formato_reporte, modo=modo)
+    return Response({
+        'status': 'success',
+        'message': (
+            f"Validación sin importar: {resumen['validas']} filas nuevas válidas, "
+            f"{resumen['actualizables']} a completar y {resumen['errores']} con errores."
+        ),
+        'dry_run': True,
+        'resultados': resumen
+    }, status=status.HTTP_200_OK)
+
+
+def _respuesta_trabajo_creado(trabajo):
+    return Response({
+        'status': 'success',
+        'message': f'Carga masiva #{trabajo.pk} recibida. Se procesa en segundo plano; consultá el avance en estado_url.',
+        'trabajo_id': trabajo.pk,
+        'estado_url': reverse('estado-carga-masiva', kwargs={'trabajo_id': trabajo.pk}),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+class EstadoCargaMasivaView(views.APIView):
+    """
+    Avance de una carga masiva: filas procesadas, exitosas y con error, tiempo
+    restante estimado y el detalle por fila de lo importado hasta ahora.
+    """
+    permission_classes = [AllowAny]  # En producción, cambiar por permisos de administrador
+
+    def get(self, request, trabajo_id, *args, **kwargs):
+        trabajo = TrabajoImportacion.objects.filter(pk=trabajo_id).first()
+        if trabajo is None:
+            return Response({
+                'status': 'error',
+                'message': 'No existe una carga masiva con ese ID.'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        resumen = resumen_trabajo_importacion(trabajo)
+        if resumen['lote_emails']:
+            resumen['estado_emails_url'] = reverse('estado-envio-emails', kwargs={'lote': resumen['lote_emails']})
+        return Response({
+            'status': 'success',
+            'message': f"{trabajo.procesados} de {trabajo.total} filas procesadas ({trabajo.get_estado_display()}).",
+            'resultados': resumen
+        }, status=status.HTTP_200_OK)
 
 
 class CargaMasivaAsistentesCompletaView(views.APIView):
@@ -386,7 +566,10 @@ class CargaMasivaAsistentesCompletaView(views.APIView):
             'metodo': 'POST',
             'parametros': {
                 'archivo': 'Archivo Excel (.xlsx, .xls) o CSV (.csv) - REQUERIDO',
-                'enviar_emails': 'true/false - OPCIONAL (default: true)'
+                'enviar_emails': 'true/false - OPCIONAL (default: true)',
+                'dry_run': 'true/false - OPCIONAL: solo valida, sin importar, y devuelve un reporte de errores (default: false)',
+                'formato_reporte': 'csv/xlsx - OPCIONAL: formato del reporte de errores de dry_run (default: csv)',
+                'modo': 'insertar/upsert - OPCIONAL: con upsert, los asistentes ya registrados (por email o DNI) no son error y se completan sus datos vacíos (default: insertar)'
             },
             'estructura_archivo': {
                 'columnas_requeridas': ['NOMBRE', 'Apellido', 'CORREO ELECTRONICO'],
@@ -417,6 +600,10 @@ class CargaMasivaAsistentesCompletaView(views.APIView):
 
         archivo = request.FILES['archivo']
         enviar_emails = request.data.get('enviar_emails', 'true').lower() == 'true'
+        dry_run = request.data.get('dry_run', 'false').lower() == 'true'
+        modo = request.data.get('modo', 'insertar').upper()
+        if modo not in TrabajoImportacion.Modo.values:
+            return _respuesta_modo_invalido()
         
         try:
             # Validar tipo de archivo
@@ -426,210 +613,36 @@ class CargaMasivaAsistentesCompletaView(views.APIView):
                     'message': 'Tipo de archivo no soportado. Use Excel (.xlsx, .xls) o CSV.'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Leer el archivo
+            # Antes de aceptar el trabajo, leer solo el primer bloque para validar el archivo y sus columnas
             try:
-                import pandas as pd
-                if archivo.name.endswith('.csv'):
-                    df = pd.read_csv(archivo)
-                else:
-                    df = pd.read_excel(archivo)
-            except ImportError:
-                return Response({
-                    'status': 'error',
-                    'message': 'pandas no está instalado. Instale pandas para procesar archivos Excel/CSV.'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                bloques = leer_por_bloques(archivo)
+                primero = next(bloques)
+                bloques.close()
             except Exception as e:
                 return Response({
                     'status': 'error',
                     'message': f'Error al leer el archivo: {str(e)}'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Mapear columnas esperadas (basado en la imagen proporcionada)
-            columnas_esperadas = {
-                'NOMBRE': ['nombre', 'first_name', 'primer_nombre'],
-                'Apellido': ['apellido', 'last_name'],
-                'CORREO ELECTRONICO': ['correo', 'email', 'correo_electronico', 'correo electrónico', 'correo_electrónico'],
-                'NUMERO DE CELULAR (con código de área)': ['telefono', 'phone', 'celular', 'numero_celular', 'número de celular (con código de área)', 'numero de celular (con codigo de area)'],
-                'DNI': ['dni', 'documento'],
-                'TIPO DE PERFIL': ['tipo_perfil', 'profile_type', 'tipo_de_perfil', 'tipo de perfil'],
-                'Columna1': ['columna1', 'rol_especifico', 'rol', 'column1']
-            }
-
-            # Normalizar nombres de columnas
-            df.columns = df.columns.str.strip()
-            columnas_mapeadas = {}
-            
-            for col_esperada, variantes in columnas_esperadas.items():
-                for col in df.columns:
-                    if col == col_esperada or col.lower() in [v.lower() for v in variantes]:
-                        columnas_mapeadas[col_esperada] = col
-                        break
-
-            # Verificar columnas mínimas requeridas
-            columnas_requeridas = ['NOMBRE', 'Apellido', 'CORREO ELECTRONICO']
-            columnas_faltantes = []
-            for col in columnas_requeridas:
-                if col not in columnas_mapeadas:
-                    columnas_faltantes.append(col)
-
-            if columnas_faltantes:
+            try:
+                FORMATO_COMPLETO.resolver_columnas([str(c).strip() for c in primero.columns])
+            except ColumnasFaltantes as e:
                 return Response({
                     'status': 'error',
-                    'message': f'Faltan columnas requeridas: {", ".join(columnas_faltantes)}',
-                    'columnas_disponibles': list(df.columns),
-                    'columnas_esperadas': list(columnas_esperadas.keys())
+                    'message': str(e),
+                    'columnas_disponibles': e.disponibles,
+                    'columnas_esperadas': list(FORMATO_COMPLETO.columnas.values())
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Procesar registros
-            resultados = {
-                'total_procesados': 0,
-                'exitosos': 0,
-                'errores': 0,
-                'emails_enviados': 0,
-                'emails_fallidos': 0,
-                'detalles': []
-            }
+            archivo.seek(0)
+            if dry_run:
+                return _respuesta_validacion(archivo, FORMATO_COMPLETO, request.data.get('formato_reporte', 'csv'), modo)
 
-            with transaction.atomic():
-                for index, row in df.iterrows():
-                    try:
-                        # Extraer datos de la fila
-                        first_name = str(row[columnas_mapeadas['NOMBRE']]).strip() if pd.notna(row[columnas_mapeadas['NOMBRE']]) else ''
-                        last_name = str(row[columnas_mapeadas['Apellido']]).strip() if pd.notna(row[columnas_mapeadas['Apellido']]) else ''
-                        email = str(row[columnas_mapeadas['CORREO ELECTRONICO']]).strip() if pd.notna(row[columnas_mapeadas['CORREO ELECTRONICO']]) else ''
-                        
-                        # Validar datos mínimos
-                        if not first_name or not last_name or not email:
-                            resultados['errores'] += 1
-                            resultados['detalles'].append({
-                                'fila': index + 2,  # +2 porque empezamos en 0 y hay header
-                                'error': 'Faltan datos básicos (nombre, apellido, email)',
-                                'datos': {'nombre': first_name, 'apellido': last_name, 'email': email}
-                            })
-                            continue
-
-                        # Validar formato de email
-                        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-                            resultados['errores'] += 1
-                            resultados['detalles'].append({
-                                'fila': index + 2,
-                                'error': 'Formato de email inválido',
-                                'datos': {'email': email}
-                            })
-                            continue
-
-                        # Verificar si ya existe el email
-                        if Asistente.objects.filter(email=email).exists():
-                            resultados['errores'] += 1
-                            resultados['detalles'].append({
-                                'fila': index + 2,
-                                'error': 'Email ya registrado',
-                                'datos': {'email': email}
-                            })
-                            continue
-
-                        # Procesar DNI (puede ser nulo)
-                        dni = None
-                        if 'DNI' in columnas_mapeadas and pd.notna(row[columnas_mapeadas['DNI']]):
-                            dni_raw = str(row[columnas_mapeadas['DNI']]).strip()
-                            # Limpiar DNI (remover puntos, guiones, etc.)
-                            dni = re.sub(r'[^\d]', '', dni_raw)
-                            if dni and len(dni) > 0:
-                                # Verificar si ya existe el DNI
-                                if Asistente.objects.filter(dni=dni).exists():
-                                    resultados['errores'] += 1
-                                    resultados['detalles'].append({
-                                        'fila': index + 2,
-                                        'error': 'DNI ya registrado',
-                                        'datos': {'dni': dni}
-                                    })
-                                    continue
-                            else:
-                                dni = None
-
-                        # Procesar teléfono (puede ser vacío)
-                        phone = ''
-                        if 'NUMERO DE CELULAR (con código de área)' in columnas_mapeadas and pd.notna(row[columnas_mapeadas['NUMERO DE CELULAR (con código de área)']]):
-                            phone = str(row[columnas_mapeadas['NUMERO DE CELULAR (con código de área)']]).strip()
-
-                        # Procesar tipo de perfil
-                        profile_type = Asistente.ProfileType.OTRO  # Por defecto OTRO
-                        if 'TIPO DE PERFIL' in columnas_mapeadas and pd.notna(row[columnas_mapeadas['TIPO DE PERFIL']]):
-                            tipo_perfil_raw = str(row[columnas_mapeadas['TIPO DE PERFIL']]).strip().upper()
-                            
-                            # Mapear tipos de perfil
-                            mapeo_perfiles = {
-                                'VISITANTE': Asistente.ProfileType.VISITOR,
-                                'ESTUDIANTE': Asistente.ProfileType.STUDENT,
-                                'DOCENTE': Asistente.ProfileType.TEACHER,
-                                'PROFESIONAL': Asistente.ProfileType.PROFESSIONAL,
-                                'GRADUADO': Asistente.ProfileType.GRADUADO,
-                                'OTRO': Asistente.ProfileType.OTRO,
-                                'VISITOR': Asistente.ProfileType.VISITOR,
-                                'STUDENT': Asistente.ProfileType.STUDENT,
-                                'TEACHER': Asistente.ProfileType.TEACHER,
-                                'PROFESSIONAL': Asistente.ProfileType.PROFESSIONAL
-                            }
-                            
-                            if tipo_perfil_raw in mapeo_perfiles:
-                                profile_type = mapeo_perfiles[tipo_perfil_raw]
-
-                        # Procesar rol específico (Columna1)
-                        rol_especifico = None
-                        if 'Columna1' in columnas_mapeadas and pd.notna(row[columnas_mapeadas['Columna1']]):
-                            rol_especifico = str(row[columnas_mapeadas['Columna1']]).strip()
-
-                        # Crear asistente
-                        asistente = Asistente.objects.create(
-                            first_name=first_name,
-                            last_name=last_name,
-                            email=email,
-                            phone=phone,
-                            dni=dni,
-                            profile_type=profile_type,
-                            rol_especifico=rol_especifico
-                        )
-
-                        resultados['exitosos'] += 1
-                        resultados['detalles'].append({
-                            'fila': index + 2,
-                            'success': 'Registro creado exitosamente',
-                            'id': asistente.id,
-                            'datos': {
-                                'nombre': first_name,
-                                'apellido': last_name,
-                                'email': email,
-                                'dni': dni,
-                                'perfil': profile_type,
-                                'rol_especifico': rol_especifico
-                            }
-                        })
-
-                        # Enviar email de confirmación si está habilitado
-                        if enviar_emails:
-                            try:
-                                if send_bulk_confirmation_email(asistente, es_carga_masiva=True):
-                                    resultados['emails_enviados'] += 1
-                                else:
-                                    resultados['emails_fallidos'] += 1
-                            except Exception as e:
-                                resultados['emails_fallidos'] += 1
-                                print(f"[ERROR] Error enviando email a {email}: {e}")
-
-                    except Exception as e:
-                        resultados['errores'] += 1
-                        resultados['detalles'].append({
-                            'fila': index + 2,
-                            'error': f'Error procesando fila: {str(e)}'
-                        })
-
-                    resultados['total_procesados'] += 1
-
-            return Response({
-                'status': 'success',
-                'message': f'Carga masiva completada. {resultados["exitosos"]} registros exitosos, {resultados["errores"]} errores.',
-                'resultados': resultados
-            }, status=status.HTTP_200_OK)
+            # La importación la hace el comando `procesar_importaciones` (ver api/importacion.py)
+            trabajo = crear_trabajo_importacion(
+                archivo, TrabajoImportacion.Formato.COMPLETO, enviar_emails=enviar_emails, modo=modo
+            )
+            return _respuesta_trabajo_creado(trabajo)
 
         except Exception as e:
             return Response({
@@ -655,7 +668,10 @@ class CargaMasivaAsistentesView(views.APIView):
                 'contenido': 'multipart/form-data',
                 'parametros': {
                     'archivo': 'Archivo Excel (.xlsx o .xls) con datos de asistentes',
-                    'enviar_emails': 'true/false - OPCIONAL (default: false)'
+                    'enviar_emails': 'true/false - OPCIONAL (default: false)',
+                    'dry_run': 'true/false - OPCIONAL: solo valida, sin importar, y devuelve un reporte de errores (default: false)',
+                    'formato_reporte': 'csv/xlsx - OPCIONAL: formato del reporte de errores de dry_run (default: csv)',
+                    'modo': 'insertar/upsert - OPCIONAL: con upsert, los asistentes ya registrados (por email o DNI) no son error y se completan sus datos vacíos (default: insertar)'
                 }
             },
             'formato_excel': {
@@ -682,128 +698,26 @@ class CargaMasivaAsistentesView(views.APIView):
 
         archivo = request.FILES['archivo']
         enviar_emails = request.data.get('enviar_emails', 'false').lower() == 'true'
+        dry_run = request.data.get('dry_run', 'false').lower() == 'true'
+        modo = request.data.get('modo', 'insertar').upper()
+        if modo not in TrabajoImportacion.Modo.values:
+            return _respuesta_modo_invalido()
 
         try:
-            # Leer archivo Excel
-            if archivo.name.endswith('.xlsx'):
-                df = pd.read_excel(archivo, engine='openpyxl')
-            elif archivo.name.endswith('.xls'):
-                df = pd.read_excel(archivo, engine='xlrd')
-            else:
+            if not archivo.name.endswith(('.xlsx', '.xls')):
                 return Response({
                     'status': 'error',
                     'message': 'Formato de archivo no soportado. Use .xlsx o .xls'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Mapear nombres de columnas en español a inglés
-            column_mapping = {
-                'Nombre': 'first_name',
-                'Apellido': 'last_name', 
-                'Email': 'email',
-                'Institucion': 'institution',
-                'Tipo de Perfil': 'profile_type',
-                'DNI': 'dni',
-                'Columna1': 'rol_especifico'
-            }
-
-            # Renombrar columnas
-            df.rename(columns=column_mapping, inplace=True)
-
-            resultados = {
-                'total_procesados': 0,
-                'exitosos': 0,
-                'errores': 0,
-                'emails_enviados': 0,
-                'emails_fallidos': 0,
-                'detalles': []
-            }
-
-            with transaction.atomic():
-                for index, row in df.iterrows():
-                    try:
-                        # Validar email
-                        email = row.get('email', '').strip()
-                        if not email or not re.match(r'^[^@]+@[^@]+\.[^@]+$', email):
-                            resultados['errores'] += 1
-                            resultados['detalles'].append({
-                                'fila': index + 2,
-                                'email': email,
-                                'error': 'Email inválido o vacío'
-                            })
-                            continue
-
-                        # Verificar si ya existe
-                        if Asistente.objects.filter(email=email).exists():
-                            resultados['errores'] += 1
-                            resultados['detalles'].append({
-                                'fila': index + 2,
-                                'email': email,
-                                'error': 'Email ya registrado'
-                            })
-                            continue
-
-                        # Mapear tipo de perfil
-                        profile_type_map = {
-                            'VISITOR': Asistente.ProfileType.VISITOR,
-                            'STUDENT': Asistente.ProfileType.STUDENT,
-                            'TEACHER': Asistente.ProfileType.TEACHER,
-                            'PROFESSIONAL': Asistente.ProfileType.PROFESSIONAL,
-                            'GRADUADO': Asistente.ProfileType.GRADUADO,
-                            'OTRO': Asistente.ProfileType.OTRO
-                        }
-
-                        profile_type_str = str(row.get('profile_type', 'VISITOR')).upper()
-                        profile_type = profile_type_map.get(profile_type_str, Asistente.ProfileType.VISITOR)
-
-                        # Crear asistente
-                        dni = row.get('dni')
-                        if pd.isna(dni) or dni == '':
-                            dni = None
-
-                        asistente = Asistente.objects.create(
-                            first_name=str(row.get('first_name', '')).strip(),
-                            last_name=str(row.get('last_name', '')).strip(),
-                            email=email,
-                            institution=str(row.get('institution', '')).strip() or None,
-                            profile_type=profile_type,
-                            dni=dni,
-                            rol_especifico=str(row.get('rol_especifico', '')).strip() or None
-                        )
-
-                        resultados['exitosos'] += 1
-                        resultados['detalles'].append({
-                            'fila': index + 2,
-                            'email': email,
-                            'nombre': f"{asistente.first_name} {asistente.last_name}",
-                            'profile_type': asistente.get_profile_type_display(),
-                            'estado': 'creado'
-                        })
-
-                        # Enviar email si está habilitado
-                        if enviar_emails:
-                            try:
-                                if send_bulk_confirmation_email(asistente, es_carga_masiva=True, fecha_evento='2025-11-15'):
-                                    resultados['emails_enviados'] += 1
-                                else:
-                                    resultados['emails_fallidos'] += 1
-                            except Exception as e:
-                                resultados['emails_fallidos'] += 1
-                                print(f"[ERROR] Error enviando email a {email}: {e}")
-
-                    except Exception as e:
-                        resultados['errores'] += 1
-                        resultados['detalles'].append({
-                            'fila': index + 2,
-                            'error': f'Error procesando fila: {str(e)}'
-                        })
-
-                    resultados['total_procesados'] += 1
+            if dry_run:
+                return _respuesta_validacion(archivo, FORMATO_SIMPLE, request.data.get('formato_reporte', 'csv'), modo)
 
-            return Response({
-                'status': 'success',
-                'message': f'Carga masiva completada. {resultados["exitosos"]} registros exitosos, {resultados["errores"]} errores.',
-                'resultados': resultados
-            }, status=status.HTTP_200_OK)
+            # La importación la hace el comando `procesar_importaciones` (ver api/importacion.py)
+            trabajo = crear_trabajo_importacion(
+                archivo, TrabajoImportacion.Formato.SIMPLE, enviar_emails=enviar_emails, modo=modo
+            )
+            return _respuesta_trabajo_creado(trabajo)
 
         except Exception as e:
             return Response({
@@ -871,18 +785,19 @@ class ActualizarDNIView(views.APIView):
                     'message': str(e.detail[0]) if isinstance(e.detail, list) else str(e.detail)
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Verificar si el DNI ya existe
-            if Asistente.objects.filter(dni=dni_validado).exclude(id=asistente.id).exists():
+            # Actualizar el DNI y eliminar el token; un DNI ya registrado lo rechaza la base
+            asistente.dni = dni_validado
+            asistente.dni_update_token = None
+            try:
+                asistente.save(update_fields=['dni', 'dni_update_token'])
+            except DjangoValidationError as e:
+                if 'dni' not in e.message_dict:
+                    raise
                 return Response({
                     'status': 'error',
                     'message': 'Este DNI ya está registrado en el sistema.'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Actualizar el DNI y eliminar el token
-            asistente.dni = dni_validado
-            asistente.dni_update_token = None
-            asistente.save()
-            
             return Response({
                 'status': 'success',
                 'message': 'DNI actualizado correctamente.'
@@ -119,6 +119,32 @@ else:
     }
 
 
+# Caché de las respuestas de la API pública (programa, disertantes, empresas; ver api/cache_publica.py).
+# En producción se usa un directorio compartido por todos los workers de Gunicorn.
+if os.getenv('DJANGO_ENV') == 'development':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+# Segundos que se conserva una respuesta cacheada (cualquier cambio en los datos la invalida antes)
+CACHE_API_PUBLICA_TTL = int(os.getenv('CACHE_API_PUBLICA_TTL', 24 * 60 * 60))
+# Segundos que se reutiliza el resumen de /api/estadisticas/ (0 = leer siempre los contadores)
+ESTADISTICAS_CACHE_SEGUNDOS = int(os.getenv('ESTADISTICAS_CACHE_SEGUNDOS', 5))
+# Eventos de check-in en vivo (api/eventos_checkin.py): cuántos se guardan para los monitores que se
+# conectan tarde y cada cuántos segundos se envía un latido en una conexión sin eventos
+CHECKIN_EVENTOS_BUFFER = int(os.getenv('CHECKIN_EVENTOS_BUFFER', 500))
+CHECKIN_EVENTOS_LATIDO = int(os.getenv('CHECKIN_EVENTOS_LATIDO', 15))
+
 # Password validation
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -156,12 +182,24 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() in ['true', '1', 'yes']
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 
+# Envíos masivos: mensajes por conexión SMTP antes de reconectar y tope de mensajes por segundo (0 = sin límite)
+EMAIL_MENSAJES_POR_CONEXION = int(os.getenv('EMAIL_MENSAJES_POR_CONEXION', 100))
+EMAIL_LIMITE_POR_SEGUNDO = float(os.getenv('EMAIL_LIMITE_POR_SEGUNDO', 0))
+# Hilos (y conexiones SMTP) para las confirmaciones de grupos, enviadas después del commit (0 = en el mismo hilo)
+EMAIL_POOL_HILOS = int(os.getenv('EMAIL_POOL_HILOS', 4))
+# Cola de salida (comando procesar_emails): intentos antes de marcar un email como fallido
+EMAIL_COLA_MAX_INTENTOS = int(os.getenv('EMAIL_COLA_MAX_INTENTOS', 5))
+
 # Validación básica para evitar errores comunes
 if not EMAIL_HOST_USER or not EMAIL_HOST_PASSWORD:
     print("[ERROR] EMAIL_HOST_USER o EMAIL_HOST_PASSWORD no están definidos en el .env. El envío de emails fallará.")
 if EMAIL_HOST_USER and '@gmail.com' in EMAIL_HOST_USER and len(EMAIL_HOST_PASSWORD) < 16:
     print("[ADVERTENCIA] Gmail requiere una contraseña de aplicación (16 caracteres) si tienes 2FA activado. Verifica tu .env.")
 
+# Formato de los certificados PDF: 'vectorial' (nombre como texto sobre el fondo embebido a 150 dpi, más liviano)
+# o 'raster' (página completa como imagen a la resolución de la plantilla)
+CERTIFICADO_FORMATO = os.getenv('CERTIFICADO_FORMATO', 'vectorial')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -256,3 +294,12 @@ SESSION_COOKIE_SAMESITE = 'Lax'
 FRONTEND_URL = "https://www.congresologistica.unab.edu.ar"
 
 
+
+# Carga masiva: filas informadas como máximo en `detalles` de la respuesta (el resto solo se cuenta)
+CARGA_MASIVA_MAX_DETALLES = int(os.getenv('CARGA_MASIVA_MAX_DETALLES', 1000))
+
+# Snapshots JSON del programa, los disertantes y las empresas (comando generar_snapshots y cada cambio en esos modelos).
+# Quedan en MEDIA, así que el servidor web o la CDN los sirven sin pasar por Django.
+SNAPSHOTS_DIR = os.getenv('SNAPSHOTS_DIR', os.path.join(MEDIA_ROOT, 'snapshots'))
+# Origen público del backend: las URLs de fotos y logos de los snapshots se arman con él, igual que en la API
+SNAPSHOTS_URL_BASE = os.getenv('SNAPSHOTS_URL_BASE', 'https://www.congresologistica.unab.edu.ar')
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Precargar el índice de DNIs del check-in (ver api/checkin.py)
+try:
+    from api.checkin import indice_checkin
+    indice_checkin.cargar()
+except Exception as e:
+    print(f"[WARNING] No se pudo precargar el índice de check-in: {e}")
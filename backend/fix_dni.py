@@ -12,8 +12,8 @@ Script para limpiar y validar el campo DNI de los asistentes en la base de datos
 import os
 import sys
 import django
-import re
 import secrets
+import pandas as pd
 
 # Configurar entorno Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -21,32 +21,30 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 django.setup()
 
 from api.models import Asistente
-
-def is_valid_dni(dni):
-    """Devuelve True si el DNI es exactamente 8 dígitos numéricos."""
-    return bool(dni and len(dni) == 8 and dni.isdigit())
+from api.normalizacion import normalizar_dni, PATRON_DNI
 
 def clean_dni():
     print("--- Limpieza y Validación de DNIs de Asistentes ---")
 
-    todos = Asistente.objects.all()
-    afectados = []
-    for a in todos:
-        original = a.dni or ''
-        limpio = re.sub(r'\D', '', original)
-        # Si tiene 9 dígitos y termina en 0, eliminar el último 0
-        if len(limpio) == 9 and limpio.endswith('0'):
-            limpio = limpio[:-1]
-        if is_valid_dni(limpio):
-            nuevo = limpio
-        else:
-            nuevo = None
-        if nuevo != original:
-            afectados.append((a, original, nuevo))
+    # Mismas reglas que la carga masiva y Asistente.clean(), aplicadas a toda la columna de una vez
+    filas = pd.DataFrame.from_records(
+        Asistente.objects.values_list('id', 'first_name', 'last_name', 'dni'),
+        columns=['id', 'first_name', 'last_name', 'dni']
+    )
+    original = filas['dni'].fillna('')
+    limpio = normalizar_dni(original.astype(str))
+    # Los que no quedan con exactamente 8 dígitos pasan a nulo
+    nuevo = limpio.astype(object).where(limpio.str.match(PATRON_DNI), None)
+    # Un DNI que ya era nulo y sigue sin ser válido no cuenta como cambio
+    cambiados = ~((nuevo == filas['dni']) | (nuevo.isna() & filas['dni'].isna()))
+    afectados = [
+        (fila.id, fila.first_name, fila.last_name, orig, nue)
+        for fila, orig, nue in zip(filas[cambiados].itertuples(), original[cambiados], nuevo[cambiados])
+    ]
 
     print(f"\n[INFO] {len(afectados)} asistentes con DNI a limpiar/corregir:")
-    for a, original, nuevo in afectados:
-        print(f"  - ID: {a.id}, Nombre: {a.first_name} {a.last_name}, DNI original: '{original}' -> '{nuevo}'")
+    for id_, first_name, last_name, original, nuevo in afectados:
+        print(f"  - ID: {id_}, Nombre: {first_name} {last_name}, DNI original: '{original}' -> '{nuevo}'")
 
     confirm = input("\n¿Deseas aplicar estos cambios? (s/n): ").lower()
     if confirm != 's':
@@ -54,9 +52,10 @@ def clean_dni():
         return
 
     # Aplicar cambios de DNI (sin validación automática para evitar conflictos)
-    for a, _, nuevo in afectados:
-        # Usar update en lugar de save para evitar la validación automática
-        Asistente.objects.filter(id=a.id).update(dni=nuevo)
+    # bulk_update en lugar de save para evitar la validación automática
+    Asistente.objects.bulk_update(
+        [Asistente(id=id_, dni=nuevo) for id_, _, _, _, nuevo in afectados], ['dni'], batch_size=500
+    )
     print(f"\n[SUCCESS] Se corrigieron {len(afectados)} DNIs.")
 
     # Asignar/eliminar tokens según corresponda